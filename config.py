@@ -33,9 +33,27 @@ root.addHandler(ch)
 log = logging.getLogger(__name__)
 
 # Other
+def get_argument_value(*names):
+    for name in names:
+        if name in sys.argv:
+            index = sys.argv.index(name)
+            if index + 1 < len(sys.argv):
+                return sys.argv[index + 1]
+    return None
+
+
 SIMULATION_MODE = '--simulate' in sys.argv or '-s' in sys.argv
-ENABLE_SOUNDS = not SIMULATION_MODE
+SIMULATION_VIRTUAL_TIME = SIMULATION_MODE and ('--fast' in sys.argv or '-f' in sys.argv)
+DEVICE_RECORD_FILE = get_argument_value('--record')  # record all device reads and writes into this file
+DEVICE_REPLAY_FILE = get_argument_value('--replay')  # replace devices by replay of this recording
+ENABLE_SOUNDS = not SIMULATION_MODE and DEVICE_REPLAY_FILE is None
 CYCLE_TIME_DEBUG = False
+SIMULATION_STEP_TIME = 0.01
+SIMULATION_FLOOR_IMAGE = None  # path to PGM/PPM/PNG image of the floor centered at (0,0), or None
+SIMULATION_FLOOR_RESOLUTION = 1  # cm per pixel of the floor image
+SIMULATION_BEACONS = []  # IR beacons placed on the map as (x, y, channel)
+SIMULATION_SENSOR_NOISE = True  # simulate noise and latency of sensor readings
+SIMULATION_NOISE_SEED = 0
 DATA_DIR = os.curdir + os.sep + 'data'
 
 
@@ -77,6 +95,10 @@ ROBOT_SENSOR_COLOR_OFFSET_Y = 7.5
 ROBOT_SENSOR_DISTANCE_OFFSET_X = 0
 ROBOT_SENSOR_DISTANCE_OFFSET_Y = 10.5
 
+# Sensors polling
+SENSOR_COLOR_RATE = 100  # maximal reads per second of the color sensor
+SENSOR_DISTANCE_RATE = 20  # maximal reads per second of the distance sensor
+
 # Line follower
 LINE_FOLLOWER_TARGET_CYCLE_TIME = 0.1
 LINE_FOLLOWER_TARGET_POWER = 20
@@ -1,35 +1,76 @@
+import atexit
+
 from ev3dev.auto import Sound, Motor, LargeMotor, MediumMotor, Sensor, ColorSensor, InfraredSensor, UltrasonicSensor, \
     INPUT_3, INPUT_4
 
 from config import *
+from utils.bulk_reader import BulkReader
+from utils.clock import VirtualClock, set_clock
+from utils.cycle_stats import get_cycles_stats
+from utils.device_info import device_info
 from utils.distance_scanner import DistanceScanner, DistanceScannerPropulsion, DistanceScannerHead
 from utils.pilot import Pilot
 from utils.position import Position2D
+from utils.recorder import DeviceRecorder, DeviceReplay, create_replay_device
+from utils.scanner_service import ScannerService
 from utils.simulation.controller import Controller, RobotInfo, Map
+from utils.simulation.floor import FloorTexture
 from utils.simulation.hardware import SimLargeMotor, SimMediumMotor, \
     SimColorSensor, SimInfraredSensor, SimUltrasonicSensor
 from utils.simulation.interface import EV3LargeMotorInterface, EV3MediumMotorInterface, \
     EV3ColorSensorInterface, EV3InfraredSensorInterface
+from utils.simulation.noise import SensorNoise
+from utils.sensor_modes import sensor_modes
+from utils.sensor_poller import SensorPoller
 from utils.simulation.simulator import get_base_ev3_devices, build_simulator
 from utils.value_reader import ValueReader
 from utils.wheel import Wheel
 
+SCANNER_MOTOR_INTERFACE = EV3MediumMotorInterface(Position2D(0, 0, 90), ROBOT_MOTOR_SCANNER_PORT)
+DISTANCE_SENSOR_INTERFACE = EV3InfraredSensorInterface(Position2D(ROBOT_SENSOR_DISTANCE_OFFSET_X,
+                                                                  ROBOT_SENSOR_DISTANCE_OFFSET_Y, 0), INPUT_4)
+DISTANCE_SENSOR_INTERFACE.mount_on(SCANNER_MOTOR_INTERFACE, ROBOT_MOTOR_SCANNER_GEAR_RATIO)
+COLOR_SENSOR_INTERFACE = EV3ColorSensorInterface(Position2D(ROBOT_SENSOR_COLOR_OFFSET_X,
+                                                          ROBOT_SENSOR_COLOR_OFFSET_Y, 0), INPUT_3)
+if SIMULATION_SENSOR_NOISE:
+    DISTANCE_SENSOR_INTERFACE.noise = SensorNoise(std_dev=1.5, latency=0.002, latency_jitter=0.002,
+                                                  seed=SIMULATION_NOISE_SEED)
+    COLOR_SENSOR_INTERFACE.noise = SensorNoise(std_dev=1, quantum=1, latency=0.001, latency_jitter=0.001,
+                                               seed=SIMULATION_NOISE_SEED + 1)
+
 DEVICES_INTERFACES = [
                          EV3LargeMotorInterface(Position2D(ROBOT_MOTOR_WHEEL_LEFT_OFFSET_X, 0, 0),
                                                 ROBOT_MOTOR_WHEEL_LEFT_PORT),
                          EV3LargeMotorInterface(Position2D(ROBOT_MOTOR_WHEEL_RIGHT_OFFSET_X, 0, 0),
                                                 ROBOT_MOTOR_WHEEL_RIGHT_PORT),
-                         EV3MediumMotorInterface(Position2D(0, 0, 90), ROBOT_MOTOR_SCANNER_PORT),
-                         EV3InfraredSensorInterface(Position2D(ROBOT_SENSOR_DISTANCE_OFFSET_X,
-                                                               ROBOT_SENSOR_DISTANCE_OFFSET_Y, 0), INPUT_4),
-                         EV3ColorSensorInterface(
-                             Position2D(ROBOT_SENSOR_COLOR_OFFSET_X, ROBOT_SENSOR_COLOR_OFFSET_Y, 0), INPUT_3)
+                         SCANNER_MOTOR_INTERFACE,
+                         DISTANCE_SENSOR_INTERFACE,
+                         COLOR_SENSOR_INTERFACE
                      ] + get_base_ev3_devices(Position2D(ROBOT_BRICK_OFFSET_X, ROBOT_BRICK_OFFSET_Y, 0))
 
 CONTROLLER = Controller(RobotInfo(*DEVICES_INTERFACES), Map())
 
-if SIMULATION_MODE:
-    SIM_ENV = build_simulator(CONTROLLER, *DEVICES_INTERFACES)
+if DEVICE_REPLAY_FILE is not None:
+    set_clock(VirtualClock())
+    REPLAY = DeviceReplay.load(DEVICE_REPLAY_FILE)
+
+    LEFT_MOTOR = create_replay_device(LargeMotor, REPLAY, 'LEFT_MOTOR', ROBOT_MOTOR_WHEEL_LEFT_PORT)
+    RIGHT_MOTOR = create_replay_device(LargeMotor, REPLAY, 'RIGHT_MOTOR', ROBOT_MOTOR_WHEEL_RIGHT_PORT)
+
+    COLOR_SENSOR = create_replay_device(ColorSensor, REPLAY, 'COLOR_SENSOR')
+
+    SCANNER_MOTOR = create_replay_device(MediumMotor, REPLAY, 'SCANNER_MOTOR', ROBOT_MOTOR_SCANNER_PORT)
+    INFRARED_SENSOR = create_replay_device(InfraredSensor, REPLAY, 'INFRARED_SENSOR')
+    ULTRASONIC_SENSOR = create_replay_device(UltrasonicSensor, REPLAY, 'ULTRASONIC_SENSOR')
+elif SIMULATION_MODE:
+    if SIMULATION_VIRTUAL_TIME:
+        set_clock(VirtualClock())
+    if SIMULATION_FLOOR_IMAGE is not None:
+        CONTROLLER.set_floor(FloorTexture.load(SIMULATION_FLOOR_IMAGE, resolution=SIMULATION_FLOOR_RESOLUTION))
+    for beacon in SIMULATION_BEACONS:
+        CONTROLLER.get_map().add_beacon(*beacon)
+
+    SIM_ENV = build_simulator(CONTROLLER, *DEVICES_INTERFACES, step_time=SIMULATION_STEP_TIME)
 
     LEFT_MOTOR = SimLargeMotor(SIM_ENV, ROBOT_MOTOR_WHEEL_LEFT_PORT)
     RIGHT_MOTOR = SimLargeMotor(SIM_ENV, ROBOT_MOTOR_WHEEL_RIGHT_PORT)
@@ -53,22 +94,41 @@ else:
 
     CONTROLLER.prepare_devices()
 
+if DEVICE_RECORD_FILE is not None:
+    RECORDER = DeviceRecorder(DEVICE_RECORD_FILE)
+    RECORDER.attach(LEFT_MOTOR, 'LEFT_MOTOR')
+    RECORDER.attach(RIGHT_MOTOR, 'RIGHT_MOTOR')
+    RECORDER.attach(COLOR_SENSOR, 'COLOR_SENSOR')
+    RECORDER.attach(SCANNER_MOTOR, 'SCANNER_MOTOR')
+    RECORDER.attach(INFRARED_SENSOR, 'INFRARED_SENSOR')
+    RECORDER.attach(ULTRASONIC_SENSOR, 'ULTRASONIC_SENSOR')
+    atexit.register(RECORDER.close)
+
+for device in (LEFT_MOTOR, RIGHT_MOTOR, COLOR_SENSOR, SCANNER_MOTOR, INFRARED_SENSOR, ULTRASONIC_SENSOR):
+    device_info(device).fill()
+
 LEFT_WHEEL = Wheel(LEFT_MOTOR, ROBOT_MOTOR_WHEEL_LEFT_GEAR_RATIO, ROBOT_MOTOR_WHEEL_LEFT_DIAMETER,
                    ROBOT_MOTOR_WHEEL_LEFT_WIDTH, ROBOT_MOTOR_WHEEL_LEFT_OFFSET_X)
 RIGHT_WHEEL = Wheel(RIGHT_MOTOR, ROBOT_MOTOR_WHEEL_RIGHT_GEAR_RATIO, ROBOT_MOTOR_WHEEL_RIGHT_DIAMETER,
                     ROBOT_MOTOR_WHEEL_RIGHT_WIDTH, ROBOT_MOTOR_WHEEL_RIGHT_OFFSET_X)
 PILOT = Pilot(LEFT_WHEEL, RIGHT_WHEEL)
 
+if SIMULATION_MODE:
+    CONTROLLER.set_wheels(LEFT_WHEEL, RIGHT_WHEEL)
+
+SENSOR_POLLER = SensorPoller()
+
 HAS_COLOR_SENSOR = COLOR_SENSOR.connected
 if HAS_COLOR_SENSOR:
-    COLOR_SENSOR.mode = ColorSensor.MODE_COL_REFLECT
-    COLOR_SENSOR_READER = ValueReader(COLOR_SENSOR)
+    sensor_modes(COLOR_SENSOR).set_mode(ColorSensor.MODE_COL_REFLECT)
+    COLOR_SENSOR_READER = ValueReader(COLOR_SENSOR, SENSOR_POLLER, SENSOR_COLOR_RATE, priority=1, name='color')
 else:
     COLOR_SENSOR_READER = None
 
 SCANNER_PROPULSION = DistanceScannerPropulsion(SCANNER_MOTOR, ROBOT_MOTOR_SCANNER_GEAR_RATIO)
-SCANNER_HEAD = DistanceScannerHead(INFRARED_SENSOR, ULTRASONIC_SENSOR)
+SCANNER_HEAD = DistanceScannerHead(INFRARED_SENSOR, ULTRASONIC_SENSOR, SENSOR_POLLER, SENSOR_DISTANCE_RATE)
 SCANNER = DistanceScanner(SCANNER_PROPULSION, SCANNER_HEAD)
+SCANNER_SERVICE = ScannerService(SCANNER)
 
 SOUND = Sound
 
@@ -77,6 +137,7 @@ def reset_hardware():
     if HAS_COLOR_SENSOR:
         COLOR_SENSOR_READER.mode(ColorSensor.MODE_COL_REFLECT)
     PILOT.reset()
+    SCANNER_SERVICE.stop()
     SCANNER.reset()
 
 
@@ -85,7 +146,7 @@ def generate_hardware_status_obj():
         return {'position': motor.position, 'speed': motor.speed, 'state': motor.state}
 
     def sensor_status(sensor: Sensor):
-        return {'mode': sensor.mode, 'values': [sensor.value(n) for n in range(sensor.num_values)]}
+        return {'mode': sensor_modes(sensor).mode, 'values': BulkReader(sensor).values()}
 
     config_status = {
         'simulated': SIMULATION_MODE
@@ -107,5 +168,7 @@ def generate_hardware_status_obj():
         'config': config_status,
         'wheels': wheels_status,
         'scanner': scanner_status,
-        'sensors': sensors_status
+        'sensors': sensors_status,
+        'polling': SENSOR_POLLER.get_stats(),
+        'cycles': get_cycles_stats()
     }
@@ -11,6 +11,7 @@ from programs.auto_drive import AutoDriveRobotProgram
 from programs.beacon_follow import BeaconFollowRobotProgram
 from programs.line_follow import LineFollowRobotProgram
 from programs.scanner_calibration import CalibrateScannerRobotProgram
+from utils import clock
 
 log = logging.getLogger(__name__)
 
@@ -39,6 +40,7 @@ def run():
 
     signal.signal(signal.SIGINT, handle_exit)
     signal.signal(signal.SIGTERM, handle_exit)
+    clock.leave()  # only the server thread works from now on
 
 
 if __name__ == '__main__':
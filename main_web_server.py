@@ -7,6 +7,7 @@ from collections import OrderedDict
 
 from config import SERVER_HTML_DIR, SERVER_DATA_DIR, LOG_TMP
 from hardware import generate_hardware_status_obj
+from utils.cycle_stats import get_cycles_stats, reset_cycles_stats
 from utils.web_server import FilesWebHandler
 
 log = logging.getLogger(__name__)
@@ -41,6 +42,21 @@ class MainWebHandler(FilesWebHandler):
 
         return True
 
+    def command_get_cycle_stats(self, path, post_args, get_args, data):
+        """Timing statistics of all cycles as JSON, ?reset (or reset in POST) clears them after they are returned."""
+        cycles_stats = get_cycles_stats()
+        if 'reset' in get_args or b'reset' in post_args:
+            reset_cycles_stats()
+
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json')
+        self.end_headers()
+
+        if self.command != 'HEAD':
+            self.wfile.write(json.dumps(cycles_stats, sort_keys=True, indent=3, separators=(',', ': ')).encode())
+
+        return True
+
     def command_index(self, path, post_args, get_args, data):
         data_dir = self._get_data_dir()
         page_text_filename = data_dir + os.sep + data[0]
@@ -1,9 +1,11 @@
 import math
 import threading
-import time
+
+import numpy as np
 
 from config import AUTO_DRIVER_CONFIG_VALUES
-from hardware import PILOT, SCANNER, reset_hardware
+from hardware import PILOT, SCANNER, SCANNER_SERVICE, reset_hardware
+from utils import clock
 from utils.robot_program import RobotProgram, SimpleRobotProgramController, run_program
 from utils.utils import crop_r
 
@@ -14,37 +16,35 @@ class AutoDriveController(SimpleRobotProgramController):
 
         self._stop = False
         self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
+        clock.start_thread(self._thread)
 
     def _run(self):
         scan_results = [100, 100, 100]
         scan_integrals = [0, 0, 0]
 
-        scan_result_tmp = [100, 1]
-
         side_degrees = self.get_config_value('MOTOR_SCANNER_SIDE_DEGREES')
 
-        def scanner_pos_to_side(scanner_position):
+        def process_sample(sample):
+            # closer obstacle is handled right away, farther one waits for the whole sweep (process_snapshot)
             straight_degrees = side_degrees / 3
-            if scanner_position < -straight_degrees:
-                return 0
-            if scanner_position > straight_degrees:
-                return 2
-            return 1
-
-        def write_tmp_result(result, scanner_pos):
-            if scanner_pos != scan_result_tmp[1]:
-                scan_results[scan_result_tmp[1]] = scan_result_tmp[0]
-                scan_integrals[scan_result_tmp[1]] = scan_result_tmp[0] + scan_integrals[scan_result_tmp[1]] / 2
-                scan_result_tmp[0] = 100
-                scan_result_tmp[1] = scanner_pos
+            side = 0 if sample.angle < -straight_degrees else 2 if sample.angle > straight_degrees else 1
+            if sample.value < scan_results[side]:
+                scan_results[side] = sample.value
                 update_drive()
 
-            scan_result_tmp[0] = min(scan_result_tmp[0], result)
-
-            if scan_result_tmp[0] < scan_results[scan_result_tmp[1]]:
-                scan_results[scan_result_tmp[1]] = scan_result_tmp[0]
-                update_drive()
+        def process_snapshot(snapshot):
+            straight_degrees = side_degrees / 3
+            angles = snapshot.bin_angles
+            for side, (from_angle, to_angle) in enumerate(((-math.inf, -straight_degrees),
+                                                          (-straight_degrees, straight_degrees),
+                                                          (straight_degrees, math.inf))):
+                values = snapshot.values[(angles >= from_angle) & (angles <= to_angle)]
+                values = values[~np.isnan(values)]
+                if len(values) > 0:
+                    result = float(values.min())
+                    scan_results[side] = result
+                    scan_integrals[side] = result + scan_integrals[side] / 2
+            update_drive()
 
         def update_drive():
             results_left_ratio = (scan_results[2] / scan_results[0]) if scan_results[0] != 0 else math.inf
@@ -88,21 +88,29 @@ class AutoDriveController(SimpleRobotProgramController):
 
             PILOT.update_duty_cycle_raw([left_speed, right_speed])  # TODO: rework to course
 
-        def value_handler(val, angle):
-            write_tmp_result(val, scanner_pos_to_side(angle))
-
-        SCANNER.rotate_scanner_to_pos(side_degrees)
-        SCANNER.wait_to_scanner_stop()
+        SCANNER_SERVICE.side_degrees = side_degrees
+        SCANNER_SERVICE.start()
 
-        SCANNER.value_scan_continuous(-side_degrees, value_handler)
-        next_positive = True
+        snapshot = SCANNER_SERVICE.wait_for_sweep()
+        if snapshot is not None:
+            process_snapshot(snapshot)
 
         PILOT.run_direct()
-        while not self._stop:
+        sample = SCANNER_SERVICE.latest_sample()
+        sample_number = sample.number if sample is not None else 0
+        while not self._stop and snapshot is not None:
             side_degrees = self.get_config_value('MOTOR_SCANNER_SIDE_DEGREES')
-            scanner_target = side_degrees if next_positive else -side_degrees
-            next_positive = not next_positive
-            SCANNER.value_scan_continuous(scanner_target, value_handler)
+            SCANNER_SERVICE.side_degrees = side_degrees
+            sample = SCANNER_SERVICE.wait_for_sample(sample_number)
+            if sample is None:
+                break  # scanner service stopped
+            sample_number = sample.number
+
+            latest = SCANNER_SERVICE.latest()
+            if latest is not None and latest.number > snapshot.number:
+                snapshot = latest
+                process_snapshot(snapshot)
+            process_sample(sample)
 
         reset_hardware()
 
@@ -116,8 +124,7 @@ class AutoDriveController(SimpleRobotProgramController):
         self._stop = True
 
     def wait_to_exit(self):
-        while self._thread.is_alive():
-            time.sleep(0.05)
+        clock.join(self._thread)
 
 
 class AutoDriveRobotProgram(RobotProgram):
@@ -1,11 +1,17 @@
 import threading
-import time
 
 from config import ROBOT_MOTOR_SCANNER_GEAR_RATIO, BEACON_FOLLOWER_CONFIG_VALUES
 from hardware import PILOT, SCANNER, SCANNER_MOTOR, INFRARED_SENSOR, reset_hardware
+from utils import clock
+from utils.bulk_reader import BulkReader
+from utils.motor_io import MotorWriter
 from utils.regulator import PercentRegulator
 from utils.robot_program import RobotProgram, SimpleRobotProgramController, run_program
-from utils.utils import crop_r, wait_to_cycle_time
+from utils.scheduler import get_scheduler
+from utils.sensor_modes import sensor_modes
+from utils.utils import crop_r
+
+CYCLE_TIME = 0.04
 
 
 class BeaconFollowController(SimpleRobotProgramController):
@@ -14,42 +20,47 @@ class BeaconFollowController(SimpleRobotProgramController):
 
         self.scanner_position_regulator = PercentRegulator(const_p=0.15, const_i=0.03, const_d=0.12, const_target=50)
 
+        self._seek_reader = None
+        self._scanner_writer = None
         self._stop = False
         self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
+        clock.start_thread(self._thread)
 
     def _run(self):
         self.scanner_position_regulator.reset()
-        INFRARED_SENSOR.mode = INFRARED_SENSOR.MODE_IR_SEEK
-
-        SCANNER_MOTOR.run_direct(duty_cycle_sp=0)
-        PILOT.run_direct()
-        last_time = time.time()
-        while not self._stop:
-            max_scanner_pos = self.get_config_value('MAX_SCANNER_POS')
-            target_power = self.get_config_value('TARGET_POWER')
-
-            angle = INFRARED_SENSOR.value(0)
-            distance = INFRARED_SENSOR.value(1)
-            motor_pos = SCANNER_MOTOR.position
-
-            input_val = (angle * -1 + 25) * 2
-            if abs(motor_pos) > max_scanner_pos:
-                input_val += (abs(motor_pos) - max_scanner_pos) / ROBOT_MOTOR_SCANNER_GEAR_RATIO \
-                             * (motor_pos / abs(motor_pos))
-            SCANNER_MOTOR.duty_cycle_sp = crop_r(
-                self.scanner_position_regulator.regulate(input_val) * ROBOT_MOTOR_SCANNER_GEAR_RATIO)
-
-            if distance > 18:
-                PILOT.update_duty_cycle(crop_r((motor_pos / ROBOT_MOTOR_SCANNER_GEAR_RATIO + angle) * 2, 200),
-                                        mul_duty_cycle=(target_power / 100) * (distance / 100))
-            else:
-                PILOT.update_duty_cycle(0, target_duty_cycle=0, mul_duty_cycle=0)
-
-            last_time = wait_to_cycle_time('BeaconFollow', last_time, 0.04)
+        with sensor_modes(INFRARED_SENSOR).borrow(INFRARED_SENSOR.MODE_IR_SEEK):
+            self._seek_reader = BulkReader(INFRARED_SENSOR)
+
+            self._scanner_writer = MotorWriter(SCANNER_MOTOR)
+            self._scanner_writer.run_direct(0)
+            PILOT.run_direct()
+            get_scheduler().add('BeaconFollow', self._cycle, CYCLE_TIME, budget=CYCLE_TIME / 2).join()
 
         reset_hardware()
 
+    def _cycle(self):
+        if self._stop:
+            return False
+
+        max_scanner_pos = self.get_config_value('MAX_SCANNER_POS')
+        target_power = self.get_config_value('TARGET_POWER')
+
+        angle, distance = self._seek_reader.values()[:2]
+        motor_pos = SCANNER_MOTOR.position
+
+        input_val = (angle * -1 + 25) * 2
+        if abs(motor_pos) > max_scanner_pos:
+            input_val += (abs(motor_pos) - max_scanner_pos) / ROBOT_MOTOR_SCANNER_GEAR_RATIO \
+                         * (motor_pos / abs(motor_pos))
+        self._scanner_writer.set_duty_cycle_sp(crop_r(
+            self.scanner_position_regulator.regulate(input_val) * ROBOT_MOTOR_SCANNER_GEAR_RATIO))
+
+        if distance > 18:
+            PILOT.update_duty_cycle(crop_r((motor_pos / ROBOT_MOTOR_SCANNER_GEAR_RATIO + angle) * 2, 200),
+                                    mul_duty_cycle=(target_power / 100) * (distance / 100))
+        else:
+            PILOT.update_duty_cycle(0, target_duty_cycle=0, mul_duty_cycle=0)
+
     def on_config_change(self):
         super().on_config_change()
         self.scanner_position_regulator.reset()
@@ -63,8 +74,7 @@ class BeaconFollowController(SimpleRobotProgramController):
         self._stop = True
 
     def wait_to_exit(self):
-        while self._thread.is_alive():
-            time.sleep(0.05)
+        clock.join(self._thread)
 
 
 class BeaconFollowRobotProgram(RobotProgram):
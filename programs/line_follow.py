@@ -1,17 +1,35 @@
 import logging
-import time
 
 from config import ROBOT_WIDTH, ROBOT_SENSOR_DISTANCE_OFFSET_Y, \
     ROBOT_SENSOR_COLOR_OFFSET_Y, LINE_FOLLOWER_CONFIG_VALUES
 from hardware import PILOT, COLOR_SENSOR_READER, HAS_COLOR_SENSOR, SCANNER, reset_hardware
+from utils import clock
 from utils.behaviour import Behaviour, MultiBehaviour, BehaviourController
 from utils.regulator import PercentRegulator
 from utils.robot_program import RobotProgram, SimpleRobotProgramController, ControllerConfigWrapper, run_program
-from utils.utils import crop_r, crop_m, wait_to_cycle_time
+from utils.scheduler import get_scheduler
+from utils.utils import crop_r, crop_m
 
 log = logging.getLogger(__name__)
 
 
+# Behaviours run their cycles as scheduler tasks (see CycleScheduler.add_steps()), they yield instead of sleeping.
+
+def _wait_while_running():
+    """Steps waiting until the pilot finishes its move."""
+    while PILOT.is_running():
+        yield
+
+
+def _scan(angle):
+    """Steps reading the scanner at angle, like DistanceScanner.value_scan() without blocking."""
+    if SCANNER.angle_get() != angle:
+        SCANNER.rotate_scanner_to_pos(angle)
+        while SCANNER.is_running:
+            yield
+    return SCANNER.value_get(force_new=True)
+
+
 class CollisionAvoidBehaviour(Behaviour, ControllerConfigWrapper):
     def __init__(self, controller):
         Behaviour.__init__(self)
@@ -20,71 +38,88 @@ class CollisionAvoidBehaviour(Behaviour, ControllerConfigWrapper):
         self._start_positions = []
         self._power_regulator = PercentRegulator(const_p=1, const_i=3, const_d=2,  # TODO: to config
                                                  getter_target=lambda: self._get_target_distance())
+        self._task = None
+        self._static_obstacle = False
 
     def _get_target_distance(self):
         return self.get_config_value('OBSTACLE_MIN_DISTANCE') * 0.8
 
+    def forget_obstacle(self):
+        self._static_obstacle = False
+
     def should_take_control(self):
         if not self.get_config_value('COLLISION_AVOID'):
             return False
-        if not self.get_config_value('OBSTACLE_AVOID'):
-            return True
+        return not self._static_obstacle
 
+    def keeps_control(self):
+        return self._task is not None and self._task.is_alive()
+
+    def _detect(self):
+        """Tell an approaching obstacle from a static one, static obstacle is left to ObstacleAvoidBehaviour."""
         min_distance = self.get_config_value('OBSTACLE_MIN_DISTANCE')
-        cycle_time = 0.1
         change = 100 - min_distance
-        last_distance_val = SCANNER.value_scan(0)
-        last_time = time.time()
+        last_distance_val = yield from _scan(0)
         while last_distance_val < min_distance:
-            distance_val = SCANNER.value_scan(0)
+            distance_val = yield from _scan(0)
             if distance_val < min_distance * 0.65:
-                return True
+                self._start_avoid()
+                return
 
             change = abs(distance_val - last_distance_val) + change / 2
             last_distance_val = distance_val
             if change < 5:
-                return False
+                break
 
-            last_time = wait_to_cycle_time(__name__, last_time, cycle_time)
+            yield
 
-        return False
+        self._static_obstacle = True
 
     def reset_regulation(self):
         self._power_regulator.reset()
 
     def on_take_control(self):
+        if not self.get_config_value('OBSTACLE_AVOID'):
+            self._start_avoid()
+            return
+        self._task = get_scheduler().add_steps('CollisionDetect', self._detect(), 0.1, budget=0.05)
+
+    def _start_avoid(self):
+        cycle_time = 0.05  # TODO: to config
         self._power_regulator.reset()
         self._start_positions = PILOT.get_positions()
         PILOT.run_direct()
+        self._task = get_scheduler().add_steps('CollisionAvoid', self._avoid(), cycle_time, budget=cycle_time / 2)
 
     def on_loose_control(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
         PILOT.stop()
         SCANNER.rotate_scanner_to_pos(0)
 
-    def handle_loop(self):
-        cycle_time = 0.05  # TODO: to config
+    def _avoid(self):
         wait_time = 2  # TODO: to config
-        last_time = time.time()
         while not self.controller.stop:
-            distance_val = SCANNER.value_scan(0)
+            distance_val = yield from _scan(0)
             power = self._power_regulator.regulate(distance_val) * -1
             PILOT.update_duty_cycle(0, crop_m(power, max_out=0))
 
             if distance_val > self._get_target_distance():
                 PILOT.stop()
 
-                last_time = time.time()
-                distance_val = SCANNER.value_scan(0)
+                last_time = clock.now()
+                distance_val = yield from _scan(0)
                 while distance_val > self._get_target_distance():
                     if self.controller.stop:
                         return
 
-                    if time.time() - last_time < wait_time:
-                        time.sleep(cycle_time)
+                    if clock.now() - last_time < wait_time:
+                        yield
                     else:
                         problem = False
                         for i in [-1, 1]:
-                            side_distance_val = SCANNER.value_scan(40 * i)
+                            side_distance_val = yield from _scan(40 * i)
 
                             if side_distance_val < self._get_target_distance():
                                 SCANNER.rotate_scanner_to_pos(0)
@@ -98,7 +133,7 @@ class CollisionAvoidBehaviour(Behaviour, ControllerConfigWrapper):
                         target_speed = self.get_config_value('TARGET_POWER') / 100 * PILOT.get_max_speed_unit()
                         PILOT.restore_positions(self._start_positions, speed_unit=target_speed)
 
-                        distance_val = SCANNER.value_scan(0)
+                        distance_val = yield from _scan(0)
                         while distance_val > self._get_target_distance():
                             if self.controller.stop:
                                 return
@@ -106,18 +141,17 @@ class CollisionAvoidBehaviour(Behaviour, ControllerConfigWrapper):
                             if not PILOT.is_running():
                                 PILOT.stop()
                                 return
-                            distance_val = SCANNER.value_scan(0)
+                            yield
+                            distance_val = yield from _scan(0)
 
                         PILOT.stop()
                         break
 
-                    distance_val = SCANNER.value_scan(0)
+                    distance_val = yield from _scan(0)
 
                 PILOT.run_direct()
-                last_time = time.time()
 
-            last_time = wait_to_cycle_time(__name__, last_time, cycle_time)
-        pass
+            yield
 
 
 class ObstacleAvoidBehaviour(Behaviour, ControllerConfigWrapper):
@@ -125,20 +159,27 @@ class ObstacleAvoidBehaviour(Behaviour, ControllerConfigWrapper):
         Behaviour.__init__(self)
         ControllerConfigWrapper.__init__(self, controller)
 
+        self._task = None
+
     def should_take_control(self):
         return self.get_config_value('OBSTACLE_AVOID') \
                and SCANNER.value_get() < self.get_config_value('OBSTACLE_MIN_DISTANCE')
 
+    def keeps_control(self):
+        return self._task is not None and self._task.is_alive()
+
     def on_take_control(self):
-        pass
+        cycle_time = 0.05
+        self._task = get_scheduler().add_steps('ObstacleAvoid', self._avoid(), cycle_time, budget=cycle_time / 2)
 
     def on_loose_control(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
         PILOT.stop()
         SCANNER.rotate_scanner_to_pos(0)
 
-    def handle_loop(self):
-        wait_time = 0.05
-
+    def _avoid(self):
         min_reflect = self.controller.get_min_reflex()
         max_reflect = self.controller.get_max_reflex()
         target_reflect = self.get_config_value('TARGET_REFLECT')
@@ -156,40 +197,41 @@ class ObstacleAvoidBehaviour(Behaviour, ControllerConfigWrapper):
         PILOT.run_percent_drive_to_angle_deg(90, course, speed_unit=target_speed)
         if obstacle_width == 0 or obstacle_height == 0:
             SCANNER.rotate_scanner_to_pos(scanner_pos)
-        PILOT.wait_to_stop()
+        yield from _wait_while_running()
 
         if obstacle_width == 0 or obstacle_height == 0:
             for i in range(2):
                 PILOT.run_percent_drive_forever(0, speed_unit=target_speed)
                 while SCANNER.value_get() < min_distance:
-                    time.sleep(wait_time)
+                    yield
                 PILOT.run_percent_drive_to_angle_deg(90, -course, speed_unit=target_speed)
-                PILOT.wait_to_stop()
+                yield from _wait_while_running()
         else:
             PILOT.run_percent_drive_to_distance((obstacle_width / 2) - (ROBOT_WIDTH / 3), 0, speed_unit=target_speed)
-            PILOT.wait_to_stop()
+            yield from _wait_while_running()
             PILOT.run_percent_drive_to_angle_deg(90, -course, speed_unit=target_speed)
-            PILOT.wait_to_stop()
+            yield from _wait_while_running()
             PILOT.run_percent_drive_to_distance(obstacle_height, 0)
-            PILOT.wait_to_stop()
+            yield from _wait_while_running()
             PILOT.run_percent_drive_to_angle_deg(90, -course, speed_unit=target_speed)
-            PILOT.wait_to_stop()
+            yield from _wait_while_running()
 
         PILOT.run_percent_drive_forever(0, speed_unit=target_speed)
         SCANNER.rotate_scanner_to_pos(0)
 
         while 100 * (COLOR_SENSOR_READER.value() - min_reflect) / (max_reflect - min_reflect) > target_reflect:
-            time.sleep(wait_time)
+            yield
 
         PILOT.run_percent_drive_forever(course, speed_unit=target_speed)
 
         while 100 * (COLOR_SENSOR_READER.value() - min_reflect) / (max_reflect - min_reflect) <= target_reflect:
-            time.sleep(wait_time)
+            yield
 
-        time.sleep(wait_time * 4)
+        for i in range(4):
+            yield
 
         while 100 * (COLOR_SENSOR_READER.value() - min_reflect) / (max_reflect - min_reflect) > target_reflect:
-            time.sleep(wait_time)
+            yield
 
         PILOT.stop()
 
@@ -197,11 +239,15 @@ class ObstacleAvoidBehaviour(Behaviour, ControllerConfigWrapper):
 class ObstacleDetectionBehaviour(MultiBehaviour, ControllerConfigWrapper):
     def __init__(self, controller):
         ControllerConfigWrapper.__init__(self, controller)
+        self._collision_avoid = CollisionAvoidBehaviour(controller)
         MultiBehaviour.__init__(self, [
-            CollisionAvoidBehaviour(controller),
+            self._collision_avoid,
             ObstacleAvoidBehaviour(controller)
         ])
 
+    def on_take_control(self):
+        self._collision_avoid.forget_obstacle()
+
     def should_take_control(self) -> bool:
         if not SCANNER.is_connected or not SCANNER.has_motor or SCANNER.is_running \
                 or (not self.get_config_value('OBSTACLE_AVOID') and not self.get_config_value('COLLISION_AVOID')):
@@ -219,7 +265,8 @@ class LineFollowBehaviour(Behaviour, ControllerConfigWrapper):
         Behaviour.__init__(self)
         ControllerConfigWrapper.__init__(self, controller)
 
-        self._last_time = time.time()
+        self._task = None
+        self._turning = False
         self._last_power = 0
 
         self._steer_regulator = PercentRegulator(getter_p=lambda: self.get_config_value('REG_STEER_P'),
@@ -237,14 +284,22 @@ class LineFollowBehaviour(Behaviour, ControllerConfigWrapper):
         self._last_power = 0
         self.reset_regulation()
         PILOT.run_direct()
-        self._last_time = time.time()
+        cycle_time = self.get_config_value('TARGET_CYCLE_TIME')
+        self._task = get_scheduler().add_steps('LineFollow', self._follow(), cycle_time, budget=cycle_time / 2)
 
     def on_loose_control(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._turning = False
         PILOT.stop()
 
     def should_take_control(self) -> bool:
         return True
 
+    def keeps_control(self) -> bool:
+        return self._turning
+
     def _get_target_power(self):
         if self.get_config_value('PAUSE_POWER') or self.controller.stop:
             return 0
@@ -264,34 +319,36 @@ class LineFollowBehaviour(Behaviour, ControllerConfigWrapper):
             self._last_power = target_power
         return self._last_power
 
-    def _test_sharp_turn(self, target_power) -> bool:
+    def _test_sharp_turn(self) -> bool:
         if not self.get_config_value('SHARP_TURN_DETECT') or not self._steer_regulator.loop_count > 10 \
                 or not abs(self._steer_regulator.last_derivative) > 250:
             # TODO: test and add to config
             return False
+        return True
 
+    def _sharp_turn(self, target_power):
         side = self.get_config_value('SHARP_TURN_ROTATE_SIDE')
 
+        self._turning = True
         PILOT.stop()
         PILOT.run_drive_to_angle_deg(90 * side, ROBOT_SENSOR_COLOR_OFFSET_Y,
                                      speed_unit=target_power / 100 * PILOT.get_max_speed_unit())
-        PILOT.wait_to_stop()
+        yield from _wait_while_running()
         PILOT.run_direct()
 
         # target_reflect = self.get_config_value('TARGET_REFLECT')
         # PILOT.update_duty_cycle(100 * side, target_power)
         #
         # while (COLOR_SENSOR_READER.value() - min_reflect) / (max_reflect - min_reflect) * 100 <= target_reflect:
-        #     time.sleep(target_cycle_time)
+        #     yield
         #
-        # time.sleep(target_cycle_time)
+        # yield
         #
         # while (COLOR_SENSOR_READER.value() - min_reflect) / (max_reflect - min_reflect) * 100 > target_reflect:
-        #     time.sleep(target_cycle_time)
+        #     yield
 
         self.reset_regulation()
-        self._last_time = time.time()
-        return True
+        self._turning = False
 
     def _test_stop_on_line_end(self) -> bool:
         if not self.get_config_value('STOP_ON_LINE_END') or not self._steer_regulator.last_derivative < -25:
@@ -302,31 +359,37 @@ class LineFollowBehaviour(Behaviour, ControllerConfigWrapper):
         self.controller.request_exit()
         return True
 
-    def handle_loop(self):
-        min_reflect = self.controller.get_min_reflex()
-        max_reflect = self.controller.get_max_reflex()
-        line_side = self.get_config_value('LINE_SIDE')
-        target_cycle_time = self.get_config_value('TARGET_CYCLE_TIME')
-        power_adaptation = self.get_config_value('POWER_ADAPTATION')
-        target_power = self._next_power(target_cycle_time)
+    def _follow(self):
+        while True:
+            min_reflect = self.controller.get_min_reflex()
+            max_reflect = self.controller.get_max_reflex()
+            line_side = self.get_config_value('LINE_SIDE')
+            target_cycle_time = self.get_config_value('TARGET_CYCLE_TIME')
+            power_adaptation = self.get_config_value('POWER_ADAPTATION')
+            target_power = self._next_power(target_cycle_time)
+            if self._task is not None:
+                self._task.period = target_cycle_time  # follows changes of the config
 
-        read_val = COLOR_SENSOR_READER.value()
-        read_percent = 100 * (read_val - min_reflect) / (max_reflect - min_reflect)
-        course = crop_r(self._steer_regulator.regulate(read_percent) * line_side, 180)
+            read_val = COLOR_SENSOR_READER.value()
+            read_percent = 100 * (read_val - min_reflect) / (max_reflect - min_reflect)
+            course = crop_r(self._steer_regulator.regulate(read_percent) * line_side, 180)
 
-        if self._test_sharp_turn(target_power) or self._test_stop_on_line_end():
-            return
+            if self._test_sharp_turn():
+                yield from self._sharp_turn(target_power)
+                continue
+            if self._test_stop_on_line_end():
+                return
 
-        # if ENABLE_SOUNDS:
-        #     SOUND.beep('-f ' + str(int(course + 200)) + ' -l ' + str(int(target_cycle_time * 1000)))
+            # if ENABLE_SOUNDS:
+            #     SOUND.beep('-f ' + str(int(course + 200)) + ' -l ' + str(int(target_cycle_time * 1000)))
 
-        if power_adaptation:
-            target_power_mul = (1 / (1 + (abs(self._steer_regulator.last_integral) / 100))) * 0.6 + 0.4
-        else:
-            target_power_mul = 1
-        PILOT.update_duty_cycle(course, target_power * target_power_mul)
+            if power_adaptation:
+                target_power_mul = (1 / (1 + (abs(self._steer_regulator.last_integral) / 100))) * 0.6 + 0.4
+            else:
+                target_power_mul = 1
+            PILOT.update_duty_cycle(course, target_power * target_power_mul)
 
-        self._last_time = wait_to_cycle_time(__name__, self._last_time, target_cycle_time)
+            yield
 
 
 class LineFollowController(SimpleRobotProgramController, BehaviourController):
@@ -350,6 +413,7 @@ class LineFollowController(SimpleRobotProgramController, BehaviourController):
         read = COLOR_SENSOR_READER.value()
         reflect[0] = min(reflect[0], read)
         reflect[1] = max(reflect[1], read)
+        COLOR_SENSOR_READER.wait_for_sample()  # don't spin over the same sample
 
     def on_start(self):
         reflect = [None, None]
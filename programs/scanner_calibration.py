@@ -1,7 +1,7 @@
 import threading
-import time
 
-from hardware import SCANNER, SCANNER_MOTOR, reset_hardware
+from hardware import SCANNER, SCANNER_MOTOR, SCANNER_PROPULSION, reset_hardware
+from utils import clock
 from utils.robot_program import RobotProgram, SimpleRobotProgramController, run_program
 
 
@@ -13,22 +13,21 @@ class CalibrateScannerController(SimpleRobotProgramController):
         super().__init__(robot_program, config)
 
         self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
+        clock.start_thread(self._thread)
 
     def _run(self):
+        reader = SCANNER_PROPULSION.reader
         positions = []
         for i in range(self.RUN_RETRIES):
             SCANNER_MOTOR.run_forever(speed_sp=-35)
-            time.sleep(1)
-            while 'stalled' not in SCANNER_MOTOR.state:
-                time.sleep(0.01)
+            clock.sleep(1)
+            reader.wait_until_state(lambda state: SCANNER_MOTOR.STATE_STALLED in state)
             SCANNER_MOTOR.stop()
-            positions.append(SCANNER_MOTOR.position)
+            positions.append(reader.position())
 
             if i < self.RUN_RETRIES - 1:
                 SCANNER_MOTOR.run_to_rel_pos(speed_sp=60, position_sp=80)
-                while 'running' in SCANNER_MOTOR.state:
-                    time.sleep(0.05)
+                reader.wait_while_running()
 
         min_pos = 0
         max_pos = 0
@@ -62,8 +61,7 @@ class CalibrateScannerController(SimpleRobotProgramController):
         pass
 
     def wait_to_exit(self):
-        while self._thread.is_alive():
-            time.sleep(0.05)
+        clock.join(self._thread)
 
 
 class CalibrateScannerRobotProgram(RobotProgram):
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Run robot programs in simulated episodes in parallel and print a table of metrics.
+
+The experiment file is JSON with list of episodes, for example:
+
+    {
+        "episodes": [
+            {
+                "name": "slow", "program": "LineFollower", "duration": 120,
+                "config": {"TARGET_POWER": 20}, "floor": "data/tracks/oval.pgm",
+                "start": [0, -80, -90], "path": [[-100, -80], [100, -80], [100, 80], [-100, 80]],
+                "walls": [[-150, -150, 150, -145]]
+            }
+        ]
+    }
+
+See utils.simulation.experiment.Episode for all episode parameters.
+"""
+import argparse
+import csv
+import json
+import logging
+
+from utils.simulation.experiment import Episode, METRICS_COLUMNS, run_episodes, format_table
+
+
+def load_episodes(path: str, repeat: int = 1) -> list:
+    with open(path) as fh:
+        data = json.load(fh)
+    episodes_data = data['episodes'] if isinstance(data, dict) else data
+
+    episodes = []
+    for episode_data in episodes_data:
+        for i in range(repeat):
+            episode = Episode.from_dict(dict(episode_data))
+            if repeat > 1:
+                episode.name = str(episode.name) + '#' + str(i)
+            episodes.append(episode)
+    return episodes
+
+
+def run():
+    parser = argparse.ArgumentParser(description='Run robot programs in parallel simulated episodes.')
+    parser.add_argument('experiment', help='JSON file with episodes')
+    parser.add_argument('-p', '--processes', type=int, default=None, help='number of worker processes')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='run every episode this many times')
+    parser.add_argument('-o', '--output', default=None, help='write results to this CSV file')
+    parser.add_argument('--log-level', default='WARNING', help='log level of the simulated programs')
+    args = parser.parse_args()
+
+    episodes = load_episodes(args.experiment, args.repeat)
+    results = []
+    for episode_results in run_episodes(episodes, args.processes, getattr(logging, args.log_level.upper())):
+        results.append(episode_results)
+        print('Finished episode ' + str(episode_results['name'])
+              + (' with error: ' + episode_results['error'] if episode_results['error'] else ''), flush=True)
+
+    print()
+    print(format_table(results))
+
+    if args.output is not None:
+        with open(args.output, 'w', newline='') as fh:
+            writer = csv.DictWriter(fh, fieldnames=METRICS_COLUMNS)
+            writer.writeheader()
+            for episode_results in results:
+                writer.writerow({column: episode_results.get(column, None) for column in METRICS_COLUMNS})
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,122 @@
+import time
+import unittest
+from threading import Thread
+
+from utils import clock
+
+
+class VirtualClockTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_clock = clock.get_clock()
+        self.clock = clock.VirtualClock(start_time=0)  # the test thread participates
+        clock.set_clock(self.clock)
+
+    def tearDown(self):
+        clock.set_clock(self.previous_clock)
+
+    def start(self, target, *args) -> Thread:
+        thread = Thread(target=target, args=args, daemon=True)
+        clock.start_thread(thread)
+        return thread
+
+    def test_sleep_jumps_to_wake_up_time(self):
+        real_start = time.monotonic()
+        clock.sleep(100)
+        self.assertEqual(clock.now(), 100)
+        self.assertEqual(clock.monotonic(), 100)
+        self.assertLess(time.monotonic() - real_start, 1)
+
+    def test_participants_wake_up_in_order(self):
+        log = []
+
+        def worker(name, step, count):
+            for i in range(count):
+                clock.sleep(step)
+                log.append((name, clock.now()))
+
+        threads = [self.start(worker, 'a', 0.5, 2), self.start(worker, 'b', 0.25, 4)]
+        for thread in threads:
+            self.assertTrue(clock.join(thread, 10))
+        # participants waking up at once run in the order they went to sleep
+        self.assertEqual(log, [('b', 0.25), ('a', 0.5), ('b', 0.5), ('b', 0.75), ('a', 1), ('b', 1)])
+
+    def test_only_one_participant_runs_at_a_time(self):
+        running = []
+        overlaps = []
+
+        def worker():
+            for i in range(20):
+                running.append(1)
+                time.sleep(0.001)  # real time, other participants would get to run meanwhile
+                if len(running) > 1:
+                    overlaps.append(clock.now())
+                running.pop()
+                clock.sleep(0.01)
+
+        threads = [self.start(worker) for i in range(3)]
+        for thread in threads:
+            self.assertTrue(clock.join(thread, 10))
+        self.assertEqual(overlaps, [])
+
+    def test_wait_for_wakes_up_when_predicate_holds(self):
+        state = {'done': False}
+
+        def worker():
+            clock.sleep(2)
+            state['done'] = True
+            clock.sleep(5)
+
+        thread = self.start(worker)
+        self.assertTrue(clock.wait_for(lambda: state['done'], 10))
+        self.assertEqual(clock.now(), 2)
+        self.assertTrue(clock.join(thread))
+        self.assertEqual(clock.now(), 7)
+
+    def test_wait_for_timeout(self):
+        self.assertFalse(clock.wait_for(lambda: False, 3))
+        self.assertEqual(clock.now(), 3)
+        self.assertTrue(clock.wait_for(lambda: True, 3))
+        self.assertEqual(clock.now(), 3)
+
+    def test_join_timeout(self):
+        thread = self.start(clock.sleep, 10)
+        self.assertFalse(clock.join(thread, 4))
+        self.assertEqual(clock.now(), 4)
+        self.assertTrue(clock.join(thread))
+        self.assertEqual(clock.now(), 10)
+
+    def test_lock_held_while_sleeping(self):
+        lock = clock.RLock()
+        log = []
+
+        def holder():
+            with lock:
+                with lock:  # re-entrant
+                    clock.sleep(3)
+                log.append(('released', clock.now()))
+
+        def waiter():
+            clock.sleep(1)
+            with lock:
+                log.append(('acquired', clock.now()))
+
+        threads = [self.start(holder), self.start(waiter)]
+        for thread in threads:
+            self.assertTrue(clock.join(thread, 10))
+        self.assertEqual(log, [('released', 3), ('acquired', 3)])
+
+    def test_time_doesnt_wait_for_observers(self):
+        observed = []
+
+        def observer():
+            clock.sleep(2)
+            observed.append(clock.now())
+
+        thread = Thread(target=observer, daemon=True)
+        thread.start()  # not a participant
+        time.sleep(0.1)  # real time, let it start sleeping
+        clock.sleep(5)
+        self.assertEqual(clock.now(), 5)
+        thread.join(1)  # observer ends in real time, clock.join() would let the time run past it
+        self.assertEqual(len(observed), 1)
+        self.assertGreaterEqual(observed[0], 2)
@@ -0,0 +1,71 @@
+import random
+import unittest
+
+from utils.coordinator import Action, Coordinator
+
+
+class _RecordingAction(Action):
+    def __init__(self, progress):
+        self.progress = progress
+        self.error = None
+
+    def actual_progress(self):
+        return self.progress
+
+    def handle_loop(self, elapsed_time, progress_error):
+        self.error = progress_error
+
+
+def _quadratic_errors(progresses):
+    """Progress errors computed the original way, mean of the other progresses in a nested loop."""
+    errors = []
+    for i, progress in enumerate(progresses):
+        total = 0
+        count = 0
+        for j, other in enumerate(progresses):
+            if j == i or other is None:
+                continue
+            total += other
+            count += 1
+        target = total / count if count != 0 else None
+        errors.append(target - progress if target is not None and progress is not None else 0)
+    return errors
+
+
+class CoordinatorTest(unittest.TestCase):
+    def assert_matches_quadratic(self, progresses):
+        actions = [_RecordingAction(progress) for progress in progresses]
+        Coordinator(actions).handle_loop()
+        expected = _quadratic_errors(progresses)
+        for action, error in zip(actions, expected):
+            self.assertAlmostEqual(action.error, error, places=9)
+
+    def test_matches_quadratic(self):
+        self.assert_matches_quadratic([0.5])
+        self.assert_matches_quadratic([0.1, 0.3])
+        self.assert_matches_quadratic([0.1, None, 0.4, 0.2])
+        self.assert_matches_quadratic([None, 0.7])
+        self.assert_matches_quadratic([None, None])
+
+    def test_matches_quadratic_random(self):
+        generator = random.Random(0)
+        for _ in range(100):
+            progresses = [generator.uniform(-1, 1) if generator.random() > 0.2 else None
+                          for _ in range(generator.randint(1, 8))]
+            self.assert_matches_quadratic(progresses)
+
+    def test_buffer_is_reused(self):
+        actions = [_RecordingAction(0.1), _RecordingAction(0.3)]
+        coordinator = Coordinator(actions)
+        coordinator.handle_loop()
+        actions[0].progress = 0.5
+        coordinator.handle_loop()
+        self.assertAlmostEqual(actions[0].error, -0.2)
+        self.assertAlmostEqual(actions[1].error, 0.2)
+
+    def test_no_actions(self):
+        Coordinator([]).handle_loop()
+
+
+if __name__ == '__main__':
+    unittest.main()
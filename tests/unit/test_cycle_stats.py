@@ -0,0 +1,89 @@
+import unittest
+
+from utils.cycle_stats import CycleStats, Histogram, HISTOGRAM_EDGES
+
+
+class HistogramTest(unittest.TestCase):
+    def test_empty(self):
+        histogram = Histogram()
+        self.assertIsNone(histogram.percentile(50))
+        self.assertEqual(histogram.to_dict()['count'], 0)
+        self.assertIsNone(histogram.to_dict()['avg'])
+        self.assertEqual(histogram.to_dict()['bins'], [])
+
+    def test_values_go_to_bins_by_upper_edge(self):
+        histogram = Histogram()
+        for value in (0.0015, 0.0015, 0.02, 100):
+            histogram.add(value)
+        data = histogram.to_dict()
+        self.assertEqual(data['count'], 4)
+        self.assertEqual(data['min'], 0.0015)
+        self.assertEqual(data['max'], 100)
+        self.assertAlmostEqual(data['avg'], (0.003 + 0.02 + 100) / 4)
+        self.assertEqual(len(data['bins']), 3)
+        self.assertEqual(data['bins'][0][1], 2)
+        self.assertLess(HISTOGRAM_EDGES[0], 0.0015)
+        for edge, count in data['bins'][:2]:
+            self.assertIn(edge, HISTOGRAM_EDGES)
+        self.assertEqual(data['bins'][2], [None, 1])  # over the last edge
+
+    def test_percentile_is_upper_edge_of_its_bin(self):
+        histogram = Histogram()
+        for i in range(9):
+            histogram.add(0.0015)
+        histogram.add(0.02)
+        edge_low = min(edge for edge in HISTOGRAM_EDGES if edge >= 0.0015)
+        edge_high = min(edge for edge in HISTOGRAM_EDGES if edge >= 0.02)
+        self.assertEqual(histogram.percentile(50), edge_low)
+        self.assertEqual(histogram.percentile(90), edge_low)
+        self.assertEqual(histogram.percentile(99), edge_high)
+
+    def test_percentile_over_last_edge_is_max(self):
+        histogram = Histogram()
+        histogram.add(20)
+        histogram.add(30)
+        self.assertEqual(histogram.percentile(50), 30)
+
+
+class CycleStatsTest(unittest.TestCase):
+    def setUp(self):
+        self.stats = CycleStats('test')
+
+    def test_period_is_measured_start_to_start(self):
+        self.stats.add(10, 0.01, 0, 0.05, False)
+        self.stats.add(10.05, 0.02, 0.001, 0.05, False)
+        self.stats.add(10.15, 0.01, -0.001, 0.05, True)
+        data = self.stats.to_dict()
+        self.assertEqual(data['cycles'], 3)
+        self.assertEqual(data['overruns'], 1)
+        self.assertEqual(data['target_period'], 0.05)
+        self.assertEqual(data['period']['count'], 2)
+        self.assertAlmostEqual(data['period']['avg'], 0.075)
+        self.assertEqual(data['exec_time']['count'], 3)
+        self.assertEqual(data['jitter']['min'], 0)  # early start is no jitter
+        self.assertAlmostEqual(data['duty'], (0.04 / 3) / 0.075)
+
+    def test_stop_breaks_period(self):
+        self.stats.add(10, 0.01, 0, 0.05, False)
+        self.stats.stop()
+        self.stats.add(20, 0.01, 0, 0.05, False)
+        data = self.stats.to_dict()
+        self.assertEqual(data['cycles'], 2)
+        self.assertEqual(data['period']['count'], 0)
+        self.assertIsNone(data['duty'])
+
+    def test_reset_drops_collected_data(self):
+        self.stats.add(10, 0.01, 0, 0.05, True)
+        self.stats.add(10.05, 0.01, 0, 0.05, False)
+        self.stats.reset()
+        data = self.stats.to_dict()
+        self.assertEqual(data['cycles'], 0)
+        self.assertEqual(data['overruns'], 0)
+        self.assertEqual(data['period']['count'], 0)
+        # the next cycle doesn't count period from cycle added before reset
+        self.stats.add(10.1, 0.01, 0, 0.05, False)
+        self.assertEqual(self.stats.to_dict()['period']['count'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,16 @@
+import unittest
+
+from utils.simulation.experiment import Episode, run_episodes
+
+
+class RunEpisodesTest(unittest.TestCase):
+    def test_episode_is_reproducible(self):
+        episode = Episode('repeated', 'AutoDrive', duration=5,
+                          walls=[(-100, 60, 100, 65), (-100, -100, -95, 100), (95, -100, 100, 100)])
+        results = list(run_episodes([episode, episode], processes=2))
+
+        for result in results:
+            self.assertIsNone(result['error'])
+            del result['real_time']
+        self.assertGreater(results[0]['distance'], 0)
+        self.assertEqual(results[0], results[1])
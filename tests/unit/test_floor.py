@@ -0,0 +1,67 @@
+import unittest
+
+import numpy as np
+
+from utils.simulation.floor import FloorTexture
+
+
+class FloorTextureTest(unittest.TestCase):
+    def setUp(self):
+        # 4x4 image, each pixel has a distinct value, row 0 is the top (highest y) row
+        self.data = np.arange(16, dtype=np.uint8).reshape(4, 4) * 10
+        self.floor = FloorTexture(self.data, 0, 0, 1, outside_value=255)
+
+    def pixel(self, column, row):
+        return float(self.data[row, column])
+
+    def test_pixel_centers(self):
+        for row in range(4):
+            for column in range(4):
+                with self.subTest(column=column, row=row):
+                    self.assertAlmostEqual(self.floor.sample(column + 0.5, 3.5 - row), self.pixel(column, row))
+
+    def test_bilinear_between_pixels(self):
+        self.assertAlmostEqual(self.floor.sample(1, 3.5), (self.pixel(0, 0) + self.pixel(1, 0)) / 2)
+        self.assertAlmostEqual(self.floor.sample(0.5, 3), (self.pixel(0, 0) + self.pixel(0, 1)) / 2)
+
+    def test_edges_get_edge_pixels(self):
+        # between the last texel center and half a texel past the edge the edge texel is returned
+        for x in (3.5, 3.9, 4.2, 4.5):
+            with self.subTest(x=x):
+                self.assertAlmostEqual(self.floor.sample(x, 2.5), self.pixel(3, 1))  # inner row, right edge
+                self.assertAlmostEqual(self.floor.sample(x, 0.5), self.pixel(3, 3))  # bottom row, right edge
+        for y in (0.5, 0.1, -0.2, -0.5):
+            with self.subTest(y=y):
+                self.assertAlmostEqual(self.floor.sample(1.5, y), self.pixel(1, 3))  # bottom edge
+        self.assertAlmostEqual(self.floor.sample(-0.4, 1.5), self.pixel(0, 2))  # left edge
+        self.assertAlmostEqual(self.floor.sample(1.5, 4.4), self.pixel(1, 0))  # top edge
+
+    def test_corners(self):
+        self.assertAlmostEqual(self.floor.sample(4.5, -0.5), self.pixel(3, 3))
+        self.assertAlmostEqual(self.floor.sample(-0.5, 4.5), self.pixel(0, 0))
+        self.assertAlmostEqual(self.floor.sample(4.5, 4.5), self.pixel(3, 0))
+        self.assertAlmostEqual(self.floor.sample(-0.5, -0.5), self.pixel(0, 3))
+
+    def test_outside(self):
+        for x, y in ((4.6, 2), (-0.6, 2), (2, 4.6), (2, -0.6), (10, 10)):
+            with self.subTest(x=x, y=y):
+                self.assertEqual(self.floor.sample(x, y), 255)
+
+    def test_mip_levels_of_constant_image(self):
+        floor = FloorTexture(np.full((5, 7), 100, dtype=np.uint8), 0, 0, 1)
+        self.assertEqual(floor.levels_count, 4)
+        for radius in (0, 1, 2, 3, 10):
+            for x, y in ((0.1, 0.1), (6.9, 4.9), (3.5, 2.5), (7.4, 5.4)):
+                with self.subTest(radius=radius, x=x, y=y):
+                    self.assertAlmostEqual(floor.sample(x, y, radius), 100, places=4)
+
+    def test_rgb(self):
+        data = np.zeros((2, 2, 3), dtype=np.uint8)
+        data[:, :] = (255, 0, 0)
+        floor = FloorTexture(data, 0, 0, 1)
+        self.assertEqual(floor.sample_rgb(1, 1), (255, 0, 0))
+        self.assertAlmostEqual(floor.sample_luminance(1, 1), 0.299 * 255)
+
+
+if __name__ == '__main__':
+    unittest.main()
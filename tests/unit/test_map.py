@@ -0,0 +1,60 @@
+import math
+import unittest
+
+import numpy as np
+
+from utils.simulation.map import Map
+
+
+class CastRaysTest(unittest.TestCase):
+    def setUp(self):
+        # walls at y = 20 (one cell thick) and at x = -30, map spans [-50, 50) on both axes
+        self.map = Map(origin_x=-50, origin_y=-50, resolution=1, width=100, height=100)
+        self.map.fill_rect(-50, 20, 49, 20, 1)
+        self.map.fill_rect(-30, -50, -30, 49, 1)
+
+    def assert_distances(self, x, y, angles_deg, expected, max_distance=math.inf):
+        batch = self.map.cast_rays(x, y, angles_deg, max_distance)
+        np.testing.assert_allclose(batch, expected, rtol=1e-9)
+        for angle_deg, distance in zip(angles_deg, expected):
+            single = self.map.cast_rays(x, y, [angle_deg], max_distance)
+            np.testing.assert_allclose(single, [distance], rtol=1e-9)
+
+    def test_known_walls(self):
+        # 0 deg points along y, 90 deg along -x
+        self.assert_distances(0.5, 0.5, [0, 90, 45], [19.5, 29.5, 19.5 * math.sqrt(2)])
+
+    def test_no_wall_is_infinite(self):
+        self.assert_distances(0.5, 0.5, [180, -90, 135 + 90], [math.inf, math.inf, math.inf])
+
+    def test_max_distance(self):
+        self.assert_distances(0.5, 0.5, [0, 90], [19.5, math.inf], max_distance=25)
+
+    def test_start_in_wall(self):
+        self.assert_distances(0.5, 20.5, [0, 180], [0, 0])
+
+    def test_outside_of_grid(self):
+        # the ray enters the grid and hits the wall, rays running alongside the grid never hit anything
+        self.assert_distances(0.5, -60.5, [0, 90], [80.5, math.inf])
+        self.assert_distances(-60.5, 0.5, [-90, 0], [30.5, math.inf])
+
+    def test_grid_changed(self):
+        self.assert_distances(0.5, 0.5, [0], [19.5])
+        self.map.set_cell(0.5, 10.5, 1)
+        self.assert_distances(0.5, 0.5, [0], [9.5])
+        self.map.grid[:, :] = 0
+        self.map.grid_changed()
+        self.assert_distances(0.5, 0.5, [0], [math.inf])
+
+    def test_batch_matches_single_rays(self):
+        random = np.random.RandomState(0)
+        for _ in range(20):
+            self.map.set_cell(random.uniform(-50, 50), random.uniform(-50, 50), 1)
+        angles = random.uniform(-180, 180, 200)
+        batch = self.map.cast_rays(3.3, -7.1, angles)
+        single = [self.map.cast_rays(3.3, -7.1, [angle])[0] for angle in angles]
+        np.testing.assert_allclose(batch, single, rtol=1e-9)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+from utils.motion_profile import plan_profile
+
+_STEPS = 2000
+
+
+def _samples(profile):
+    return [profile.sample(profile.duration * i / _STEPS) for i in range(_STEPS + 1)]
+
+
+class PlanProfileTest(unittest.TestCase):
+    CASES = [
+        # distance, max_speed, max_acceleration, max_jerk
+        (1000, 200, 400, 4000),  # cruises at max_speed
+        (30, 200, 400, 4000),  # too short to reach max_speed
+        (5, 200, 400, 100),  # too short to reach max_acceleration
+        (1000, 10, 400, 4000),  # too slow to reach max_acceleration
+        (-700, 300, 600, 6000),  # mirrored
+        (1000, 200, 400, None),  # trapezoidal
+        (-30, 200, 400, None),  # trapezoidal triangle
+    ]
+
+    def test_ends_at_distance_with_zero_speed(self):
+        for distance, max_speed, max_acceleration, max_jerk in self.CASES:
+            with self.subTest(distance=distance, max_jerk=max_jerk):
+                profile = plan_profile(distance, max_speed, max_acceleration, max_jerk)
+                self.assertGreater(profile.duration, 0)
+                self.assertEqual(profile.sample(profile.duration), (distance, 0, 0))
+
+                # the last segment must really integrate to the end, not just be clamped there
+                position, speed, acceleration = profile.sample(profile.duration * (1 - 1e-9))
+                self.assertAlmostEqual(position, distance, delta=abs(distance) * 1e-6)
+                self.assertAlmostEqual(speed, 0, delta=max_speed * 1e-6)
+
+    def test_respects_limits(self):
+        for distance, max_speed, max_acceleration, max_jerk in self.CASES:
+            with self.subTest(distance=distance, max_jerk=max_jerk):
+                profile = plan_profile(distance, max_speed, max_acceleration, max_jerk)
+                samples = _samples(profile)
+                self.assertLessEqual(profile.peak_speed, max_speed * (1 + 1e-9))
+                sign = 1 if distance > 0 else -1
+                last_position = 0
+                for position, speed, acceleration in samples:
+                    self.assertLessEqual(abs(speed), max_speed * (1 + 1e-9))
+                    self.assertLessEqual(abs(acceleration), max_acceleration * (1 + 1e-9))
+                    self.assertGreaterEqual(sign * speed, -1e-9)  # never moves back
+                    self.assertGreaterEqual(sign * (position - last_position), -1e-9)
+                    last_position = position
+
+                if max_jerk is not None:
+                    step = profile.duration / _STEPS
+                    for (_, _, acceleration0), (_, _, acceleration1) in zip(samples, samples[1:]):
+                        self.assertLessEqual(abs(acceleration1 - acceleration0), max_jerk * step * (1 + 1e-6))
+
+    def test_zero_distance(self):
+        profile = plan_profile(0, 200, 400, 4000)
+        self.assertEqual(profile.duration, 0)
+        self.assertEqual(profile.sample(1), (0, 0, 0))
+
+    def test_invalid_limits(self):
+        for limits in [(0, 400, 4000), (200, -400, 4000), (200, 400, 0)]:
+            with self.subTest(limits=limits):
+                with self.assertRaises(ValueError):
+                    plan_profile(100, *limits)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import math
+import unittest
+
+from utils import clock
+from utils.simulation.noise import SensorNoise
+
+
+class _SleepCountingClock(clock.Clock):
+    def __init__(self):
+        self.sleeps = []
+
+    def sleep(self, secs: float):
+        self.sleeps.append(secs)
+
+
+class SensorNoiseTest(unittest.TestCase):
+    def setUp(self):
+        self._clock = clock.get_clock()
+        self.clock = _SleepCountingClock()
+        clock.set_clock(self.clock)
+
+    def tearDown(self):
+        clock.set_clock(self._clock)
+
+    def test_same_seed_same_readings(self):
+        noise0 = SensorNoise(std_dev=2, seed=7, block_size=16)
+        noise1 = SensorNoise(std_dev=2, seed=7, block_size=16)
+        readings0 = [noise0.apply(10) for _ in range(50)]  # crosses several blocks
+        readings1 = [noise1.apply(10) for _ in range(50)]
+        self.assertEqual(readings0, readings1)
+        self.assertNotEqual(readings0, [SensorNoise(std_dev=2, seed=8).apply(10) for _ in range(50)])
+
+    def test_std_dev(self):
+        noise = SensorNoise(std_dev=2, seed=1)
+        readings = [noise.apply(10) for _ in range(10000)]
+        mean = sum(readings) / len(readings)
+        std_dev = math.sqrt(sum((reading - mean) ** 2 for reading in readings) / len(readings))
+        self.assertAlmostEqual(mean, 10, delta=0.1)
+        self.assertAlmostEqual(std_dev, 2, delta=0.1)
+
+    def test_quantum(self):
+        noise = SensorNoise(quantum=0.5)
+        self.assertEqual([noise.apply(value) for value in (1.2, 1.3, -0.7)], [1, 1.5, -0.5])
+
+    def test_infinite_values_stay(self):
+        noise = SensorNoise(std_dev=2, quantum=1)
+        self.assertEqual(noise.apply(math.inf), math.inf)
+        self.assertTrue(math.isnan(noise.apply(math.nan)))
+
+    def test_latency(self):
+        noise = SensorNoise(latency=0.002, latency_jitter=0.001, seed=3)
+        noise.apply(1)
+        noise.apply_all([1, 2, 3])  # values read at once wait only once
+        self.assertEqual(len(self.clock.sleeps), 2)
+        for secs in self.clock.sleeps:
+            self.assertTrue(0.002 <= secs <= 0.003)
+
+    def test_exact_without_noise(self):
+        noise = SensorNoise()
+        self.assertEqual(noise.apply_all([1.25, -3]), [1.25, -3])
+        self.assertEqual(self.clock.sleeps, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from utils import clock
+from utils.recorder import DeviceRecorder, DeviceReplay
+
+
+class FakeDevice:
+    """Just the attribute access methods wrapped by DeviceRecorder."""
+
+    def __init__(self):
+        self.attributes = {}
+        self.written = []
+
+    def get_attr_int(self, attribute, name):
+        return attribute, self.attributes[name]
+
+    def get_attr_string(self, attribute, name):
+        return attribute, self.attributes[name]
+
+    def get_attr_line(self, attribute, name):
+        return self.get_attr_string(attribute, name)
+
+    def get_attr_set(self, attribute, name):
+        return attribute, self.attributes[name].split()
+
+    def get_attr_from_set(self, attribute, name):
+        return attribute, self.attributes[name]
+
+    def set_attr_int(self, attribute, name, value):
+        self.written.append((name, value))
+        return attribute
+
+    def set_attr_string(self, attribute, name, value):
+        self.written.append((name, value))
+        return attribute
+
+
+class DeviceReplayTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_clock = clock.get_clock()
+        clock.set_clock(clock.VirtualClock(start_time=0))
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'run.rec')
+
+    def tearDown(self):
+        clock.set_clock(self.previous_clock)
+        shutil.rmtree(self.directory)
+
+    def test_read_returns_value_recorded_last_before_same_moment(self):
+        clock.sleep(10)  # recording starts at 10, replay at 100
+        replay = DeviceReplay(10, {'motor/position': ([10, 11, 13], [1, 2, 3])}, [])
+        clock.sleep(90)
+        replay.restart()
+
+        expected = [(0, 1), (0.5, 1), (1, 2), (2.9, 2), (3, 3), (50, 3)]
+        for offset, value in expected:
+            clock.sleep(100 + offset - clock.now())
+            with self.subTest(offset=offset):
+                self.assertEqual(replay.read('motor', 'position'), value)
+
+    def test_read_before_first_record_returns_first_value(self):
+        replay = DeviceReplay(0, {'motor/position': ([2, 3], [5, 6])}, [])
+        self.assertEqual(replay.read('motor', 'position'), 5)
+
+    def test_attribute_never_read_raises(self):
+        replay = DeviceReplay(0, {'motor/position': ([], []), 'motor/speed': ([0], [1])}, [])
+        with self.assertRaises(Exception):
+            replay.read('motor', 'position')  # key defined by a write only
+        with self.assertRaises(Exception):
+            replay.read('sensor', 'value0')
+        self.assertTrue(replay.has_device('motor'))
+        self.assertFalse(replay.has_device('sensor'))
+
+    def test_recording_is_replayed(self):
+        device = FakeDevice()
+        device.attributes = {'position': 0, 'state': 'running', 'command': '[run-direct] stop'}
+        recorder = DeviceRecorder(self.path)
+        recorder.attach(device, 'motor')
+
+        self.assertEqual(device.get_attr_int(None, 'position'), (None, 0))
+        clock.sleep(1)
+        device.attributes['position'] = 42
+        device.get_attr_int(None, 'position')
+        device.get_attr_string(None, 'state')
+        device.get_attr_from_set(None, 'command')
+        device.set_attr_int(None, 'duty_cycle_sp', 30)
+        clock.sleep(1)
+        device.set_attr_string(None, 'command', 'stop')
+        recorder.close()
+        self.assertEqual(device.written, [('duty_cycle_sp', 30), ('command', 'stop')])
+
+        replay = DeviceReplay.load(self.path)
+        self.assertEqual(replay.read('motor', 'position'), 0)
+        clock.sleep(1)
+        self.assertEqual(replay.read('motor', 'position'), 42)
+        self.assertEqual(replay.read('motor', 'state'), 'running')
+        self.assertEqual(replay.read('motor', 'command:selected'), '[run-direct] stop')
+        self.assertEqual(replay.writes, [(1, 'motor/duty_cycle_sp', 30), (2, 'motor/command', 'stop')])
+
+    def test_interrupted_recording_is_loaded_up_to_last_complete_record(self):
+        device = FakeDevice()
+        device.attributes = {'position': 7}
+        recorder = DeviceRecorder(self.path)
+        recorder.attach(device, 'motor')
+        device.get_attr_int(None, 'position')
+        device.get_attr_int(None, 'position')
+        recorder.close()
+        with open(self.path, 'r+b') as fh:
+            fh.truncate(os.path.getsize(self.path) - 3)
+
+        replay = DeviceReplay.load(self.path)
+        self.assertEqual(replay.read('motor', 'position'), 7)
+
+    def test_not_a_recording(self):
+        with open(self.path, 'wb') as fh:
+            fh.write(b'something else')
+        with self.assertRaises(ValueError):
+            DeviceReplay.load(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import math
+import unittest
+
+import numpy as np
+
+from utils.scanner_service import ScanSnapshot, bin_sweep
+
+
+class BinSweepTest(unittest.TestCase):
+    def test_bins_cover_both_sides(self):
+        bin_angles, values = bin_sweep(np.empty((0, 2)), 90, 5)
+        self.assertEqual(len(bin_angles), 37)
+        self.assertEqual(bin_angles[0], -90)
+        self.assertEqual(bin_angles[18], 0)
+        self.assertEqual(bin_angles[-1], 90)
+        self.assertTrue(np.all(np.isnan(values)))  # empty sweep hits no bin
+
+    def test_bin_keeps_nearest_value(self):
+        sweep = np.array([[-10, 50], [-9, 30], [-11, 40], [0, 20], [2, 70], [3, 60]], dtype=float)
+        bin_angles, values = bin_sweep(sweep, 10, 5)
+        self.assertEqual(list(bin_angles), [-10, -5, 0, 5, 10])
+        self.assertEqual(values[0], 30)
+        self.assertTrue(math.isnan(values[1]))
+        self.assertEqual(values[2], 20)  # 2 rounds to 0
+        self.assertEqual(values[3], 60)  # 3 rounds to 5
+        self.assertTrue(math.isnan(values[4]))
+
+    def test_angles_outside_go_to_edge_bins(self):
+        sweep = np.array([[-40, 15], [25, 35]], dtype=float)
+        bin_angles, values = bin_sweep(sweep, 10, 5)
+        self.assertEqual(values[0], 15)
+        self.assertEqual(values[-1], 35)
+
+
+class ScanSnapshotTest(unittest.TestCase):
+    def setUp(self):
+        sweep = np.array([[-10, 50], [0, 20], [5, 40]], dtype=float)
+        bin_angles, values = bin_sweep(sweep, 10, 5)
+        self.snapshot = ScanSnapshot(1, 0, 1, 5, bin_angles, values, sweep, True)
+
+    def test_is_immutable(self):
+        with self.assertRaises(ValueError):
+            self.snapshot.values[0] = 0
+        with self.assertRaises(ValueError):
+            self.snapshot.sweep[0, 1] = 0
+
+    def test_value_at(self):
+        self.assertEqual(self.snapshot.value_at(-10), 50)
+        self.assertEqual(self.snapshot.value_at(1), 20)
+        self.assertEqual(self.snapshot.value_at(-30), 50)  # clamped to the edge bin
+        self.assertTrue(math.isnan(self.snapshot.value_at(10)))
+
+    def test_min_between(self):
+        self.assertEqual(self.snapshot.min_between(-10, 10), 20)
+        self.assertEqual(self.snapshot.min_between(10, 4), 40)  # order of angles doesn't matter
+        self.assertTrue(math.isnan(self.snapshot.min_between(-6, -4)))
+
+
+if __name__ == '__main__':
+    unittest.main()
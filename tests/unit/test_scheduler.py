@@ -0,0 +1,99 @@
+import time
+import unittest
+from threading import Thread
+
+from utils.scheduler import CycleScheduler, PHASE_SENSE, PHASE_REGULATE, PHASE_ACTUATE
+
+
+class CycleSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = CycleScheduler()
+
+    def tearDown(self):
+        self.scheduler.stop()
+        Thread.join(self.scheduler, 1)  # CycleScheduler.join() waits for a task
+
+    def test_order_of_tasks_due_together(self):
+        order = []
+
+        def task(name):
+            def callback():
+                order.append(name)
+                return False
+            return callback
+
+        # holding the condition keeps the scheduler from running anything before all tasks are added
+        with self.scheduler.condition:
+            tasks = [self.scheduler.add('actuate', task('actuate'), 1, PHASE_ACTUATE),
+                     self.scheduler.add('regulate low', task('regulate low'), 1, PHASE_REGULATE, priority=-1),
+                     self.scheduler.add('regulate high', task('regulate high'), 1, PHASE_REGULATE, priority=1),
+                     self.scheduler.add('sense', task('sense'), 1, PHASE_SENSE)]
+        for scheduled_task in tasks:
+            self.assertTrue(scheduled_task.join(1))
+        self.assertEqual(order, ['sense', 'regulate high', 'regulate low', 'actuate'])
+
+    def test_late_task_skips_missed_releases(self):
+        starts = []
+
+        def callback():
+            starts.append(time.monotonic())
+            if len(starts) == 1:
+                time.sleep(0.13)  # misses two releases
+            return len(starts) < 3
+
+        task = self.scheduler.add('late', callback, 0.05, budget=1)
+        self.assertTrue(task.join(2))
+        self.assertEqual(task.runs, 3)
+        self.assertEqual(task.overruns, 0)
+        self.assertEqual(task.skipped, 2)
+        # missed releases are not run in a burst, the task is back on its schedule
+        self.assertGreaterEqual(starts[1] - starts[0], 0.15 - 0.01)
+        self.assertGreaterEqual(starts[2] - starts[1], 0.05 - 0.01)
+
+    def test_overrun_of_budget_skips_next_release(self):
+        starts = []
+
+        def callback():
+            starts.append(time.monotonic())
+            time.sleep(0.02)
+            return len(starts) < 2
+
+        task = self.scheduler.add('overrun', callback, 0.1, budget=0.01)
+        self.assertTrue(task.join(2))
+        self.assertEqual(task.runs, 2)
+        self.assertEqual(task.overruns, 1)  # the last run finished the task, it is not accounted
+        self.assertEqual(task.skipped, 1)
+        self.assertGreaterEqual(starts[1] - starts[0], 0.2 - 0.01)
+
+    def test_budget_defaults_to_period(self):
+        task = self.scheduler.add('default budget', lambda: False, 0.2)
+        self.assertEqual(task.budget, 0.2)
+        self.assertTrue(task.join(1))
+
+    def test_cancel_calls_on_stop(self):
+        stopped = []
+        task = self.scheduler.add('cancelled', lambda: None, 0.01, on_stop=lambda: stopped.append(True))
+        task.cancel()
+        self.assertTrue(task.join(1))
+        self.assertEqual(stopped, [True])
+        self.assertEqual(self.scheduler.get_tasks(), [])
+
+    def test_steps_advance_once_per_run(self):
+        log = []
+
+        def steps():
+            log.append('start')
+            yield
+            for i in range(2):
+                log.append(i)
+                yield
+            log.append('end')
+
+        task = self.scheduler.add_steps('steps', steps(), 0.01)
+        self.assertTrue(task.join(1))
+        self.assertEqual(log, ['start', 0, 1, 'end'])
+        self.assertEqual(task.runs, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,109 @@
+import unittest
+
+from utils import clock
+from utils.sensor_modes import SensorModes
+
+
+class _FakeSensor:
+    """Sensor remembering every mode write."""
+
+    connected = True
+
+    def __init__(self, mode: str):
+        self._mode = mode
+        self.writes = []
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    @mode.setter
+    def mode(self, value: str):
+        self.writes.append(value)
+        self._mode = value
+
+
+class _FakeReader:
+    """Logs calls done by SensorModes to its readers."""
+
+    def __init__(self, log: list):
+        self.log = log
+
+    def pause(self):
+        self.log.append('pause')
+
+    def wait_to_pause(self):
+        self.log.append('wait_to_pause')
+
+    def reload(self):
+        self.log.append('reload')
+
+    def resume(self):
+        self.log.append('resume')
+
+
+class SensorModesTest(unittest.TestCase):
+    def setUp(self):
+        self.previous_clock = clock.get_clock()
+        clock.set_clock(clock.VirtualClock(start_time=0))
+        self.sensor = _FakeSensor('COL-REFLECT')
+        self.modes = SensorModes(self.sensor, settle_time=0.5)
+        self.log = []
+        self.modes.add_reader(_FakeReader(self.log))
+
+    def tearDown(self):
+        clock.set_clock(self.previous_clock)
+
+    def test_redundant_switch_is_not_written(self):
+        self.assertFalse(self.modes.set_mode('COL-REFLECT'))
+        self.assertEqual(self.sensor.writes, [])
+        self.assertEqual(self.modes.switches, 0)
+        self.assertEqual(self.log, [])
+
+    def test_switch_waits_for_sensor_to_settle(self):
+        self.assertTrue(self.modes.set_mode('COL-AMBIENT'))
+        self.assertEqual(self.sensor.writes, ['COL-AMBIENT'])
+        self.assertEqual(self.modes.mode, 'COL-AMBIENT')
+        self.assertEqual(self.modes.switches, 1)
+        self.assertEqual(clock.now(), 0.5)
+        self.assertFalse(self.modes.set_mode('COL-AMBIENT'))
+        self.assertEqual(self.sensor.writes, ['COL-AMBIENT'])
+
+    def test_switch_cost(self):
+        self.assertEqual(self.modes.switch_cost('COL-REFLECT'), 0)
+        self.assertEqual(self.modes.switch_cost('COL-AMBIENT'), 0.5)  # settle time until measured
+        self.modes.set_mode('COL-AMBIENT')
+        self.modes.set_mode('COL-REFLECT')
+        self.assertEqual(self.modes.switch_cost('COL-REFLECT'), 0)
+        self.assertAlmostEqual(self.modes.switch_cost('COL-AMBIENT'), 0.5)
+
+    def test_switch_pauses_and_reloads_readers(self):
+        self.modes.set_mode('COL-AMBIENT')
+        self.assertEqual(self.log, ['pause', 'wait_to_pause', 'reload', 'resume'])
+
+    def test_borrow_restores_mode(self):
+        with self.modes.borrow('COL-AMBIENT'):
+            self.assertEqual(self.modes.mode, 'COL-AMBIENT')
+            self.assertEqual(self.log, ['pause', 'wait_to_pause'])  # readers stay paused in the block
+            self.modes.set_mode('COL-COLOR')
+            self.assertEqual(self.log, ['pause', 'wait_to_pause'])
+        self.assertEqual(self.modes.mode, 'COL-REFLECT')
+        self.assertEqual(self.sensor.writes, ['COL-AMBIENT', 'COL-COLOR', 'COL-REFLECT'])
+        self.assertEqual(self.log, ['pause', 'wait_to_pause', 'reload', 'resume'])
+
+    def test_exclusive_without_switch_doesnt_reload_readers(self):
+        with self.modes.exclusive():
+            self.modes.set_mode('COL-REFLECT')
+        self.assertEqual(self.sensor.writes, [])
+        self.assertEqual(self.log, ['pause', 'wait_to_pause', 'resume'])
+
+    def test_exclusive_without_restore_keeps_mode(self):
+        with self.modes.exclusive(restore=False):
+            self.modes.set_mode('COL-AMBIENT')
+        self.assertEqual(self.modes.mode, 'COL-AMBIENT')
+        self.assertEqual(self.sensor.writes, ['COL-AMBIENT'])
+        self.assertEqual(self.log, ['pause', 'wait_to_pause', 'reload', 'resume'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+
+from utils import clock
+from utils.value_reader import ValueReader
+
+
+class _StepClock(clock.Clock):
+    """Clock standing still until the test moves it."""
+
+    def __init__(self, time: float):
+        self.time = time
+
+    def now(self) -> float:
+        return self.time
+
+
+class _FakeSensor:
+    """Sensor with one value and no bin_data, read value by value."""
+
+    connected = True
+    mode = 'TEST'
+    num_values = 1
+
+    def __init__(self):
+        self.reading = 0
+
+    def value(self, n=0):
+        return self.reading
+
+
+class ValueReaderHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self._clock = clock.get_clock()
+        self.clock = _StepClock(100)
+        clock.set_clock(self.clock)
+        self.sensor = _FakeSensor()
+        self.reader = ValueReader(self.sensor, capacity=4)
+
+    def tearDown(self):
+        self.reader.stop()
+        clock.set_clock(self._clock)
+
+    def add_samples(self, *samples):
+        for time, reading in samples:
+            self.clock.time = time
+            self.sensor.reading = reading
+            self.reader.poll()
+
+    def test_empty(self):
+        self.assertEqual(self.reader.since(0), [])
+        self.assertIsNone(self.reader.value_at(100))
+
+    def test_since(self):
+        self.add_samples((101, 10), (102, 20), (103, 30))
+        self.assertEqual(self.reader.since(0), [(101, [10]), (102, [20]), (103, [30])])
+        self.assertEqual(self.reader.since(101.5), [(102, [20]), (103, [30])])
+        self.assertEqual(self.reader.since(102), [(103, [30])])  # sample taken exactly at timestamp is excluded
+        self.assertEqual(self.reader.since(103), [])
+
+    def test_since_keeps_only_capacity(self):
+        self.add_samples((101, 10), (102, 20), (103, 30), (104, 40), (105, 50), (106, 60))
+        self.assertEqual(self.reader.since(0), [(103, [30]), (104, [40]), (105, [50]), (106, [60])])
+        self.assertEqual(self.reader.since(104.5), [(105, [50]), (106, [60])])
+
+    def test_value_at(self):
+        self.add_samples((101, 10), (102, 20), (104, 0))
+        self.assertEqual(self.reader.value_at(101), 10)
+        self.assertEqual(self.reader.value_at(101.25), 12.5)
+        self.assertEqual(self.reader.value_at(102), 20)
+        self.assertEqual(self.reader.value_at(103.5), 5)
+
+    def test_value_at_out_of_history(self):
+        self.add_samples((101, 10), (102, 20), (103, 30), (104, 40), (105, 50))
+        self.assertEqual(self.reader.value_at(90), 20)  # the oldest sample still kept
+        self.assertEqual(self.reader.value_at(110), 50)  # the latest sample
+
+
+if __name__ == '__main__':
+    unittest.main()
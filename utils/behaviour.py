@@ -1,7 +1,8 @@
 import threading
-import time
 
+from . import clock
 from .robot_program import RobotProgramController
+from .scheduler import get_scheduler
 
 
 class Behaviour:
@@ -14,6 +15,10 @@ class Behaviour:
     def should_take_control(self) -> bool:
         pass
 
+    def keeps_control(self) -> bool:
+        """Behaviour in the middle of something keeps control, other behaviours are not asked meanwhile."""
+        return False
+
     def handle_loop(self):
         pass
 
@@ -36,7 +41,9 @@ class Behaviours:
         return None
 
     def handle_loop(self):
-        behaviour = self._select_new_behaviour()
+        behaviour = self.last_behaviour
+        if behaviour is None or not behaviour.keeps_control():
+            behaviour = self._select_new_behaviour()
         if behaviour != self.last_behaviour:
             if self.last_behaviour is not None:
                 self.last_behaviour.on_loose_control()
@@ -64,25 +71,40 @@ class MultiBehaviour(Behaviours):
                 return False
             return True
 
+    def keeps_control(self) -> bool:
+        last_behaviour = self.last_behaviour
+        return last_behaviour is not None and last_behaviour.keeps_control()
+
 
 class BehaviourController(RobotProgramController, Behaviours):
-    def __init__(self, robot_program, behaviours):
+    """
+    Selects behaviour in control every cycle_time on the shared scheduler. Behaviours run their own
+    cycles as scheduler tasks too, so handle_loop() of a behaviour must not block.
+    """
+
+    def __init__(self, robot_program, behaviours, cycle_time: float = 0.05):
         RobotProgramController.__init__(self, robot_program)
         Behaviours.__init__(self, behaviours)
 
+        self.cycle_time = cycle_time
         self.stop = False
         self.thread = threading.Thread(target=self._run, daemon=True)
-        self.thread.start()
+        clock.start_thread(self.thread)
 
     def on_start(self):
         pass
 
     def _run(self):
         self.on_start()
-        while not self.stop_loop():
-            self.handle_loop()
+        get_scheduler().add('Behaviours', self._cycle, self.cycle_time, budget=self.cycle_time / 2,
+                            on_stop=self.force_loose_control).join()
         self.on_exit()
 
+    def _cycle(self):
+        if self.stop_loop():
+            return False
+        self.handle_loop()
+
     def on_exit(self):
         pass
 
@@ -93,5 +115,4 @@ class BehaviourController(RobotProgramController, Behaviours):
         self.stop = True
 
     def wait_to_exit(self):
-        while self.thread.is_alive():
-            time.sleep(0.1)
+        clock.join(self.thread)
@@ -0,0 +1,56 @@
+import struct
+
+from ev3dev.auto import Sensor
+
+from .device_info import device_info
+
+# struct format of one value for every bin_data_format of ev3dev sensors
+BIN_DATA_FORMATS = {
+    'u8': '<B',
+    's8': '<b',
+    'u16': '<H',
+    's16': '<h',
+    's16_be': '>h',
+    's32': '<i',
+    'float': '<f'
+}
+
+
+def bin_data_struct(bin_data_format: str, num_values: int) -> struct.Struct:
+    """Struct decoding num_values values of sensor in bin_data_format from bin_data."""
+    value_format = BIN_DATA_FORMATS[bin_data_format]
+    return struct.Struct(value_format[0] + value_format[1] * num_values)
+
+
+class BulkReader:
+    """
+    Reads all values of sensor at once from its bin_data attribute, instead of reading
+    value0, value1, ... one by one. Call reload() whenever mode of the sensor changes.
+
+    Sensors not providing bin_data are read value by value.
+    """
+
+    def __init__(self, sensor: Sensor):
+        self._sensor = sensor
+        self._struct = None
+        self.num_values = 0
+        self.is_float = False
+        self.reload()
+
+    def reload(self):
+        info = device_info(self._sensor)
+        self.num_values = info.num_values
+        try:
+            bin_data_format = info.bin_data_format
+            self._struct = bin_data_struct(bin_data_format, self.num_values)
+            self.is_float = bin_data_format == 'float'
+            # ev3dev computes size of bin_data only once, but it changes with the mode
+            self._sensor._bin_data_size = self._struct.size
+        except Exception:
+            self._struct = None
+            self.is_float = False
+
+    def values(self) -> list:
+        if self._struct is None:
+            return [self._sensor.value(n) for n in range(self.num_values)]
+        return list(self._struct.unpack(self._sensor.bin_data()))
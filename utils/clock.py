@@ -0,0 +1,303 @@
+import time
+from threading import Condition, Lock, Thread, current_thread
+
+
+class Clock:
+    """Real time clock, simply delegates to the time module."""
+
+    def now(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, secs: float):
+        if secs > 0:
+            time.sleep(secs)
+
+    def wait_for(self, predicate, timeout: float = None, condition: Condition = None,
+                 poll_interval: float = 0.01) -> bool:
+        """
+        Wait until predicate returns True or timeout passes, returns the last result of predicate.
+        If the condition is given, it must be notified whenever result of predicate can change,
+        otherwise predicate is checked every poll_interval seconds.
+        """
+        if condition is not None:
+            with condition:
+                return condition.wait_for(predicate, timeout)
+
+        end_time = self.now() + timeout if timeout is not None else None
+        result = predicate()
+        while not result:
+            if end_time is not None:
+                remaining = end_time - self.now()
+                if remaining <= 0:
+                    break
+                self.sleep(min(poll_interval, remaining))
+            else:
+                self.sleep(poll_interval)
+            result = predicate()
+        return result
+
+    def start_thread(self, thread: Thread):
+        """Start thread, use instead of thread.start() for threads working with the clock (see VirtualClock)."""
+        thread.start()
+
+    def join(self, thread: Thread, timeout: float = None) -> bool:
+        """Wait until thread ends or timeout passes, returns False if the thread is still alive."""
+        thread.join(timeout)
+        return not thread.is_alive()
+
+    def leave(self):
+        """Current thread won't work with the clock anymore (see VirtualClock)."""
+        pass
+
+
+class RLock:
+    """
+    Re-entrant lock waiting on the clock, so the owner may sleep on the clock while holding it.
+    Threads participating in VirtualClock must not wait on a plain lock held by a sleeping thread.
+    """
+
+    def __init__(self):
+        self._condition = Condition()
+        self._owner = None
+        self._count = 0
+
+    def acquire(self):
+        thread = current_thread()
+        while True:
+            with self._condition:
+                if self._owner is None or self._owner is thread:
+                    self._owner = thread
+                    self._count += 1
+                    return
+            wait_for(lambda: self._owner is None, None, self._condition)
+
+    def release(self):
+        with self._condition:
+            if self._owner is not current_thread():
+                raise RuntimeError('cannot release un-acquired lock')
+            self._count -= 1
+            if self._count == 0:
+                self._owner = None
+                self._condition.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class _Participant:
+    def __init__(self, thread, condition: Condition):
+        self.thread = thread
+        self.condition = condition  # notified when the participant gets its turn
+        self.deadline = None  # None while the participant runs
+        self.predicate = None
+        self.ticket = 0
+
+
+class VirtualClock(Clock):
+    """
+    Clock whose time only moves when every participating thread waits for it.
+
+    Participants run one at a time: the running one keeps the turn until it sleeps
+    or waits (on this clock), then the turn goes to the participant that has been
+    ready for the longest time. Once no participant is ready, the time jumps straight
+    to the nearest wake up time. So simulated runs execute as fast as the CPU allows
+    and, as long as only participants drive them, always take the same course.
+
+    The thread creating the clock participates, threads started by start_thread() too.
+    Other threads using the clock only observe it, the time doesn't wait for them.
+    Participants must never block on anything else than this clock (see join() and
+    RLock), it would stop the time and every other participant.
+    """
+
+    def __init__(self, start_time: float = None, poll_interval: float = 0.02):
+        self._time = start_time if start_time is not None else time.time()
+        self._start_time = self._time
+        self._poll_interval = poll_interval  # only used when nothing else than other threads can wake anyone
+        self._lock = Lock()
+        self._observers = Condition(self._lock)
+        self._observer_deadlines = {}
+        self._participants = {}
+        self._tickets = 0
+        self._running = self._add(current_thread())  # the creating thread has the turn
+        self._running.deadline = None
+
+    def now(self) -> float:
+        return self._time
+
+    def monotonic(self) -> float:
+        return self._time - self._start_time
+
+    def sleep(self, secs: float):
+        self.wait_for(lambda: False, max(secs, 0))  # even zero lets other ready participants run
+
+    def wait_for(self, predicate, timeout: float = None, condition: Condition = None,
+                 poll_interval: float = 0.01) -> bool:
+        """
+        Waiting participant counts as sleeping until the timeout, so the time keeps moving.
+        Predicate is checked whenever a participant waits and whenever the time moves,
+        condition and poll_interval are not needed. Predicate is called by other threads too,
+        it must be cheap and must not block.
+        """
+        with self._lock:
+            deadline = self._time + max(timeout, 0) if timeout is not None else float('inf')
+            participant = self._participants.get(current_thread())
+            if participant is None:
+                return self._observe(predicate, deadline)
+            result = predicate()
+            if not result:
+                self._wait_turn(participant, deadline, predicate)
+                result = predicate()
+            return result
+
+    def start_thread(self, thread: Thread):
+        """Start thread as a participant, it runs only when it gets its turn."""
+        with self._lock:
+            participant = self._add(thread)
+        run = thread.run
+
+        def run_participant():
+            with self._lock:
+                self._await_turn(participant)
+            try:
+                run()
+            finally:
+                self._remove(thread)
+
+        thread.run = run_participant
+        thread.start()
+        with self._lock:
+            if self._running is None:
+                self._pass_turn()
+
+    def join(self, thread: Thread, timeout: float = None) -> bool:
+        if thread in self._participants:
+            return self.wait_for(lambda: thread not in self._participants, timeout)
+        return self.wait_for(lambda: not thread.is_alive(), timeout)
+
+    def leave(self):
+        self._remove(current_thread())
+
+    def _add(self, thread: Thread) -> _Participant:
+        participant = _Participant(thread, Condition(self._lock))
+        participant.deadline = self._time  # ready to run
+        participant.ticket = self._next_ticket()
+        self._participants[thread] = participant
+        return participant
+
+    def _remove(self, thread: Thread):
+        with self._lock:
+            participant = self._participants.pop(thread, None)
+            if participant is not None and self._running is participant:
+                self._running = None
+                self._pass_turn()
+
+    def _next_ticket(self) -> int:
+        self._tickets += 1
+        return self._tickets
+
+    def _wait_turn(self, participant: _Participant, deadline: float, predicate):
+        participant.deadline = deadline
+        participant.predicate = predicate
+        participant.ticket = self._next_ticket()
+        if self._running is participant:
+            self._running = None
+            self._pass_turn()
+        self._await_turn(participant)
+
+    def _await_turn(self, participant: _Participant):
+        while self._running is not participant:
+            if self._running is None:
+                # stalled, only threads not participating can change that, check for it from time to time
+                participant.condition.wait(self._poll_interval)
+                if self._running is None:
+                    self._pass_turn()
+            else:
+                participant.condition.wait()
+        participant.deadline = None
+        participant.predicate = None
+
+    def _observe(self, predicate, deadline: float) -> bool:
+        key = object()
+        self._observer_deadlines[key] = deadline
+        try:
+            result = predicate()
+            while not result and self._time < deadline:
+                if self._running is None:
+                    self._pass_turn()
+                    if self._time >= deadline:
+                        break
+                self._observers.wait(self._poll_interval)
+                result = predicate()
+            return result
+        finally:
+            del self._observer_deadlines[key]
+
+    def _pass_turn(self):
+        while True:
+            ready = None
+            for participant in self._participants.values():
+                if participant.deadline is None:
+                    continue
+                if participant.deadline <= self._time or \
+                        (participant.predicate is not None and participant.predicate()):
+                    if ready is None or participant.ticket < ready.ticket:
+                        ready = participant
+            if ready is not None:
+                self._running = ready
+                ready.condition.notify()
+                return
+
+            deadlines = [participant.deadline for participant in self._participants.values()]
+            deadlines.extend(self._observer_deadlines.values())
+            next_time = min((deadline for deadline in deadlines if deadline > self._time), default=float('inf'))
+            if next_time == float('inf'):
+                return  # nobody will wake up unless some other thread changes something
+            self._time = next_time
+            self._observers.notify_all()
+
+
+_CLOCK = Clock()
+
+
+def get_clock() -> Clock:
+    return _CLOCK
+
+
+def set_clock(clock: Clock):
+    global _CLOCK
+    _CLOCK = clock
+
+
+def now() -> float:
+    return _CLOCK.now()
+
+
+def monotonic() -> float:
+    return _CLOCK.monotonic()
+
+
+def sleep(secs: float):
+    _CLOCK.sleep(secs)
+
+
+def wait_for(predicate, timeout: float = None, condition: Condition = None, poll_interval: float = 0.01) -> bool:
+    return _CLOCK.wait_for(predicate, timeout, condition, poll_interval)
+
+
+def start_thread(thread: Thread):
+    _CLOCK.start_thread(thread)
+
+
+def join(thread: Thread, timeout: float = None) -> bool:
+    return _CLOCK.join(thread, timeout)
+
+
+def leave():
+    _CLOCK.leave()
@@ -1,10 +1,14 @@
-import time
 from threading import Thread
 
-from .utils import wait_to_cycle_time
+from . import clock
+from .scheduler import CycleScheduler, PHASE_REGULATE, get_scheduler
 
 
 class Action:
+    def update(self):
+        """Read inputs of the action for the current cycle, called before anything else in the cycle."""
+        pass
+
     def actual_progress(self) -> float:
         pass
 
@@ -19,40 +23,52 @@ class Action:
 
 
 class Coordinator:
+    """
+    Keeps progress of actions in sync. Every cycle each action gets its progress error:
+    mean progress of all the other actions minus its own progress (actions without progress are ignored).
+
+    The mean of the others is computed from sum of all progresses, so the cycle is linear in number of actions,
+    buffers for the progresses are allocated only once.
+    """
+
     def __init__(self, actions):
         self._actions = actions
-        self._start_time = time.time()
+        self._actual = [None] * len(actions)
+        self._start_time = clock.now()
 
     def on_start(self):
         for action in self._actions:
             action.on_start()
 
-        self._start_time = time.time()
+        self._start_time = clock.now()
+
+    def update(self):
+        for action in self._actions:
+            action.update()
 
     def handle_loop(self):
-        if len(self._actions) == 0:
+        actions = self._actions
+        if len(actions) == 0:
             return
 
-        actual = []
-        for action in self._actions:
-            actual.append(action.actual_progress())
-
-        target = []
-        for i in range(len(self._actions)):
-            total = 0
-            count = 0
-            for j in range(len(actual)):
-                if j == i or actual[j] is None:
-                    continue
-                total += actual[j]
+        actual = self._actual
+        total = 0
+        count = 0
+        for i, action in enumerate(actions):
+            progress = action.actual_progress()
+            actual[i] = progress
+            if progress is not None:
+                total += progress
                 count += 1
-            target.append(total / count if count != 0 else None)
 
-        loop_time = time.time()
-        elapsed_time = loop_time - self._start_time
-        for i in range(len(self._actions)):
-            diff = target[i] - actual[i] if target[i] is not None and actual[i] is not None else 0
-            self._actions[i].handle_loop(elapsed_time, diff)
+        elapsed_time = clock.now() - self._start_time
+        others = count - 1
+        for i, action in enumerate(actions):
+            progress = actual[i]
+            if progress is None or others == 0:
+                action.handle_loop(elapsed_time, 0)
+            else:
+                action.handle_loop(elapsed_time, (total - progress) / others - progress)
 
     def on_stop(self):
         for action in self._actions:
@@ -67,7 +83,10 @@ class ThreadCoordinator(Thread, Coordinator):
 
     def run(self):
         self.on_start()
-        while not self._is_stop_loop():
+        while True:
+            self.update()
+            if self._is_stop_loop():
+                break
             self.handle_loop()
         self.on_stop()
 
@@ -78,16 +97,50 @@ class ThreadCoordinator(Thread, Coordinator):
         self._request_stop = True
 
 
-class CycleThreadCoordinator(ThreadCoordinator):
-    def __init__(self, actions, cycle_time=0.01):
-        ThreadCoordinator.__init__(self, actions)
+class CycleCoordinator(Coordinator):
+    """
+    Coordinator running one cycle every cycle_time seconds as a task of CycleScheduler.
+    Mimics interface of ThreadCoordinator (start, stop, is_alive, join), but doesn't need its own thread.
+    """
+
+    def __init__(self, actions, cycle_time=0.01, name='Coordinator', scheduler: CycleScheduler = None):
+        Coordinator.__init__(self, actions)
         self._cycle_time = cycle_time
-        self._last_time = self._start_time
+        self._name = name
+        self._scheduler = scheduler
+        self._task = None
+        self._started = False
+        self._request_stop = False
 
-    def on_start(self):
-        ThreadCoordinator.on_start(self)
-        self._last_time = self._start_time
+    def start(self):
+        scheduler = self._scheduler if self._scheduler is not None else get_scheduler()
+        self._task = scheduler.add(self._name, self._cycle, self._cycle_time, PHASE_REGULATE,
+                                   budget=self._cycle_time, on_stop=self._on_task_stop)
 
-    def handle_loop(self):
-        ThreadCoordinator.handle_loop(self)
-        self._last_time = wait_to_cycle_time(__name__, self._last_time, self._cycle_time)
+    def _cycle(self):
+        if not self._started:
+            self._started = True
+            self.on_start()
+        self.update()
+        if self._is_stop_loop():
+            return False
+        self.handle_loop()
+
+    def _on_task_stop(self):
+        if self._started:
+            self.on_stop()
+
+    def _is_stop_loop(self):
+        return self._request_stop
+
+    def stop(self):
+        self._request_stop = True
+        if self._task is not None:
+            self._task.cancel()
+
+    def is_alive(self):
+        return self._task is not None and self._task.is_alive()
+
+    def join(self, timeout=None):
+        if self._task is not None:
+            self._task.join(timeout)
@@ -0,0 +1,148 @@
+from array import array
+from bisect import bisect_left
+from threading import Lock
+
+# upper edges of histogram bins in seconds, ten bins per decade from 10 us to 10 s, last bin takes the rest
+HISTOGRAM_EDGES = [1e-5 * 10 ** (i / 10) for i in range(61)]
+
+
+class Histogram:
+    """
+    Histogram of durations with fixed logarithmic bins (HISTOGRAM_EDGES).
+
+    Adding a value is just a bisect and a few increments, so it is cheap enough for every cycle.
+    There must be only one thread adding values, reading is possible from any thread without locking
+    (a reader may see a value counted in count, but not in its bin yet, which doesn't matter for statistics).
+    """
+
+    def __init__(self):
+        self.counts = array('L', [0]) * (len(HISTOGRAM_EDGES) + 1)
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.counts[bisect_left(HISTOGRAM_EDGES, value)] += 1
+        self.count += 1
+        self.total += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def percentile(self, percent: float) -> float:
+        """Upper edge of bin containing given percentile, None if the histogram is empty."""
+        if self.count == 0:
+            return None
+        limit = self.count * percent / 100
+        total = 0
+        for i, count in enumerate(self.counts):
+            total += count
+            if total >= limit and count > 0:
+                return HISTOGRAM_EDGES[i] if i < len(HISTOGRAM_EDGES) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'avg': self.total / self.count if self.count else None,
+            'min': self.min,
+            'max': self.max,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'bins': [[HISTOGRAM_EDGES[i] if i < len(HISTOGRAM_EDGES) else None, count]
+                     for i, count in enumerate(self.counts) if count > 0]
+        }
+
+
+class _CycleData:
+    """Everything CycleStats collects, replaced as one object on reset."""
+
+    def __init__(self):
+        self.period = Histogram()
+        self.exec_time = Histogram()
+        self.jitter = Histogram()
+        self.cycles = 0
+        self.overruns = 0
+        self.target_period = None
+        self.last_start = None
+
+
+class CycleStats:
+    """
+    Timing statistics of one named control cycle: histograms of period (start to start),
+    execution time, jitter (how late the cycle started against its schedule) and count of overruns
+    (cycles that didn't fit into their target period). Updated only by the thread running the cycle.
+
+    reset() may be called from any thread, collected data are swapped for new ones at once
+    (a cycle being added just then is counted to the dropped data).
+
+    wake_time is the time the current cycle started, kept for wait_to_cycle_time().
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.wake_time = None
+        self._data = _CycleData()
+
+    def reset(self):
+        self._data = _CycleData()
+
+    def stop(self):
+        """Cycle stopped running, time until it runs again is not a period. Called by the thread running the cycle."""
+        self._data.last_start = None
+        self.wake_time = None
+
+    def add(self, start_time: float, exec_time: float, jitter: float, target_period: float, overrun: bool):
+        data = self._data
+        if data.last_start is not None:
+            data.period.add(start_time - data.last_start)
+        data.last_start = start_time
+        data.exec_time.add(exec_time)
+        data.jitter.add(max(jitter, 0))
+        data.target_period = target_period
+        data.cycles += 1
+        if overrun:
+            data.overruns += 1
+
+    def to_dict(self) -> dict:
+        data = self._data
+        period_avg = data.period.total / data.period.count if data.period.count else None
+        return {
+            'cycles': data.cycles,
+            'overruns': data.overruns,
+            'target_period': data.target_period,
+            'duty': data.exec_time.total / data.exec_time.count / period_avg
+            if period_avg and data.exec_time.count else None,
+            'period': data.period.to_dict(),
+            'exec_time': data.exec_time.to_dict(),
+            'jitter': data.jitter.to_dict()
+        }
+
+
+_CYCLES_STATS = {}
+_CYCLES_STATS_LOCK = Lock()
+
+
+def cycle_stats(name: str) -> CycleStats:
+    """Statistics of cycle with given name, created on the first use."""
+    stats = _CYCLES_STATS.get(name)
+    if stats is None:
+        with _CYCLES_STATS_LOCK:
+            stats = _CYCLES_STATS.get(name)
+            if stats is None:
+                stats = _CYCLES_STATS[name] = CycleStats(name)
+    return stats
+
+
+def get_cycles_stats() -> dict:
+    """Statistics of all cycles as dict (name -> CycleStats.to_dict())."""
+    return {name: stats.to_dict() for name, stats in list(_CYCLES_STATS.items())}
+
+
+def reset_cycles_stats():
+    """Start collecting statistics of all cycles from scratch."""
+    for stats in list(_CYCLES_STATS.values()):
+        stats.reset()
@@ -0,0 +1,90 @@
+import weakref
+
+from ev3dev.auto import Device, Motor, Sensor
+
+# attributes that never change while the device is connected
+MOTOR_STATIC_ATTRIBUTES = ('address', 'driver_name', 'commands', 'stop_actions', 'count_per_rot', 'max_speed')
+SENSOR_STATIC_ATTRIBUTES = ('address', 'driver_name', 'commands', 'modes')
+# attributes that change only together with mode of the sensor
+SENSOR_MODE_ATTRIBUTES = ('num_values', 'bin_data_format', 'decimals', 'units')
+
+
+class DeviceInfo:
+    """
+    Static attributes of device, each one is read from the device only once.
+
+    Attributes depending on mode of sensor are kept until invalidate_mode() is called,
+    which must happen whenever the mode changes (ValueReader.mode() does it).
+    """
+
+    def __init__(self, device: Device):
+        self._device = device
+        self._static = {}
+        self._mode = {}
+
+    def get(self, name: str):
+        cache = self._mode if name in SENSOR_MODE_ATTRIBUTES else self._static
+        try:
+            return cache[name]
+        except KeyError:
+            value = getattr(self._device, name)
+            cache[name] = value
+            return value
+
+    def fill(self):
+        """Read all known attributes of the device at once, attributes the device doesn't have are skipped."""
+        if not self._device.connected:
+            return
+        if isinstance(self._device, Motor):
+            names = MOTOR_STATIC_ATTRIBUTES
+        elif isinstance(self._device, Sensor):
+            names = SENSOR_STATIC_ATTRIBUTES + SENSOR_MODE_ATTRIBUTES
+        else:
+            names = ('address', 'driver_name')
+        for name in names:
+            try:
+                self.get(name)
+            except Exception:
+                pass
+
+    def invalidate_mode(self):
+        self._mode.clear()
+
+    @property
+    def address(self) -> str:
+        return self.get('address')
+
+    @property
+    def driver_name(self) -> str:
+        return self.get('driver_name')
+
+    @property
+    def commands(self) -> list:
+        return self.get('commands')
+
+    @property
+    def count_per_rot(self) -> int:
+        return self.get('count_per_rot')
+
+    @property
+    def max_speed(self) -> int:
+        return self.get('max_speed')
+
+    @property
+    def num_values(self) -> int:
+        return self.get('num_values')
+
+    @property
+    def bin_data_format(self) -> str:
+        return self.get('bin_data_format')
+
+
+_DEVICES_INFO = weakref.WeakKeyDictionary()
+
+
+def device_info(device: Device) -> DeviceInfo:
+    """Shared DeviceInfo of the device."""
+    info = _DEVICES_INFO.get(device)
+    if info is None:
+        info = _DEVICES_INFO[device] = DeviceInfo(device)
+    return info
@@ -1,78 +1,87 @@
-import time
+from array import array
 
+import numpy as np
 from ev3dev.auto import Motor, InfraredSensor, UltrasonicSensor
 
+from utils import clock
+from utils.device_info import device_info
+from utils.motor_io import MotorReader
+from utils.sensor_modes import sensor_modes
+from utils.sensor_poller import SensorPoller
 from utils.value_reader import ValueReader
 
 
 class DistanceScannerPropulsion:
     def __init__(self, motor: Motor, gear_ratio: float):
         self.motor = motor
+        self.info = device_info(motor)
+        self.reader = MotorReader(motor)
         self.connected = motor.connected
 
         self.gear_ratio = gear_ratio
-        self.motor_tacho_ratio = motor.count_per_rot / 360 if motor.connected else 1
+        self.motor_tacho_ratio = self.info.count_per_rot / 360 if motor.connected else 1
         self.total_ratio = self.gear_ratio * self.motor_tacho_ratio
 
     def reset(self):
         if not self.connected:
             return
+        max_speed = self.info.max_speed
         self.motor.stop_action = Motor.STOP_ACTION_BRAKE
-        self.rotate_to_pos(0, speed=self.motor.max_speed / 10)
+        self.rotate_to_pos(0, speed=max_speed / 10)
         self.wait_to_stop()
-        self.rotate_to_pos(0, speed=self.motor.max_speed / 10)
+        self.rotate_to_pos(0, speed=max_speed / 10)
         self.wait_to_stop()
         self.motor.reset()
         self.motor.stop_action = Motor.STOP_ACTION_BRAKE
-        self.motor.ramp_up_sp = self.motor.max_speed / 2
-        self.motor.ramp_down_sp = self.motor.max_speed / 2
+        self.motor.ramp_up_sp = max_speed / 2
+        self.motor.ramp_down_sp = max_speed / 2
 
     @property
     def is_running(self):
-        return Motor.STATE_RUNNING in self.motor.state
+        return self.reader.is_running()
 
     def angle_get(self):
-        return self.motor.position / self.total_ratio
+        return self.reader.position() / self.total_ratio
 
     def rotate_to_pos(self, angle, speed=None):  # TODO: own regulator and method as target
-        self.motor.run_to_abs_pos(speed_sp=self.motor.max_speed if speed is None else speed * self.total_ratio,
+        self.motor.run_to_abs_pos(speed_sp=self.info.max_speed if speed is None else speed * self.total_ratio,
                                   position_sp=angle * self.total_ratio)
 
     def repeat_while_running(self, method):
         while self.is_running:
             method()
 
-    def wait_to_stop(self):
-        self.repeat_while_running(lambda: time.sleep(0.05))
+    def wait_to_stop(self, timeout: float = None) -> bool:
+        return self.reader.wait_while_running(timeout)
 
 
 class DistanceScannerHead:
-    def __init__(self, ir_sensor=None, ultrasonic_sensor=None):
+    def __init__(self, ir_sensor=None, ultrasonic_sensor=None, poller: SensorPoller = None, rate: float = 20,
+                 priority: int = 0):
         if ir_sensor is None:
             ir_sensor = InfraredSensor()
         if ultrasonic_sensor is None:
             ultrasonic_sensor = UltrasonicSensor()
 
         if ultrasonic_sensor.connected:
-            ultrasonic_sensor.mode = UltrasonicSensor.MODE_US_DIST_CM
+            sensor_modes(ultrasonic_sensor).set_mode(UltrasonicSensor.MODE_US_DIST_CM)
             self.distance_sensor = ultrasonic_sensor
-            self.value_reader = ValueReader(ultrasonic_sensor)
+            self.value_reader = ValueReader(ultrasonic_sensor, poller, rate, priority, 'distance')
 
             def reset():
-                self.distance_sensor.mode = UltrasonicSensor.MODE_US_DIST_CM
-                self.value_reader.reload()
+                self.value_reader.mode(UltrasonicSensor.MODE_US_DIST_CM)
 
             self.has_distance_sensor = True
-            self.max_distance = 255 if ultrasonic_sensor.driver_name is not 'lego-ev3-us' else 2550
-            self.to_cm_mul = 1 if ultrasonic_sensor.driver_name is not 'lego-ev3-us' else 0.1
+            is_ev3_sensor = device_info(ultrasonic_sensor).driver_name == 'lego-ev3-us'
+            self.max_distance = 2550 if is_ev3_sensor else 255
+            self.to_cm_mul = 0.1 if is_ev3_sensor else 1
         elif ir_sensor.connected:
-            ir_sensor.mode = InfraredSensor.MODE_IR_PROX
+            sensor_modes(ir_sensor).set_mode(InfraredSensor.MODE_IR_PROX)
             self.distance_sensor = ir_sensor
-            self.value_reader = ValueReader(ir_sensor)
+            self.value_reader = ValueReader(ir_sensor, poller, rate, priority, 'distance')
 
             def reset():
-                self.distance_sensor.mode = InfraredSensor.MODE_IR_PROX
-                self.value_reader.reload()
+                self.value_reader.mode(InfraredSensor.MODE_IR_PROX)
 
             self.has_distance_sensor = True
             self.max_distance = 100
@@ -143,8 +152,46 @@ class DistanceScanner:
             self.wait_to_scanner_stop()
         return self.value_get(percent, True)
 
-    def value_scan_continuous(self, to_angle, value_handler, percent=True):
+    def sweep(self, to_angle, percent=True, value_handler=None) -> np.ndarray:
+        """
+        Rotate scanner to to_angle while measuring distances, returns array of rows (angle, value).
+
+        Every distance reading is tagged by the time it was taken and the scanner angle at that
+        time is interpolated from encoder readings taken between the distance readings,
+        so the values are not smeared by the rotation of the scanner.
+
+        value_handler(value, angle) is called right after each reading, with the angle estimated
+        from the encoder readings around it, for consumers which can't wait for the whole sweep.
+        """
+        encoder_times = array('d')
+        encoder_angles = array('d')
+        value_times = array('d')
+        values = array('d')
+
+        def read_encoder():
+            start_time = clock.now()
+            angle = self.angle_get()
+            encoder_times.append((start_time + clock.now()) / 2)
+            encoder_angles.append(angle)
+
         self.rotate_scanner_to_pos(to_angle)
         self._scanner_head.value_reader.pause()
-        self.repeat_while_scanner_running(lambda: value_handler(self.value_get(percent, True), self.angle_get()))
-        self._scanner_head.value_reader.resume()
+        try:
+            read_encoder()
+            while self.is_running:
+                start_time = clock.now()
+                value = self.value_get(percent, True)
+                value_times.append((start_time + clock.now()) / 2)
+                values.append(value)
+                read_encoder()
+                if value_handler is not None:
+                    value_handler(value, (encoder_angles[-2] + encoder_angles[-1]) / 2)
+        finally:
+            self._scanner_head.value_reader.resume()
+
+        angles = np.interp(np.frombuffer(value_times), np.frombuffer(encoder_times), np.frombuffer(encoder_angles))
+        return np.column_stack((angles, np.frombuffer(values)))
+
+    def value_scan_continuous(self, to_angle, value_handler, percent=True):
+        for angle, value in self.sweep(to_angle, percent):
+            value_handler(value, angle)
@@ -0,0 +1,123 @@
+import math
+from bisect import bisect_right
+
+
+class MotionProfile:
+    """
+    Rest to rest move over distance planned ahead of time, sampled by time from start of the move.
+
+    Profile consists of segments with constant jerk, state at start of each segment is integrated once
+    when the profile is built, so sample() is a bisect and one polynomial evaluation.
+    Negative distance gives mirrored profile (all samples negated).
+    """
+
+    def __init__(self, distance: float, segments: list):
+        """segments: list of (duration, start_acceleration, jerk) of move over abs(distance)"""
+        self.distance = distance
+        self._sign = -1 if distance < 0 else 1
+
+        self._start_times = []
+        self._states = []
+        time = position = speed = 0
+        self.peak_speed = 0
+        for duration, acceleration, jerk in segments:
+            if duration <= 0:
+                continue
+            self._start_times.append(time)
+            self._states.append((position, speed, acceleration, jerk))
+            position += speed * duration + acceleration * duration ** 2 / 2 + jerk * duration ** 3 / 6
+            speed += acceleration * duration + jerk * duration ** 2 / 2
+            time += duration
+            self.peak_speed = max(self.peak_speed, speed)
+        self.duration = time
+
+    def sample(self, time: float) -> tuple:
+        """Planned (position, speed, acceleration) at time."""
+        if time >= self.duration:
+            return self.distance, 0, 0
+        if time <= 0:
+            return 0, 0, 0
+
+        index = bisect_right(self._start_times, time) - 1
+        position, speed, acceleration, jerk = self._states[index]
+        time -= self._start_times[index]
+        sign = self._sign
+        return (sign * (position + speed * time + acceleration * time ** 2 / 2 + jerk * time ** 3 / 6),
+                sign * (speed + acceleration * time + jerk * time ** 2 / 2),
+                sign * (acceleration + jerk * time))
+
+    def position(self, time: float) -> float:
+        return self.sample(time)[0]
+
+    def speed(self, time: float) -> float:
+        return self.sample(time)[1]
+
+
+def _validate_limits(*limits):
+    for limit in limits:
+        if limit is None or limit <= 0:
+            raise ValueError('Motion limits must be positive, got {}'.format(limits))
+
+
+def plan_trapezoidal(distance: float, max_speed: float, max_acceleration: float) -> MotionProfile:
+    """Profile with constant acceleration up to max_speed, cruise and symmetric deceleration."""
+    _validate_limits(max_speed, max_acceleration)
+    length = abs(distance)
+    speed = max_speed
+    if speed * speed / max_acceleration > length:
+        speed = math.sqrt(length * max_acceleration)  # triangle, max_speed is never reached
+
+    acceleration_time = speed / max_acceleration
+    cruise_time = (length - speed * acceleration_time) / speed if speed > 0 else 0
+    return MotionProfile(distance, [
+        (acceleration_time, max_acceleration, 0),
+        (cruise_time, 0, 0),
+        (acceleration_time, -max_acceleration, 0),
+    ])
+
+
+def plan_s_curve(distance: float, max_speed: float, max_acceleration: float, max_jerk: float) -> MotionProfile:
+    """
+    Jerk limited (S-curve) profile. Acceleration ramps with max_jerk, so there are no steps
+    in acceleration which would make wheels slip. Speed is lowered in closed form when the move
+    is too short to reach max_speed and acceleration when the speed is too low to reach max_acceleration.
+    """
+    _validate_limits(max_speed, max_acceleration, max_jerk)
+    length = abs(distance)
+    jerk = max_jerk
+    acceleration = max_acceleration
+    speed = max_speed
+
+    if speed * jerk < acceleration ** 2:
+        acceleration = math.sqrt(speed * jerk)  # max_acceleration is never reached
+    if speed * (speed / acceleration + acceleration / jerk) > length:
+        # too short to cruise, solve length = speed * ramp_time(speed) for speed
+        speed = acceleration / 2 * (math.sqrt((acceleration / jerk) ** 2 + 4 * length / acceleration)
+                                    - acceleration / jerk)
+        if speed * jerk < acceleration ** 2:
+            speed = (length ** 2 * jerk / 4) ** (1 / 3)
+            acceleration = math.sqrt(speed * jerk)
+
+    jerk_time = acceleration / jerk
+    constant_time = max(speed / acceleration - jerk_time, 0) if speed > 0 else 0
+    ramp_distance = speed * (2 * jerk_time + constant_time)  # acceleration and deceleration together
+    cruise_time = max(length - ramp_distance, 0) / speed if speed > 0 else 0
+    return MotionProfile(distance, [
+        (jerk_time, 0, jerk),
+        (constant_time, acceleration, 0),
+        (jerk_time, acceleration, -jerk),
+        (cruise_time, 0, 0),
+        (jerk_time, 0, -jerk),
+        (constant_time, -acceleration, 0),
+        (jerk_time, -acceleration, jerk),
+    ])
+
+
+def plan_profile(distance: float, max_speed: float, max_acceleration: float,
+                 max_jerk: float = None) -> MotionProfile:
+    """S-curve profile if max_jerk is given, trapezoidal otherwise."""
+    if distance == 0:
+        return MotionProfile(0, [])
+    if max_jerk is None:
+        return plan_trapezoidal(distance, max_speed, max_acceleration)
+    return plan_s_curve(distance, max_speed, max_acceleration, max_jerk)
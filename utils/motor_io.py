@@ -0,0 +1,184 @@
+import os
+import select
+
+from ev3dev.auto import Motor
+
+from . import clock
+from .recorder import ReplayDevice, is_recorded
+from .simulation.hardware import SimDevice
+
+
+class AttributeHandle:
+    """
+    Attribute file of device kept open for the whole life of the handle.
+
+    Reads use os.pread() at offset zero, so there is no seek and no Python file object
+    in the way, integers are parsed straight from the read bytes.
+    """
+
+    def __init__(self, path: str, size: int = 64):
+        self._fd = os.open(path, os.O_RDONLY)
+        self._size = size
+
+    def read_bytes(self) -> bytes:
+        return os.pread(self._fd, self._size, 0)
+
+    def read_int(self) -> int:
+        return int(os.pread(self._fd, self._size, 0))
+
+    def wait_change(self, timeout: float):
+        """Wait until the attribute notifies about change of its value (POLLPRI) or timeout passes."""
+        poller = select.poll()
+        poller.register(self._fd, select.POLLPRI | select.POLLERR)
+        poller.poll(timeout * 1000)
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class MotorReader:
+    """
+    Fast reading of motor attributes read many times per cycle (position, speed, state).
+
+    Real motors are read through AttributeHandles. Devices without attribute files
+    (simulated or replayed motors) and devices with wrapped attribute access (recorded
+    motors) are read through their properties, as anything else. Motor must be attached
+    to DeviceRecorder before its reader is created.
+
+    Waiting for change of the state is event driven: real motors notify about changes
+    of their state attribute (poll()), simulated motors notify state_condition of their driver.
+    """
+
+    STATE_POLL_TIMEOUT = 0.1  # the state is checked at least this often, in case a notification is lost
+
+    def __init__(self, motor: Motor):
+        self.motor = motor
+        self._position = None
+        self._speed = None
+        self._state = None
+        if motor.connected and not isinstance(motor, (SimDevice, ReplayDevice)) and not is_recorded(motor):
+            try:
+                self._position = AttributeHandle(os.path.join(motor._path, 'position'))
+                self._speed = AttributeHandle(os.path.join(motor._path, 'speed'))
+                self._state = AttributeHandle(os.path.join(motor._path, 'state'))
+            except (OSError, TypeError):
+                self.close()
+
+    def position(self) -> int:
+        if self._position is None:
+            return self.motor.position
+        return self._position.read_int()
+
+    def speed(self) -> int:
+        if self._speed is None:
+            return self.motor.speed
+        return self._speed.read_int()
+
+    def state(self) -> list:
+        if self._state is None:
+            return self.motor.state
+        return self._state.read_bytes().decode().split()
+
+    def is_running(self) -> bool:
+        if self._state is None:
+            return Motor.STATE_RUNNING in self.motor.state
+        return b'running' in self._state.read_bytes()
+
+    def wait_until_state(self, test, timeout: float = None) -> bool:
+        """Wait until test(state) returns True, returns False if the timeout passed first."""
+        if self._state is not None:
+            end_time = clock.now() + timeout if timeout is not None else None
+            while not test(self._state.read_bytes().decode().split()):
+                wait_time = self.STATE_POLL_TIMEOUT
+                if end_time is not None:
+                    wait_time = min(wait_time, end_time - clock.now())
+                    if wait_time <= 0:
+                        return False
+                self._state.wait_change(wait_time)
+            return True
+
+        driver = getattr(self.motor, 'sim_driver', None)
+        condition = driver.state_condition if driver is not None else None
+        return clock.wait_for(lambda: test(self.state()), timeout, condition)
+
+    def wait_while_running(self, timeout: float = None) -> bool:
+        return self.wait_until_state(lambda state: Motor.STATE_RUNNING not in state, timeout)
+
+    def close(self):
+        for handle in (self._position, self._speed, self._state):
+            if handle is not None:
+                handle.close()
+        self._position = self._speed = self._state = None
+
+
+class MotorsCompletion:
+    """Future-like completion of a move of several motors, done when none of them is running."""
+
+    def __init__(self, readers, coordinator=None):
+        self._readers = readers
+        self._coordinator = coordinator
+
+    def done(self) -> bool:
+        if self._coordinator is not None and self._coordinator.is_alive():
+            return False
+        return not any(reader.is_running() for reader in self._readers)
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait until the move is done, returns False if the timeout passed first."""
+        end_time = clock.now() + timeout if timeout is not None else None
+        if self._coordinator is not None:
+            self._coordinator.join(timeout)
+            if self._coordinator.is_alive():
+                return False
+        for reader in self._readers:
+            remaining = end_time - clock.now() if end_time is not None else None
+            if not reader.wait_while_running(remaining):
+                return False
+        return True
+
+
+class MotorWriter:
+    """
+    Writes set-points of motor, writes of value the motor already has are skipped.
+
+    Duty cycle is rounded to whole percents first (motor driver accepts only integers),
+    so changes smaller than the driver resolution don't cause any writes. The cache assumes
+    nothing else writes the set-point, call invalidate() when the motor was reset.
+    """
+
+    def __init__(self, motor: Motor):
+        self.motor = motor
+        self._duty_cycle_sp = None
+
+    @staticmethod
+    def round_duty_cycle(duty_cycle: float) -> int:
+        return int(round(max(-100, min(100, duty_cycle))))
+
+    def set_duty_cycle_sp(self, duty_cycle: float) -> bool:
+        """Write duty cycle set-point, returns False if the write was skipped."""
+        duty_cycle = self.round_duty_cycle(duty_cycle)
+        if duty_cycle == self._duty_cycle_sp:
+            return False
+        self.motor.duty_cycle_sp = duty_cycle
+        self._duty_cycle_sp = duty_cycle
+        return True
+
+    def run_direct(self, duty_cycle_sp: float = 0):
+        duty_cycle_sp = self.round_duty_cycle(duty_cycle_sp)
+        self.motor.run_direct(duty_cycle_sp=duty_cycle_sp)
+        self._duty_cycle_sp = duty_cycle_sp
+
+    def invalidate(self):
+        self._duty_cycle_sp = None
+
+
+def write_duty_cycles(writers, duty_cycles):
+    """
+    Write duty cycles of several motors together. Values are rounded before anything is written,
+    so the writes follow each other as closely as possible.
+    """
+    duty_cycles = [MotorWriter.round_duty_cycle(duty_cycle) for duty_cycle in duty_cycles]
+    for writer, duty_cycle in zip(writers, duty_cycles):
+        writer.set_duty_cycle_sp(duty_cycle)
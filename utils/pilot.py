@@ -1,9 +1,13 @@
 import logging
 import math
-import time
+from array import array
 
-from utils.coordinator import Action, CycleThreadCoordinator
+from utils.coordinator import Action, CycleCoordinator
+from utils.device_info import device_info
+from utils.motion_profile import MotionProfile, plan_profile
+from utils.motor_io import MotorsCompletion, write_duty_cycles
 from utils.regulator import ValueRegulator
+from . import clock
 from .utils import crop_r
 
 log = logging.getLogger(__name__)
@@ -13,78 +17,122 @@ _REG_SPEED_P = 1
 _REG_SPEED_I = 0.1
 _REG_SPEED_D = 2
 
-# _REG_ERROR_P = 0.3
-# _REG_ERROR_I = 0.1
-# _REG_ERROR_D = 0.4
+# profiled moves get speed of the profile as feed forward, regulator only corrects the position error
+_REG_PROFILE_P = 1
+_REG_PROFILE_I = 0.05
+_REG_PROFILE_D = 0.2
+
+# cross coupling of wheels, regulates tacho counts a wheel is behind mean progress of other wheels
+_REG_SYNC_P = 0.3
+_REG_SYNC_I = 0.1
+_REG_SYNC_D = 0.4
 
 _CYCLE_TIME = 0.05
 
+# default limits of profiled moves (distance and angle), relative to max speed of the pilot
+_PROFILE_ACCELERATION_TIME = 0.5  # time to accelerate to max speed
+_PROFILE_JERK_TIME = 0.1  # time to ramp acceleration to its max
+_PROFILE_SETTLE_TIMEOUT = 1  # time given to wheels to reach the end position after the profile ends
+_PROFILE_SETTLE_DUTY_CYCLE = 10  # least duty cycle moving a settling wheel, smaller one stalls in the dead band
+
 
 class MotorAction(Action):
-    def __init__(self, wheel, speed, max_duty_cycle=100):
+    """
+    Drives wheel at constant speed or, if profile is given, along profile scaled by profile_scale
+    (target position is profile.position(elapsed_time) * profile_scale).
+    Progress is measured in tacho counts of speed (constant speed) or of profile (profiled move) traveled,
+    so progresses of all wheels of one move are comparable.
+    """
+
+    def __init__(self, wheel, speed, max_duty_cycle=100, profile: MotionProfile = None, profile_scale=1.0):
         self.wheel = wheel
         self._motor = wheel.motor
+        self._reader = wheel.reader
+        self._writer = wheel.writer
         self._speed = speed
         self._max_duty_cycle = crop_r(max_duty_cycle, 100)
-
-        self._elapsed_time = time.time()
-        self._start_position = self._motor.position
-        self._speed_regulator = ValueRegulator(const_p=_REG_SPEED_P, const_i=_REG_SPEED_I, const_d=_REG_SPEED_D,
-                                               getter_target=self.target_tacho_counts)
-        # self._error_regulator = ValueRegulator(const_p=_REG_ERROR_P, const_i=_REG_ERROR_I,
-        #                                        const_d=_REG_ERROR_D, const_target=0)
+        self._profile = profile
+        self._profile_scale = profile_scale
+        self._progress_scale = profile_scale if profile is not None else speed
+
+        self._elapsed_time = clock.now()
+        self._position = self._reader.position()
+        self._start_position = self._position
+        if profile is None:
+            self._speed_regulator = ValueRegulator(const_p=_REG_SPEED_P, const_i=_REG_SPEED_I,
+                                                   const_d=_REG_SPEED_D, getter_target=self.target_tacho_counts)
+        else:
+            self._speed_regulator = ValueRegulator(const_p=_REG_PROFILE_P, const_i=_REG_PROFILE_I,
+                                                   const_d=_REG_PROFILE_D, getter_target=self.target_tacho_counts)
+            max_speed = device_info(wheel.motor).max_speed
+            self._duty_cycle_per_speed = profile_scale * 100 / max_speed if max_speed else 0
+        self._sync_regulator = ValueRegulator(const_p=_REG_SYNC_P, const_i=_REG_SYNC_I, const_d=_REG_SYNC_D,
+                                              const_target=0)
 
     def actual_progress(self):
-        return (self.traveled_tacho_counts() / self._speed) if self._speed != 0 else None
+        return (self.traveled_tacho_counts() / self._progress_scale) if self._progress_scale != 0 else None
+
+    def update(self):
+        self._position = self._reader.position()
 
     def traveled_tacho_counts(self):
-        return self._motor.position - self._start_position
+        return self._position - self._start_position
 
     def traveled_units(self):
         return self.traveled_tacho_counts() / self.wheel.unit_ratio / self.wheel.total_ratio
 
     def target_tacho_counts(self):
+        if self._profile is not None:
+            return self._profile.position(self._elapsed_time) * self._profile_scale + self._start_position
         return self._speed * self._elapsed_time + self._start_position
 
+    def remaining_tacho_counts(self):
+        """Tacho counts left to the end of profile, None if the action has no profile."""
+        if self._profile is None:
+            return None
+        return self._profile.distance * self._profile_scale + self._start_position - self._position
+
     def target_units(self):
         return self.target_tacho_counts() / self.wheel.unit_ratio / self.wheel.total_ratio
 
     def on_start(self):
         self._speed_regulator.reset()
-        # self._error_regulator.reset()
+        self._sync_regulator.reset()
 
-        self._start_position = self._motor.position
-        self._motor.run_direct(duty_cycle_sp=0)
+        self._position = self._reader.position()
+        self._start_position = self._position
+        self._writer.run_direct(0)
 
     def handle_loop(self, elapsed_time, progress_error):
-        # if progress_error == 0:
-        #     error = 0
-        # else:
-        #     error = (progress_error * progress_error / 2) * (progress_error / abs(progress_error))
-        #     if abs(error) < 0.1:
-        #         error = 0
-        #     else:
-        #         error -= 0.1 * (error / abs(error))
-        self._elapsed_time = elapsed_time  # + error
-        # duty_cycle = utils.crop_r(self._speed_regulator.regulate(self._motor.position), self._max_duty_cycle)
-        # duty_cycle += self._error_regulator.regulate(-progress_error * self.speed)
-        # self._motor.duty_cycle_sp = utils.crop_r(duty_cycle, self._max_duty_cycle)
-
-        self._motor.duty_cycle_sp = crop_r(self._speed_regulator.regulate(self._motor.position),
-                                           self._max_duty_cycle)
+        """
+        Cross-coupled control: the speed regulator follows the wheel's own position target, the sync regulator
+        adds duty cycle proportional to how far (in tacho counts) the wheel is behind the other wheels,
+        so a leading wheel is slowed down while a lagging one is sped up.
+        """
+        self._elapsed_time = elapsed_time
+        duty_cycle = crop_r(self._speed_regulator.regulate(self._position), self._max_duty_cycle)
+        if self._profile is not None:
+            duty_cycle += self._profile.speed(elapsed_time) * self._duty_cycle_per_speed
+        duty_cycle += self._sync_regulator.regulate_error(progress_error * self._progress_scale)
+        if self._profile is not None and elapsed_time >= self._profile.duration:
+            remaining = self.remaining_tacho_counts()
+            if abs(remaining) >= 1 and abs(duty_cycle) < _PROFILE_SETTLE_DUTY_CYCLE:
+                duty_cycle = math.copysign(_PROFILE_SETTLE_DUTY_CYCLE, remaining)
+        self._writer.set_duty_cycle_sp(crop_r(duty_cycle, self._max_duty_cycle))
 
     def on_stop(self):
         self._motor.stop()
 
 
-class DriveCoordinator(CycleThreadCoordinator):
-    def __init__(self, motor_actions, time_len=None, angle_deg=None, distance_unit=None):
-        CycleThreadCoordinator.__init__(self, motor_actions, cycle_time=_CYCLE_TIME)
-        self.setDaemon(True)
+class DriveCoordinator(CycleCoordinator):
+    def __init__(self, motor_actions, time_len=None, angle_deg=None, distance_unit=None,
+                 profile: MotionProfile = None):
+        CycleCoordinator.__init__(self, motor_actions, cycle_time=_CYCLE_TIME, name='DriveCoordinator')
 
         self._time_len = time_len
         self._angle_deg = angle_deg
         self._distance_unit = distance_unit
+        self._profile = profile
 
         if len(motor_actions) == 0:
             self.stop()
@@ -97,13 +145,32 @@ class DriveCoordinator(CycleThreadCoordinator):
                     self._max_action = motor_action
 
     def _is_stop_loop(self):
-        return CycleThreadCoordinator._is_stop_loop(self) \
+        return CycleCoordinator._is_stop_loop(self) \
                or self._check_time() \
+               or self._check_profile() \
                or self._check_distance() \
                or self._check_angle()
 
     def _check_time(self) -> bool:
-        return self._time_len is not None and time.time() - self._start_time >= self._time_len
+        return self._time_len is not None and clock.now() - self._start_time >= self._time_len
+
+    def _check_profile(self) -> bool:
+        """
+        After the profile ends the wheels keep being regulated to its end position (target of the regulators
+        stays there), until every wheel is less than one tacho count from it, so the move doesn't stop short.
+        """
+        if self._profile is None:
+            return False
+        elapsed_time = clock.now() - self._start_time
+        if elapsed_time < self._profile.duration:
+            return False
+        if all(abs(action.remaining_tacho_counts()) < 1 for action in self._actions):
+            return True
+        if elapsed_time >= self._profile.duration + _PROFILE_SETTLE_TIMEOUT:
+            log.warning('Wheels didn\'t reach end of profiled move in time, remaining tacho counts: {}'
+                        .format([action.remaining_tacho_counts() for action in self._actions]))
+            return True
+        return False
 
     def _check_distance(self) -> bool:
         if self._distance_unit is None or self._min_action.wheel.offset == self._max_action.wheel.offset:
@@ -174,6 +241,20 @@ class Pilot:
 
         self._max_offset = 0
 
+        # limits of profiled moves, None means derived from max speed
+        self._max_acceleration_unit = None
+        self._max_jerk_unit = None
+        self._jerk_limited = True
+
+        # wheel geometry compiled by _refresh_kinematics(), one item per wheel
+        self._writers = ()
+        self._unit_ratios = array('d')
+        self._total_ratios = array('d')
+        self._unit_to_tacho = array('d')
+        self._offsets = array('d')
+        self._course_effects = array('d')
+        self._gear_signs = array('d')
+
         self.set_wheels(*wheels)
 
     @property
@@ -207,6 +288,7 @@ class Pilot:
 
         self._refresh_max_speed()
         self._refresh_max_offset()
+        self._refresh_kinematics()
         self.reset()
 
     def get_max_speed_tacho(self):
@@ -218,17 +300,39 @@ class Pilot:
     def get_max_speed_unit(self):
         return self._max_speed_unit
 
+    def set_motion_limits(self, max_acceleration_unit: float = None, max_jerk_unit: float = None,
+                          jerk_limited: bool = True):
+        """
+        Limits of moves to distance and angle (units per second squared and cubed) of the fastest wheel.
+        None means default derived from max speed, without jerk_limited moves use trapezoidal profiles.
+        """
+        self._max_acceleration_unit = max_acceleration_unit
+        self._max_jerk_unit = max_jerk_unit
+        self._jerk_limited = jerk_limited
+
+    def get_motion_limits(self) -> tuple:
+        """Limits of profiled moves as (max_acceleration_unit, max_jerk_unit), max_jerk_unit is None if not limited."""
+        acceleration = self._max_acceleration_unit
+        if acceleration is None:
+            acceleration = abs(self._max_speed_unit) / _PROFILE_ACCELERATION_TIME
+        if not self._jerk_limited:
+            return acceleration, None
+        jerk = self._max_jerk_unit
+        if jerk is None:
+            jerk = acceleration / _PROFILE_JERK_TIME
+        return acceleration, jerk
+
     def _refresh_max_speed(self):
         if not self._has_wheels or len(self._wheels) == 0:
             self._max_speed_tacho = 0
             self._max_speed_deg = 0
             self._max_speed_unit = 0
         else:
-            self._max_speed_tacho = self._wheels[0].motor.max_speed
+            self._max_speed_tacho = device_info(self._wheels[0].motor).max_speed
             self._max_speed_deg = self._max_speed_tacho / self._wheels[0].total_ratio
             self._max_speed_unit = self._max_speed_deg / self._wheels[0].unit_ratio
             for wheel in self._wheels:
-                max_speed_tacho = wheel.motor.max_speed
+                max_speed_tacho = device_info(wheel.motor).max_speed
                 self._max_speed_tacho = min(abs(max_speed_tacho), self._max_speed_tacho)
                 max_speed_deg = max_speed_tacho / wheel.total_ratio
                 self._max_speed_deg = min(abs(max_speed_deg), self._max_speed_deg)
@@ -243,6 +347,17 @@ class Pilot:
             for wheel in self._wheels:
                 self._max_offset = max(self._max_offset, abs(wheel.offset))
 
+    def _refresh_kinematics(self):
+        wheels = self._wheels
+        self._writers = tuple(wheel.writer for wheel in wheels)
+        self._unit_ratios = array('d', (wheel.unit_ratio for wheel in wheels))
+        self._total_ratios = array('d', (wheel.total_ratio for wheel in wheels))
+        self._unit_to_tacho = array('d', (wheel.unit_ratio * wheel.total_ratio for wheel in wheels))
+        self._offsets = array('d', (wheel.offset for wheel in wheels))
+        self._course_effects = array('d', (-wheel.offset / self._max_offset if self._max_offset != 0 else 0
+                                           for wheel in wheels))
+        self._gear_signs = array('d', (1 if wheel.gear_ratio >= 0 else -1 for wheel in wheels))
+
     def _stop_coordinator(self):
         if self._running_coordinator is not None:
             self._running_coordinator.stop()
@@ -255,6 +370,7 @@ class Pilot:
         if self._has_wheels:
             for wheel in self._wheels:
                 wheel.motor.reset()
+                wheel.writer.invalidate()
                 wheel.motor.stop_action = 'brake'
 
     def stop(self):
@@ -268,8 +384,9 @@ class Pilot:
         max_speed = abs(max_speed)
         mul_speed = crop_r(mul_speed, 1)
 
+        wheels_count = len(self._wheels)
         if max_speed == 0 or mul_speed == 0 or min_speed > max_speed:
-            return [0 in range(len(self._wheels))]
+            return [0] * wheels_count
 
         if target_speed is None:
             target_speed = max_speed
@@ -279,13 +396,12 @@ class Pilot:
                 target_speed = max_speed * (target_speed / target_speed_abs)
 
         if course_percent == 0:
-            return [target_speed in range(len(self._wheels))]
+            return [target_speed * mul_speed] * wheels_count
 
         if target_speed != 0 and min_speed == max_speed:
             speed = min_speed * (abs(target_speed) / target_speed)
-            return [speed in range(len(self._wheels))]
+            return [speed] * wheels_count
 
-        speeds = []
 
         # max_pos = self._max_offset * (-1 if course_percent > 0 else 1)
         # for wheel in self._wheels:
@@ -294,14 +410,9 @@ class Pilot:
 
         half_course = course_percent / 100 * max_speed / 2
 
-        max_gen_speed = -max_speed
-        min_gen_speed = max_speed
-        for wheel in self._wheels:
-            effect = -wheel.offset / self._max_offset
-            speed = target_speed + (half_course * effect)
-            max_gen_speed = max(max_gen_speed, speed)
-            min_gen_speed = min(min_gen_speed, speed)
-            speeds.append(speed)
+        speeds = [target_speed + half_course * effect for effect in self._course_effects]
+        max_gen_speed = max(max(speeds), -max_speed)
+        min_gen_speed = min(min(speeds), max_speed)
 
         diff = 0
         if max_gen_speed > max_speed:
@@ -337,21 +448,14 @@ class Pilot:
             speed = max_speed
             no_warn = True
 
-        speeds = []
-        max_found_speed = 0
         if course_r is None:
             max_found_speed = speed
-            for i in range(len(self._wheels)):
-                speeds.append(speed)
+            speeds = [speed] * len(self._wheels)
         else:
-            center_way_circuit = 2 * -course_r * math.pi
-            one_unit_speed = speed / center_way_circuit
-            for i in range(len(self._wheels)):
-                wheel = self._wheels[i]
-                wheel_way_circuit = 2 * (-course_r + wheel.offset) * math.pi
-                wheel_speed_unit = one_unit_speed * wheel_way_circuit
-                max_found_speed = max(max_found_speed, abs(wheel_speed_unit))
-                speeds.append(wheel_speed_unit)
+            # speed of each wheel is proportional to radius of its way
+            speed_per_radius = speed / -course_r
+            speeds = [speed_per_radius * (offset - course_r) for offset in self._offsets]
+            max_found_speed = max((abs(wheel_speed) for wheel_speed in speeds), default=0)
 
         if max_found_speed > max_speed:
             if not no_warn:
@@ -360,44 +464,30 @@ class Pilot:
                             + 'but wheel max wheel speed is ' + str(max_speed) + '. '
                             + 'Drive will be slower.')
             change = self._max_speed_unit / max_found_speed
-            for i in range(len(speeds)):
-                speeds[i] *= change
-            max_found_speed *= change
+            speeds = [wheel_speed * change for wheel_speed in speeds]
         return speeds
 
     def _generate_max_speeds_tacho(self):
-        speeds_tacho = []
-        for i in range(len(self._wheels)):
-            speeds_tacho.append(self._max_speed_tacho)
-        return speeds_tacho
+        return [self._max_speed_tacho] * len(self._wheels)
 
     def _generate_max_speeds_deg(self):
-        speeds_deg = []
-        for i in range(len(self._wheels)):
-            speeds_deg.append(self._max_speed_deg)
-        return speeds_deg
+        return [self._max_speed_deg] * len(self._wheels)
 
     def _generate_max_speeds_unit(self):
-        speeds_unit = []
-        for i in range(len(self._wheels)):
-            speeds_unit.append(self._max_speed_unit)
-        return speeds_unit
+        return [self._max_speed_unit] * len(self._wheels)
 
     def _validate_len(self, data_array):
         if len(data_array) != len(self._wheels):
             raise Exception('len(data_array) != len(wheels)')
 
     def _speeds_unit_to_deg(self, speeds_unit):
-        speeds_deg = []
-        for i in range(len(speeds_unit)):
-            speeds_deg.append(speeds_unit[i] * self._wheels[i].unit_ratio)
-        return speeds_deg
+        return [speed * ratio for speed, ratio in zip(speeds_unit, self._unit_ratios)]
 
     def _speeds_deg_to_tacho(self, speeds_deg):
-        speeds_tacho = []
-        for i in range(len(speeds_deg)):
-            speeds_tacho.append(speeds_deg[i] * self._wheels[i].total_ratio)
-        return speeds_tacho
+        return [speed * ratio for speed, ratio in zip(speeds_deg, self._total_ratios)]
+
+    def _speeds_unit_to_tacho(self, speeds_unit):
+        return [speed * ratio for speed, ratio in zip(speeds_unit, self._unit_to_tacho)]
 
     def _raw_run_unit(self, time_len=None, angle_deg=None, distance_unit=None, speeds_unit=None, max_duty_cycle=100,
                       async=False):
@@ -405,7 +495,7 @@ class Pilot:
             speeds_tacho = self._generate_max_speeds_tacho()
         else:
             self._validate_len(speeds_unit)
-            speeds_tacho = self._speeds_deg_to_tacho(self._speeds_unit_to_deg(speeds_unit))
+            speeds_tacho = self._speeds_unit_to_tacho(speeds_unit)
 
         self._raw_run_tacho_ready(time_len, angle_deg, distance_unit, speeds_tacho, max_duty_cycle, async)
 
@@ -429,61 +519,19 @@ class Pilot:
         self._raw_run_tacho_ready(time_len, angle_deg, distance_unit, speeds_tacho, max_duty_cycle, async)
 
     def _raw_run_tacho_ready(self, time_len, angle_deg, distance_unit, speeds_tacho, max_duty_cycle, async):
+        if time_len is None and angle_deg is not None and distance_unit is not None:
+            raise NotImplementedError()
+        if time_len is None and (angle_deg is not None or distance_unit is not None):
+            self._run_profiled(self._move_positions_tacho(speeds_tacho, angle_deg, distance_unit),
+                               speeds_tacho, max_duty_cycle)
+            return
+
         async = True  # TODO: test
         if async:
             self._stop_coordinator()
             if time_len is not None:
                 for i in range(len(speeds_tacho)):
                     self._wheels[i].motor.run_timed(speed_sp=speeds_tacho[i], time_sp=int(time_len * 1000))
-            elif angle_deg is not None and distance_unit is not None:
-                raise NotImplementedError()
-            elif angle_deg is not None:
-                if angle_deg == 0:
-                    return
-
-                min_wheel = self._wheels[self._min_wheel]
-                max_wheel = self._wheels[self._max_wheel]
-                min_wheel_speed = speeds_tacho[self._min_wheel]
-                max_wheel_speed = speeds_tacho[self._max_wheel]
-
-                if max_wheel_speed == 0:
-                    radius = - max_wheel.offset
-                elif min_wheel_speed == 0:
-                    radius = - min_wheel.offset
-                else:
-                    ratio = min_wheel_speed / max_wheel_speed
-                    radius = (min_wheel.offset - ratio * max_wheel.offset) / (ratio - 1)
-
-                positions_tacho = []
-                for i in range(len(speeds_tacho)):
-                    wheel = self._wheels[i]
-                    speed_tacho = speeds_tacho[i]
-                    circuit_unit = 2 * abs(radius + wheel.offset) * math.pi
-                    position_unit = circuit_unit / 360 * angle_deg * (speed_tacho / abs(speed_tacho))
-                    positions_tacho.append(position_unit * wheel.unit_ratio * wheel.total_ratio)
-
-                for i in range(len(speeds_tacho)):
-                    wheel = self._wheels[i]
-                    speed_tacho = speeds_tacho[i]
-                    position_tacho = positions_tacho[i]
-                    wheel.motor.run_to_rel_pos(speed_sp=speed_tacho, position_sp=position_tacho)
-
-            elif distance_unit is not None:
-                if distance_unit == 0:
-                    return
-
-                min_wheel = self._wheels[self._min_wheel]
-                max_wheel = self._wheels[self._max_wheel]
-                min_wheel_speed = speeds_tacho[self._min_wheel]
-                max_wheel_speed = speeds_tacho[self._max_wheel]
-
-                speed_delta_per_offset_delta = max_wheel_speed - min_wheel_speed / max_wheel.offset - min_wheel.offset
-
-                for i in range(len(speeds_tacho)):
-                    wheel = self._wheels[i]
-                    distance_tacho = distance_unit * wheel.unit_ratio * wheel.total_ratio
-                    position = distance_tacho + (wheel.offset * speed_delta_per_offset_delta)
-                    wheel.motor.run_to_rel_pos(speed_sp=speeds_tacho[i], position_sp=position)
             else:
                 for i in range(len(speeds_tacho)):
                     self._wheels[i].motor.run_forever(speed_sp=speeds_tacho[i])
@@ -496,6 +544,74 @@ class Pilot:
             self._running_coordinator = DriveCoordinator(actions, time_len, angle_deg, distance_unit)
             self._running_coordinator.start()
 
+    def _move_positions_tacho(self, speeds_tacho, angle_deg, distance_unit):
+        """Relative positions of wheels at the end of move to angle_deg or distance_unit with speeds_tacho."""
+        min_wheel = self._wheels[self._min_wheel]
+        max_wheel = self._wheels[self._max_wheel]
+        min_wheel_speed = speeds_tacho[self._min_wheel] / self._unit_to_tacho[self._min_wheel]
+        max_wheel_speed = speeds_tacho[self._max_wheel] / self._unit_to_tacho[self._max_wheel]
+
+        positions_tacho = []
+        if angle_deg is not None:
+            if max_wheel_speed == min_wheel_speed:
+                return [0] * len(speeds_tacho)  # driving straight, the angle never changes
+            if max_wheel_speed == 0:
+                radius = - max_wheel.offset
+            elif min_wheel_speed == 0:
+                radius = - min_wheel.offset
+            else:
+                ratio = min_wheel_speed / max_wheel_speed
+                radius = (min_wheel.offset - ratio * max_wheel.offset) / (ratio - 1)
+
+            for speed_tacho, offset, unit_to_tacho in zip(speeds_tacho, self._offsets, self._unit_to_tacho):
+                if speed_tacho == 0:
+                    positions_tacho.append(0)
+                    continue
+                circuit_unit = 2 * abs(radius + offset) * math.pi
+                position_unit = circuit_unit / 360 * angle_deg * (speed_tacho / abs(speed_tacho))
+                positions_tacho.append(position_unit * unit_to_tacho)
+        else:
+            # unit speeds change linearly with offset, distance is the way of center of the robot (offset 0)
+            if max_wheel.offset == min_wheel.offset:
+                center_speed = max_wheel_speed
+            else:
+                center_speed = min_wheel_speed - min_wheel.offset * (max_wheel_speed - min_wheel_speed) \
+                                                 / (max_wheel.offset - min_wheel.offset)
+            if center_speed == 0:
+                return [0] * len(speeds_tacho)  # turning on the spot, the center doesn't move
+
+            for speed_tacho in speeds_tacho:
+                positions_tacho.append(distance_unit * speed_tacho / center_speed)
+        return positions_tacho
+
+    def _run_profiled(self, positions_tacho, speeds_tacho, max_duty_cycle):
+        """
+        Move wheels by positions_tacho along one motion profile planned for the wheel with the longest way,
+        the other wheels follow it scaled, so all of them start and stop together.
+        Set-points are streamed to the wheels by DriveCoordinator every cycle.
+        """
+        self._stop_coordinator()
+        if len(positions_tacho) == 0:
+            return
+        lead = max(range(len(positions_tacho)), key=lambda i: abs(positions_tacho[i]))
+        lead_speed = abs(speeds_tacho[lead])
+        if positions_tacho[lead] == 0 or lead_speed == 0:
+            return
+
+        # limits are magnitudes, direction of the move is given by sign of positions_tacho[lead] only
+        acceleration_unit, jerk_unit = self.get_motion_limits()
+        unit_to_tacho = abs(self._unit_to_tacho[lead])
+        profile = plan_profile(positions_tacho[lead], lead_speed, abs(acceleration_unit) * unit_to_tacho,
+                               abs(jerk_unit) * unit_to_tacho if jerk_unit is not None else None)
+
+        actions = []
+        for i in range(len(positions_tacho)):
+            actions.append(MotorAction(self._wheels[i], speeds_tacho[i], max_duty_cycle,
+                                       profile, positions_tacho[i] / positions_tacho[lead]))
+
+        self._running_coordinator = DriveCoordinator(actions, profile=profile)
+        self._running_coordinator.start()
+
     def _raw_run_drive_unit(self, time_len=None, angle_deg=None, distance_unit=None,
                             course_r=None, speed_unit=None, max_duty_cycle=100, async=False):
         self._raw_run_unit(time_len=time_len, angle_deg=angle_deg, distance_unit=distance_unit,
@@ -576,14 +692,12 @@ class Pilot:
                    mul_duty_cycle: float = 1, min_duty_cycle: int = 0, max_duty_cycle: int = 0):
         duty_cycles = self._course_percent_to_speeds(course_percent, max_duty_cycle, min_duty_cycle,
                                                      target_duty_cycle, mul_duty_cycle)
-        for i in range(len(self._wheels)):
-            self._wheels[i].motor.run_direct(duty_cycle_sp=duty_cycles[i])
+        for writer, duty_cycle in zip(self._writers, duty_cycles):
+            writer.run_direct(duty_cycle)
 
     def update_duty_cycle_raw(self, duty_cycles):
         self._validate_len(duty_cycles)
-        for i in range(len(self._wheels)):
-            wheel = self._wheels[i]
-            wheel.motor.duty_cycle_sp = duty_cycles[i] * (abs(wheel.gear_ratio) / wheel.gear_ratio)
+        write_duty_cycles(self._writers, [duty_cycle * sign for duty_cycle, sign in zip(duty_cycles, self._gear_signs)])
 
     def update_duty_cycle(self, course_percent: float, target_duty_cycle: int = 100,
                           mul_duty_cycle: float = 1, min_duty_cycle: int = 0, max_duty_cycle: int = 100):
@@ -597,12 +711,12 @@ class Pilot:
     def restore_positions(self, positions: list, speed_unit=None):
         if speed_unit is None:
             speed_unit = self._max_speed_unit
-        speed_tacho = self._speeds_deg_to_tacho(self._speeds_unit_to_deg([speed_unit]))[0]
+        speed_tacho = speed_unit * self._unit_to_tacho[0]
 
         changes = []
         max_change = 0
         for i in range(len(positions)):
-            change = positions[i] - self._wheels[i].motor.position
+            change = positions[i] - self._wheels[i].reader.position()
             changes.append(change)
             max_change = max(max_change, abs(change))
 
@@ -615,13 +729,13 @@ class Pilot:
     def get_positions(self):
         positions = []
         for wheel in self._wheels:
-            positions.append(wheel.motor.position)
+            positions.append(wheel.reader.position())
         return positions
 
     def get_states(self):
         states = []
         for wheel in self._wheels:
-            states.append(wheel.motor.state)
+            states.append(wheel.reader.state())
         return states
 
     def is_running(self):
@@ -630,7 +744,7 @@ class Pilot:
             return True
 
         for wheel in self._wheels:
-            if 'running' in wheel.motor.state:
+            if wheel.reader.is_running():
                 return True
 
         return False
@@ -639,5 +753,12 @@ class Pilot:
         while (self.is_running() and (cond_and is None or cond_and())) or (cond_or is not None and cond_or()):
             method()
 
+    def completion(self) -> MotorsCompletion:
+        """Completion of the current move, see MotorsCompletion."""
+        return MotorsCompletion([wheel.reader for wheel in self._wheels], self._running_coordinator)
+
     def wait_to_stop(self, cond_and=None, cond_or=None):
-        self.repeat_while_running(lambda: time.sleep(0.05), cond_and, cond_or)
+        if cond_and is None and cond_or is None:
+            self.completion().wait()
+            return
+        self.repeat_while_running(lambda: clock.sleep(0.05), cond_and, cond_or)
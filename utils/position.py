@@ -1,3 +1,6 @@
+import math
+
+
 class Position2D:
     def __init__(self, x: float, y: float, angle_deg: float):
         self._x = x
@@ -14,11 +17,20 @@ class Position2D:
         return self._angle_deg
 
     def get_angle_rad(self):
-        raise NotImplementedError
+        return math.radians(self._angle_deg)
 
-    def offset_by(self, offset_position):  # TODO: if self.angle != 0 offset x and y by rotated offset
-        return Position2D(self.get_x() + offset_position.get_x(),
-                          self.get_y() + offset_position.get_y(),
+    def offset_by(self, offset_position):
+        """
+        Position of offset_position given relative to this position.
+        Angle zero points along the y axis and positive angles rotate counter-clockwise.
+        """
+        angle_rad = self.get_angle_rad()
+        cos_angle = math.cos(angle_rad)
+        sin_angle = math.sin(angle_rad)
+        offset_x = offset_position.get_x()
+        offset_y = offset_position.get_y()
+        return Position2D(self.get_x() + offset_x * cos_angle - offset_y * sin_angle,
+                          self.get_y() + offset_x * sin_angle + offset_y * cos_angle,
                           self.get_angle_deg() + offset_position.get_angle_deg())
 
         # TODO: add some basic calculations support methods
@@ -0,0 +1,321 @@
+import logging
+import struct
+import time
+from bisect import bisect_right
+from threading import RLock, local
+
+from ev3dev.auto import Device
+
+from . import clock
+
+log = logging.getLogger(__name__)
+
+# File starts with FILE_HEADER and start time of the recording (double), followed by records.
+# Every record starts with RECORD_HEADER (record type, attribute key, timestamp) followed by value:
+#   RECORD_KEY                          - attribute key definition, encoded as 'device_name/attribute_name'
+#                                         (selected values of sets use attribute name with SELECTED_SUFFIX)
+#   RECORD_READ_INT, RECORD_WRITE_INT   - signed 64-bit integer
+#   RECORD_READ_STR, RECORD_WRITE_STR   - string
+#   RECORD_READ_BIN                     - raw bytes (bin_data of sensors)
+# Strings and bytes are stored as unsigned 16-bit length followed by the (UTF-8) bytes.
+FILE_HEADER = b'EV3DEVREC\x01'
+FILE_START = struct.Struct('<d')
+RECORD_HEADER = struct.Struct('<BHd')
+INT_VALUE = struct.Struct('<q')
+STR_LENGTH = struct.Struct('<H')
+
+SELECTED_SUFFIX = ':selected'
+
+RECORD_KEY = 0
+RECORD_READ_INT = 1
+RECORD_READ_STR = 2
+RECORD_WRITE_INT = 3
+RECORD_WRITE_STR = 4
+RECORD_READ_BIN = 5
+
+_RECORDER_ATTRIBUTE = 'device_recorder'  # set on every device attached to DeviceRecorder
+
+_READ_METHODS = {
+    'get_attr_int': RECORD_READ_INT,
+    'get_attr_string': RECORD_READ_STR,
+    'get_attr_line': RECORD_READ_STR,
+    'get_attr_set': RECORD_READ_STR,
+    'get_attr_from_set': RECORD_READ_STR
+}
+_WRITE_METHODS = {
+    'set_attr_int': RECORD_WRITE_INT,
+    'set_attr_string': RECORD_WRITE_STR
+}
+
+
+def is_recorded(device: Device) -> bool:
+    """True if access to attributes of device goes through DeviceRecorder."""
+    return isinstance(getattr(device, _RECORDER_ATTRIBUTE, None), DeviceRecorder)
+
+
+def _encode_str(value) -> bytes:
+    if isinstance(value, (list, tuple)):
+        value = ' '.join(value)
+    return _encode_bytes(str(value).encode())
+
+
+def _encode_bytes(data) -> bytes:
+    return STR_LENGTH.pack(len(data)) + bytes(data)
+
+
+class DeviceRecorder:
+    """
+    Records every attribute read and write of attached devices into an append-only binary file.
+
+    Works with real devices as well as with simulated ones, because it wraps the attribute
+    access methods of the device (get_attr_int(), set_attr_string(), ...) shared by both.
+    The recording can be replayed by DeviceReplay.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1):
+        self._lock = RLock()
+        self._file = open(path, 'wb')
+        self._keys = {}
+        self._nested = local()
+        self._flush_interval = flush_interval
+        self._last_flush = time.monotonic()
+        self._file.write(FILE_HEADER + FILE_START.pack(clock.now()))
+
+    def attach(self, device: Device, device_name: str):
+        """Start recording access to attributes of device, device_name identifies it in the recording."""
+        for method_name, record_type in _READ_METHODS.items():
+            suffix = SELECTED_SUFFIX if method_name == 'get_attr_from_set' else ''
+            setattr(device, method_name, self._wrap_read(getattr(device, method_name), device_name,
+                                                         record_type, suffix))
+        for method_name, record_type in _WRITE_METHODS.items():
+            setattr(device, method_name, self._wrap_write(getattr(device, method_name), device_name, record_type))
+        if hasattr(device, 'bin_data'):
+            device.bin_data = self._wrap_bin_data(device.bin_data, device_name)
+        setattr(device, _RECORDER_ATTRIBUTE, self)
+
+    def _wrap_read(self, method, device_name, record_type, suffix):
+        def read(attribute, name):
+            if getattr(self._nested, 'active', False):
+                return method(attribute, name)
+            self._nested.active = True
+            try:
+                attribute, value = method(attribute, name)
+            finally:
+                self._nested.active = False
+            self._write_record(record_type, device_name, name + suffix, value)
+            return attribute, value
+
+        return read
+
+    def _wrap_write(self, method, device_name, record_type):
+        def write(attribute, name, value):
+            if getattr(self._nested, 'active', False):
+                return method(attribute, name, value)
+            self._nested.active = True
+            try:
+                attribute = method(attribute, name, value)
+            finally:
+                self._nested.active = False
+            self._write_record(record_type, device_name, name, value)
+            return attribute
+
+        return write
+
+    def _wrap_bin_data(self, method, device_name):
+        def bin_data(fmt=None):
+            if getattr(self._nested, 'active', False):
+                return method(fmt)
+            self._nested.active = True
+            try:
+                raw = method()
+            finally:
+                self._nested.active = False
+            self._write_record(RECORD_READ_BIN, device_name, 'bin_data', raw)
+            return raw if fmt is None else struct.unpack(fmt, raw)
+
+        return bin_data
+
+    def _get_key_id(self, key: str, timestamp: float) -> int:
+        key_id = self._keys.get(key, None)
+        if key_id is None:
+            key_id = len(self._keys)
+            self._keys[key] = key_id
+            self._file.write(RECORD_HEADER.pack(RECORD_KEY, key_id, timestamp) + _encode_str(key))
+        return key_id
+
+    def _write_record(self, record_type, device_name, name, value):
+        timestamp = clock.now()
+        if record_type == RECORD_READ_INT or record_type == RECORD_WRITE_INT:
+            data = INT_VALUE.pack(int(value))
+        elif record_type == RECORD_READ_BIN:
+            data = _encode_bytes(value)
+        else:
+            data = _encode_str(value)
+
+        with self._lock:
+            if self._file is None:
+                return
+            key_id = self._get_key_id(device_name + '/' + name, timestamp)
+            self._file.write(RECORD_HEADER.pack(record_type, key_id, timestamp) + data)
+
+            real_time = time.monotonic()
+            if real_time - self._last_flush >= self._flush_interval:
+                self._last_flush = real_time
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class DeviceReplay:
+    """
+    Recording loaded from file created by DeviceRecorder.
+
+    Reads are answered by the value recorded last before the same moment of the recording,
+    measured from the start of the replay, so the replay should run on the same clock
+    (preferably VirtualClock) as the recording did. Writes are only collected.
+    """
+
+    def __init__(self, start_time: float, reads: dict, writes: list):
+        self._record_start_time = start_time
+        self._reads = reads
+        self.writes = writes
+        self._replay_start_time = clock.now()
+        self._devices = set(key.split('/', 1)[0] for key in reads.keys())
+        self._lock = RLock()
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, 'rb') as fh:
+            data = fh.read()
+
+        if not data.startswith(FILE_HEADER):
+            raise ValueError('File ' + path + ' is not a device recording')
+        offset = len(FILE_HEADER)
+        start_time, = FILE_START.unpack_from(data, offset)
+        offset += FILE_START.size
+
+        keys = {}
+        reads = {}
+        writes = []
+        while offset + RECORD_HEADER.size <= len(data):
+            record_type, key_id, timestamp = RECORD_HEADER.unpack_from(data, offset)
+            offset += RECORD_HEADER.size
+            if record_type == RECORD_READ_INT or record_type == RECORD_WRITE_INT:
+                if offset + INT_VALUE.size > len(data):
+                    break  # recording was interrupted in the middle of record
+                value, = INT_VALUE.unpack_from(data, offset)
+                offset += INT_VALUE.size
+            else:
+                if offset + STR_LENGTH.size > len(data):
+                    break
+                length, = STR_LENGTH.unpack_from(data, offset)
+                offset += STR_LENGTH.size
+                if offset + length > len(data):
+                    break
+                value = data[offset:offset + length]
+                if record_type != RECORD_READ_BIN:
+                    value = value.decode()
+                offset += length
+
+            if record_type == RECORD_KEY:
+                keys[key_id] = value
+                reads[value] = ([], [])
+            elif record_type == RECORD_READ_INT or record_type == RECORD_READ_STR or record_type == RECORD_READ_BIN:
+                times, values = reads[keys[key_id]]
+                times.append(timestamp)
+                values.append(value)
+            else:
+                writes.append((timestamp, keys[key_id], value))
+
+        return cls(start_time, reads, writes)
+
+    def restart(self):
+        self._replay_start_time = clock.now()
+
+    def has_device(self, device_name: str) -> bool:
+        return device_name in self._devices
+
+    def read(self, device_name: str, name: str):
+        key = device_name + '/' + name
+        if key not in self._reads:
+            raise Exception('Attribute ' + key + ' was never read in the recording.')
+        times, values = self._reads[key]
+        if len(times) == 0:
+            raise Exception('Attribute ' + key + ' was never read in the recording.')
+        record_time = self._record_start_time + clock.now() - self._replay_start_time
+        return values[max(bisect_right(times, record_time) - 1, 0)]
+
+    def write(self, device_name: str, name: str, value):
+        with self._lock:
+            self.writes.append((self._record_start_time + clock.now() - self._replay_start_time,
+                                device_name + '/' + name, value))
+
+
+class ReplayDevice(Device):
+    """Device answering reads from recording, see create_replay_device()."""
+
+    def __init__(self, replay: DeviceReplay, device_name: str):
+        self._replay = replay
+        self._replay_name = device_name
+        self._path = '/replay/' + device_name
+        self._device_index = None
+        self.connected = replay.has_device(device_name)
+
+    def _attribute_file_open(self, name):
+        raise Exception('Replayed device ' + self._replay_name + ' has no attribute files')
+
+    def get_attr_int(self, attribute, name):
+        return attribute, int(self._replay.read(self._replay_name, name))
+
+    def set_attr_int(self, attribute, name, value):
+        self._replay.write(self._replay_name, name, int(value))
+        return attribute
+
+    def get_attr_string(self, attribute, name):
+        return attribute, str(self._replay.read(self._replay_name, name))
+
+    def set_attr_string(self, attribute, name, value):
+        self._replay.write(self._replay_name, name, value)
+        return attribute
+
+    def get_attr_line(self, attribute, name):
+        return self.get_attr_string(attribute, name)
+
+    def get_attr_set(self, attribute, name):
+        return attribute, [item.strip('[]') for item in str(self._replay.read(self._replay_name, name)).split()]
+
+    def get_attr_from_set(self, attribute, name):
+        return attribute, str(self._replay.read(self._replay_name, name + SELECTED_SUFFIX))
+
+    def bin_data(self, fmt=None):
+        raw = self._replay.read(self._replay_name, 'bin_data')
+        if fmt is None:
+            return raw
+        return struct.unpack(fmt, raw)
+
+    def wait(self, cond, timeout=None):
+        start_time = clock.now()
+        while True:
+            if timeout is not None and clock.now() >= start_time + timeout / 1000:
+                return False
+
+            if cond(self.state):
+                return True
+
+            clock.sleep(0.05)
+
+
+def create_replay_device(device_class, replay: DeviceReplay, device_name: str, *args, **kwargs):
+    """
+    Create device of given ev3dev class (LargeMotor, ColorSensor, ...) replaying device_name
+    from the recording. Other arguments are passed to constructor of device_class.
+    """
+    replay_class = type('Replay' + device_class.__name__, (ReplayDevice, device_class), {})
+    device = replay_class.__new__(replay_class)
+    device_class.__init__(device, *args, **kwargs)
+    ReplayDevice.__init__(device, replay, device_name)
+    return device
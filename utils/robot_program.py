@@ -1,6 +1,6 @@
 import logging
 
-import time
+from . import clock
 
 log = logging.getLogger(__name__)
 
@@ -143,7 +143,7 @@ def run_program(program: RobotProgram, config: dict = None):
     controller = program.execute(config)
     try:
         while True:
-            time.sleep(0.2)
+            clock.sleep(0.2)
     except KeyboardInterrupt:
         pass
 
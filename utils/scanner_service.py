@@ -0,0 +1,181 @@
+import logging
+from threading import Thread, Condition
+
+import numpy as np
+
+from . import clock
+from .distance_scanner import DistanceScanner
+
+log = logging.getLogger(__name__)
+
+
+class ScanSnapshot:
+    """
+    Result of one complete sweep of ScannerService, never changes after it is published.
+
+    Values are binned by angle, bin i covers angles around bin_angles[i] (bin_size wide)
+    and holds the smallest value measured in it (the nearest obstacle), bins the sweep
+    didn't hit are NaN. Raw rows (angle, value) of the sweep are kept in sweep.
+    """
+
+    def __init__(self, number: int, start_time: float, end_time: float, bin_size: float,
+                 bin_angles: np.ndarray, values: np.ndarray, sweep: np.ndarray, percent: bool):
+        for array in (bin_angles, values, sweep):
+            array.setflags(write=False)
+        self.number = number
+        self.start_time = start_time
+        self.end_time = end_time
+        self.bin_size = bin_size
+        self.bin_angles = bin_angles
+        self.values = values
+        self.sweep = sweep
+        self.percent = percent
+
+    @property
+    def age(self) -> float:
+        return clock.now() - self.end_time
+
+    def bin_index(self, angle: float) -> int:
+        index = int(round((angle - self.bin_angles[0]) / self.bin_size))
+        return min(max(index, 0), len(self.bin_angles) - 1)
+
+    def value_at(self, angle: float) -> float:
+        """Value of bin containing angle, NaN if the sweep didn't hit it."""
+        return float(self.values[self.bin_index(angle)])
+
+    def min_between(self, from_angle: float, to_angle: float) -> float:
+        """Smallest value between two angles (inclusive), NaN if the sweep didn't hit any of the bins."""
+        values = self.values[self.bin_index(min(from_angle, to_angle)):self.bin_index(max(from_angle, to_angle)) + 1]
+        if np.all(np.isnan(values)):
+            return float('nan')
+        return float(np.nanmin(values))
+
+
+class ScanSample:
+    """Single reading of ScannerService taken during a sweep, published before the sweep is complete."""
+
+    def __init__(self, number: int, time: float, angle: float, value: float):
+        self.number = number
+        self.time = time
+        self.angle = angle
+        self.value = value
+
+
+def bin_sweep(sweep: np.ndarray, side_degrees: float, bin_size: float) -> tuple:
+    """Bin rows (angle, value) of sweep into bins from -side_degrees to side_degrees, returns (angles, minimums)."""
+    bin_count = int(round(2 * side_degrees / bin_size)) + 1
+    bin_angles = np.arange(bin_count, dtype=float) * bin_size - side_degrees
+    values = np.full(bin_count, np.inf)
+    if len(sweep) > 0:
+        indexes = np.clip(np.rint((sweep[:, 0] + side_degrees) / bin_size).astype(int), 0, bin_count - 1)
+        np.minimum.at(values, indexes, sweep[:, 1])
+    values[values == np.inf] = np.nan
+    return bin_angles, values
+
+
+class ScannerService:
+    """
+    Sweeps the scanner from side to side in background and publishes each complete sweep as ScanSnapshot.
+
+    Readers get the newest snapshot by latest(), which is just a read of a reference (publishing
+    replaces the reference at once), so they never wait for the scanner to move.
+    wait_for_sweep() is there for consumers which want to process every sweep.
+    Readings are also published one by one as ScanSample (latest_sample(), wait_for_sample()),
+    for consumers which must react sooner than in a full sweep.
+
+    While the service is running it owns the scanner, nothing else should rotate it.
+    """
+
+    def __init__(self, scanner: DistanceScanner, side_degrees: float = 90, bin_size: float = 5,
+                 percent: bool = True):
+        self._scanner = scanner
+        self.side_degrees = side_degrees
+        self.bin_size = bin_size
+        self.percent = percent
+        self._condition = Condition()
+        self._latest = None
+        self._count = 0
+        self._latest_sample = None
+        self._sample_count = 0
+        self._thread = None
+        self._run = False
+        self._active = False
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.is_running:
+            return
+        self._run = True
+        self._active = True
+        self._thread = Thread(target=self._loop, daemon=True, name='ScannerService')
+        clock.start_thread(self._thread)
+
+    def stop(self):
+        """Stop sweeping, waits until the sweep in progress is finished."""
+        self._run = False
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            clock.join(thread)
+
+    def latest(self) -> ScanSnapshot:
+        """Newest complete sweep, None if no sweep has been published yet."""
+        return self._latest
+
+    def latest_sample(self) -> ScanSample:
+        """Newest single reading, None if nothing has been read yet."""
+        return self._latest_sample
+
+    def wait_for_sample(self, after_number: int = 0, timeout: float = None) -> ScanSample:
+        """Wait for reading with number higher than after_number, returns None if the timeout passed first."""
+        if not clock.wait_for(lambda: self._sample_count > after_number or not self._active, timeout,
+                              self._condition):
+            return None
+        sample = self._latest_sample
+        return sample if sample is not None and sample.number > after_number else None
+
+    def wait_for_sweep(self, after_number: int = 0, timeout: float = None) -> ScanSnapshot:
+        """Wait for snapshot with number higher than after_number, returns None if the timeout passed first."""
+        if not clock.wait_for(lambda: self._count > after_number or not self._active, timeout, self._condition):
+            return None
+        snapshot = self._latest
+        return snapshot if snapshot is not None and snapshot.number > after_number else None
+
+    def _publish_sample(self, value: float, angle: float):
+        sample = ScanSample(self._sample_count + 1, clock.now(), angle, value)
+        with self._condition:
+            self._latest_sample = sample
+            self._sample_count = sample.number
+            self._condition.notify_all()
+
+    def _publish(self, sweep: np.ndarray, side_degrees: float, start_time: float):
+        bin_angles, values = bin_sweep(sweep, side_degrees, self.bin_size)
+        snapshot = ScanSnapshot(self._count + 1, start_time, clock.now(), self.bin_size,
+                                bin_angles, values, sweep, self.percent)
+        with self._condition:
+            self._latest = snapshot
+            self._count = snapshot.number
+            self._condition.notify_all()
+
+    def _loop(self):
+        try:
+            side_degrees = self.side_degrees
+            self._scanner.rotate_scanner_to_pos(-side_degrees)
+            self._scanner.wait_to_scanner_stop()
+
+            next_positive = True
+            while self._run:
+                side_degrees = self.side_degrees
+                start_time = clock.now()
+                sweep = self._scanner.sweep(side_degrees if next_positive else -side_degrees, self.percent,
+                                            self._publish_sample)
+                next_positive = not next_positive
+                self._publish(sweep, side_degrees, start_time)
+        except Exception:
+            log.exception('Scanner service failed')
+        finally:
+            with self._condition:
+                self._active = False
+                self._condition.notify_all()
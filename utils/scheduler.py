@@ -0,0 +1,225 @@
+import logging
+import math
+from threading import Thread, Condition, Lock, current_thread
+
+from . import clock
+from .cycle_stats import cycle_stats
+
+log = logging.getLogger(__name__)
+
+_RESOLUTION = 1e-6  # tasks released this close to now are due, so rounding errors of deadlines can't spin the loop
+
+# order of tasks released at the same time
+PHASE_SENSE = 0
+PHASE_REGULATE = 1
+PHASE_ACTUATE = 2
+
+
+class ScheduledTask:
+    """
+    Periodic task run by CycleScheduler, see CycleScheduler.add().
+
+    Counters: runs - number of runs, overruns - runs that took longer than budget,
+    skipped - releases that were dropped because the task was late or overran its budget.
+    """
+
+    def __init__(self, scheduler, name: str, callback, period: float, phase: int, priority: int,
+                 budget: float, on_stop):
+        self.scheduler = scheduler
+        self.name = name
+        self.callback = callback
+        self.period = period
+        self.phase = phase
+        self.priority = priority
+        self.budget = budget
+        self.on_stop = on_stop
+        self.release = None
+        self.runs = 0
+        self.overruns = 0
+        self.skipped = 0
+        self.exec_time = 0
+        self.stats = cycle_stats(name)
+        self.finished = False
+        self.cancelled = False
+
+    def sort_key(self):
+        return self.phase, -self.priority, self.release
+
+    def is_alive(self) -> bool:
+        return not self.finished
+
+    def cancel(self):
+        self.scheduler.remove(self)
+
+    def join(self, timeout: float = None) -> bool:
+        """Wait until the task finishes, returns False if the timeout passed first."""
+        return self.scheduler.join(self, timeout)
+
+
+class CycleScheduler(Thread):
+    """
+    Single thread running all registered periodic tasks, instead of thread with its own sleep loop for each of them.
+
+    Tasks are released on monotonic deadlines (next release = last release + period). All tasks due
+    at once run in order of their phase (sense -> regulate -> actuate), then by priority. A task is never
+    run more than once per release: if it gets late by more than its period, missed releases are skipped
+    instead of being run in a burst, and a task exceeding its budget skips its next release, so the load
+    it causes drops until it fits again.
+
+    Task finishes when its callback returns False or when it is cancelled, on_stop of the task is called
+    in the scheduler thread then.
+    """
+
+    def __init__(self):
+        super().__init__(daemon=True, name='CycleScheduler')
+        self.condition = Condition()
+        self._tasks = []
+        self._changed = False
+        self._run = True
+        clock.start_thread(self)
+
+    def add(self, name: str, callback, period: float, phase: int = PHASE_REGULATE, priority: int = 0,
+            budget: float = None, on_stop=None) -> ScheduledTask:
+        """
+        Run callback every period seconds, first run happens as soon as possible.
+        Budget is the longest acceptable execution time of one run, the period if not given.
+        """
+        if budget is None:
+            budget = period
+        task = ScheduledTask(self, name, callback, period, phase, priority, budget, on_stop)
+        with self.condition:
+            task.release = clock.monotonic()
+            self._tasks.append(task)
+            self._changed = True
+            self.condition.notify_all()
+        return task
+
+    def add_steps(self, name: str, steps, period: float, phase: int = PHASE_REGULATE, priority: int = 0,
+                  budget: float = None, on_stop=None) -> ScheduledTask:
+        """
+        Run generator steps as a task, every run resumes it until its next yield, see add().
+        So a sequence of moves and waits can be written as one function, yielding wherever it would sleep
+        until the next cycle. The task finishes when the generator returns.
+        """
+        def callback():
+            try:
+                next(steps)
+            except StopIteration:
+                return False
+
+        return self.add(name, callback, period, phase, priority, budget, on_stop)
+
+    def remove(self, task: ScheduledTask):
+        """Cancel the task. When called from the scheduler thread, the task is finished right away."""
+        with self.condition:
+            if task.finished:
+                return
+            task.cancelled = True
+            self._changed = True
+            self.condition.notify_all()
+        if current_thread() is self:
+            self._finish(task)
+
+    def join(self, task: ScheduledTask, timeout: float = None) -> bool:
+        if current_thread() is self:
+            return task.finished  # waiting would block the task itself
+        return clock.wait_for(lambda: task.finished, timeout, self.condition)
+
+    def get_tasks(self) -> list:
+        with self.condition:
+            return list(self._tasks)
+
+    def stop(self):
+        with self.condition:
+            self._run = False
+            self.condition.notify_all()
+
+    def _finish(self, task: ScheduledTask):
+        with self.condition:
+            if task.finished:
+                return
+            task.finished = True
+            if task in self._tasks:
+                self._tasks.remove(task)
+        task.stats.stop()
+        try:
+            if task.on_stop is not None:
+                task.on_stop()
+        except Exception:
+            log.exception('Stopping of task {} failed'.format(task.name))
+        with self.condition:
+            self.condition.notify_all()
+
+    def _run_task(self, task: ScheduledTask):
+        start_time = clock.monotonic()
+        try:
+            result = task.callback()
+        except Exception:
+            log.exception('Task {} failed'.format(task.name))
+            result = False
+        end_time = clock.monotonic()
+        task.exec_time = end_time - start_time
+        task.runs += 1
+        if result is False:
+            self._finish(task)
+            return
+
+        release = task.release
+        overrun = False
+        task.release += task.period
+        if task.exec_time > task.budget:
+            task.overruns += 1
+            task.release += task.period
+            task.skipped += 1
+            overrun = True
+        if task.release <= end_time:
+            missed = math.floor((end_time - task.release) / task.period) + 1
+            task.release += missed * task.period
+            task.skipped += missed
+            overrun = True
+        task.stats.add(start_time, task.exec_time, start_time - release, task.period, overrun)
+
+    def _next_release(self) -> float:
+        return min((task.release for task in self._tasks), default=None)
+
+    def run(self):
+        while self._run:
+            with self.condition:
+                cancelled = [task for task in self._tasks if task.cancelled]
+            for task in cancelled:
+                self._finish(task)
+
+            with self.condition:
+                now = clock.monotonic()
+                due = sorted((task for task in self._tasks if task.release <= now + _RESOLUTION),
+                             key=ScheduledTask.sort_key)
+            for task in due:
+                if not task.cancelled:
+                    self._run_task(task)
+
+            with self.condition:
+                self._changed = False
+                next_release = self._next_release()
+                if next_release is None:
+                    timeout = None
+                else:
+                    timeout = next_release - clock.monotonic()
+                    if timeout <= _RESOLUTION:
+                        continue
+            clock.wait_for(lambda: self._changed or not self._run, timeout, self.condition)
+
+
+_SCHEDULER = None
+_SCHEDULER_LOCK = Lock()
+
+
+def get_scheduler() -> CycleScheduler:
+    """Scheduler shared by the whole program, created on the first use."""
+    global _SCHEDULER
+    scheduler = _SCHEDULER
+    if scheduler is None:
+        with _SCHEDULER_LOCK:
+            scheduler = _SCHEDULER
+            if scheduler is None:
+                scheduler = _SCHEDULER = CycleScheduler()
+    return scheduler
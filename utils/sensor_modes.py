@@ -0,0 +1,137 @@
+import weakref
+from contextlib import contextmanager
+from threading import current_thread
+
+from ev3dev.auto import Sensor
+
+from . import clock
+from .bulk_reader import BulkReader
+from .device_info import device_info
+
+
+class SensorModes:
+    """
+    Keeps track of mode of one sensor, so the mode is written only when it really changes.
+
+    Mode writes are slow, the sensor reinitialises and its values are not valid for a while.
+    Every switch is timed and cost of switching to each mode (time of the write plus settle_time
+    the sensor gets before it is read again) is remembered, see switch_cost().
+
+    ValueReaders of the sensor register themselves by add_reader(), they are paused while someone
+    holds the sensor in exclusive() (or borrow()) block, so they never store values of foreign mode.
+    Switch done outside of exclusive() block pauses the readers too and reloads them for the new mode.
+    """
+
+    def __init__(self, sensor: Sensor, settle_time: float = 0.02):
+        self._sensor = sensor
+        self._lock = clock.RLock()  # held while the sensor settles
+        self._mode = sensor.mode if sensor.connected else None
+        self._settle_time = settle_time
+        self._switch_costs = {}
+        self._readers = []
+        self._bulk_readers = {}
+        self._exclusive_owner = None
+        self.switches = 0
+
+    @property
+    def mode(self) -> str:
+        return self._mode
+
+    def switch_cost(self, mode: str) -> float:
+        """Expected time of switching to mode in seconds, zero if the sensor already is in it."""
+        if mode == self._mode:
+            return 0
+        return self._switch_costs.get(mode, self._settle_time)
+
+    def set_mode(self, mode: str) -> bool:
+        """Switch the sensor to mode and wait until it settles, returns False if the sensor already was in it."""
+        with self._lock:
+            if mode == self._mode:
+                return False
+            if self._exclusive_owner is not current_thread():
+                with self.exclusive(restore=False):
+                    return self._switch(mode)
+            return self._switch(mode)
+
+    def _switch(self, mode: str) -> bool:
+        with self._lock:
+            start_time = clock.now()
+            self._mode = None  # unknown until the write succeeds
+            self._sensor.mode = mode
+            self._mode = mode
+            device_info(self._sensor).invalidate_mode()
+            clock.sleep(self._settle_time)
+
+            cost = clock.now() - start_time
+            last_cost = self._switch_costs.get(mode)
+            self._switch_costs[mode] = cost if last_cost is None else last_cost * 0.8 + cost * 0.2
+            self.switches += 1
+            return True
+
+    def add_reader(self, reader):
+        with self._lock:
+            self._readers.append(reader)
+
+    def remove_reader(self, reader):
+        with self._lock:
+            if reader in self._readers:
+                self._readers.remove(reader)
+
+    @contextmanager
+    def exclusive(self, restore: bool = True):
+        """
+        Take the sensor for the duration of the with block, mode can be switched freely inside it.
+        Registered readers are paused and the original mode is restored at the end, unless restore is False
+        (readers are reloaded then, if the mode was switched meanwhile).
+        """
+        with self._lock:
+            previous_mode = self._mode
+            previous_owner = self._exclusive_owner
+            switches = self.switches
+            readers = list(self._readers)
+            for reader in readers:
+                reader.pause()
+            self._exclusive_owner = current_thread()
+            try:
+                for reader in readers:
+                    reader.wait_to_pause()
+                yield self
+            finally:
+                try:
+                    if restore and previous_mode is not None:
+                        self.set_mode(previous_mode)
+                finally:
+                    self._exclusive_owner = previous_owner
+                    for reader in readers:
+                        if self.switches != switches:
+                            reader.reload()
+                        reader.resume()
+
+    @contextmanager
+    def borrow(self, mode: str):
+        """Switch the sensor to mode for the duration of the with block, see exclusive()."""
+        with self.exclusive():
+            self.set_mode(mode)
+            yield self
+
+    def read(self, mode: str) -> list:
+        """Read all values in mode. Outside of exclusive() block the sensor stays in the mode, see set_mode()."""
+        with self._lock:
+            switched = self.set_mode(mode)
+            bulk_reader = self._bulk_readers.get(mode)
+            if bulk_reader is None:
+                bulk_reader = self._bulk_readers[mode] = BulkReader(self._sensor)
+            elif switched:
+                bulk_reader.reload()
+            return bulk_reader.values()
+
+
+_SENSORS_MODES = weakref.WeakKeyDictionary()
+
+
+def sensor_modes(sensor: Sensor) -> SensorModes:
+    """Shared SensorModes of the sensor."""
+    modes = _SENSORS_MODES.get(sensor)
+    if modes is None:
+        modes = _SENSORS_MODES[sensor] = SensorModes(sensor)
+    return modes
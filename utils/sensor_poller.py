@@ -0,0 +1,158 @@
+import logging
+from threading import Thread, Condition
+
+from . import clock
+
+log = logging.getLogger(__name__)
+
+
+class PollStats:
+    """Statistics of reading one sensor by SensorPoller. Times are in seconds."""
+
+    def __init__(self):
+        self.reads = 0
+        self.read_time_total = 0
+        self.read_time_max = 0
+        self.jitter_total = 0
+        self.jitter_max = 0
+        self.late = 0
+        self.first_read = None
+        self.last_read = None
+
+    def add(self, jitter: float, read_time: float, interval: float, timestamp: float):
+        self.reads += 1
+        self.read_time_total += read_time
+        self.read_time_max = max(self.read_time_max, read_time)
+        self.jitter_total += jitter
+        self.jitter_max = max(self.jitter_max, jitter)
+        if jitter > interval:
+            self.late += 1
+        if self.first_read is None:
+            self.first_read = timestamp
+        self.last_read = timestamp
+
+    def to_dict(self) -> dict:
+        reads = self.reads
+        duration = self.last_read - self.first_read if reads > 1 else 0
+        return {
+            'reads': reads,
+            'rate': (reads - 1) / duration if duration > 0 else 0,
+            'read_time_avg': self.read_time_total / reads if reads else 0,
+            'read_time_max': self.read_time_max,
+            'jitter_avg': self.jitter_total / reads if reads else 0,
+            'jitter_max': self.jitter_max,
+            'late': self.late
+        }
+
+
+class _PollEntry:
+    def __init__(self, reader, name: str, priority: int):
+        self.reader = reader
+        self.name = name
+        self.priority = priority
+        self.deadline = None
+        self.stats = PollStats()
+
+
+class SensorPoller(Thread):
+    """
+    Single thread reading all registered sensors (ValueReaders) on their own schedule.
+
+    Every reader is read when its deadline comes, deadlines keep their phase
+    (next deadline = last deadline + interval), so readers with different rates
+    stay interleaved instead of colliding. If several readers are due at once,
+    the one with the highest priority is read first. Interval of each reader is
+    given by the reader itself, see ValueReader.poll_interval().
+
+    The thread sleeps when all readers are paused or idle.
+    """
+
+    def __init__(self, idle_timeout: float = 0.5):
+        super().__init__(daemon=True)
+        self.condition = Condition()
+        self._idle_timeout = idle_timeout
+        self._entries = []
+        self._reading = None
+        self._run = True
+        clock.start_thread(self)
+
+    def register(self, reader, name: str = None, priority: int = 0):
+        with self.condition:
+            if name is None:
+                name = 'sensor' + str(len(self._entries))
+            self._entries.append(_PollEntry(reader, name, priority))
+            self.condition.notify_all()
+
+    def unregister(self, reader):
+        with self.condition:
+            self._entries = [entry for entry in self._entries if entry.reader is not reader]
+            self.condition.notify_all()
+
+    def is_reading(self, reader) -> bool:
+        return self._reading is not None and self._reading.reader is reader
+
+    def get_stats(self) -> dict:
+        """Statistics of every registered reader by its name, see PollStats.to_dict()."""
+        with self.condition:
+            return {entry.name: entry.stats.to_dict() for entry in self._entries}
+
+    def _next_entry(self, now: float):
+        next_entry = None
+        for entry in self._entries:
+            reader = entry.reader
+            if not reader.poll_active():
+                reader.poll_paused()
+                entry.deadline = None
+                continue
+            if entry.deadline is None:
+                entry.deadline = now
+            if next_entry is None:
+                next_entry = entry
+            elif entry.deadline <= now and next_entry.deadline <= now:
+                if entry.priority > next_entry.priority or (entry.priority == next_entry.priority and
+                                                            entry.deadline < next_entry.deadline):
+                    next_entry = entry
+            elif entry.deadline < next_entry.deadline:
+                next_entry = entry
+        return next_entry
+
+    def _is_busy(self) -> bool:
+        return not self._run or any(entry.reader.poll_active() for entry in self._entries)
+
+    def run(self):
+        while self._run:
+            with self.condition:
+                entry = self._next_entry(clock.now())
+                if entry is not None:
+                    delay = entry.deadline - clock.now()
+                    if delay <= 0:
+                        self._reading = entry
+                        entry.reader.poll_resumed()
+
+            if entry is None:
+                clock.wait_for(self._is_busy, self._idle_timeout, self.condition)
+                continue
+            if delay > 0:
+                clock.sleep(delay)
+                continue
+
+            start_time = clock.now()
+            try:
+                entry.reader.poll()
+            except Exception:
+                log.exception('Failed to read sensor ' + entry.name)
+            end_time = clock.now()
+
+            with self.condition:
+                self._reading = None
+                interval = entry.reader.poll_interval()
+                entry.stats.add(start_time - entry.deadline, end_time - start_time, interval, start_time)
+                entry.deadline = max(entry.deadline + interval, end_time)
+                if not entry.reader.poll_active():
+                    entry.reader.poll_paused()
+                self.condition.notify_all()
+
+    def stop(self):
+        with self.condition:
+            self._run = False
+            self.condition.notify_all()
@@ -0,0 +1,74 @@
+import math
+from threading import RLock
+
+
+class Beacon:
+    """IR beacon (or remote in beacon mode) transmitting on channel 1-4."""
+
+    def __init__(self, x: float, y: float, channel: int = 1):
+        self.x = x
+        self.y = y
+        self.channel = channel
+
+
+class BeaconIndex:
+    """
+    Spatial index of beacons. Beacons are bucketed into square cells of cell_size
+    centimeters, so a query only looks at beacons in cells overlapping its radius.
+    """
+
+    def __init__(self, cell_size: float = 100):
+        self._cell_size = cell_size
+        self._cells = {}
+        self._lock = RLock()
+
+    def _to_cell(self, x, y):
+        return int(math.floor(x / self._cell_size)), int(math.floor(y / self._cell_size))
+
+    def add(self, beacon: Beacon) -> Beacon:
+        with self._lock:
+            self._cells.setdefault(self._to_cell(beacon.x, beacon.y), []).append(beacon)
+        return beacon
+
+    def remove(self, beacon: Beacon):
+        with self._lock:
+            cell = self._to_cell(beacon.x, beacon.y)
+            beacons = self._cells[cell]
+            beacons.remove(beacon)
+            if len(beacons) == 0:
+                del self._cells[cell]
+
+    def move(self, beacon: Beacon, x: float, y: float):
+        with self._lock:
+            self.remove(beacon)
+            beacon.x = x
+            beacon.y = y
+            self.add(beacon)
+
+    def __iter__(self):
+        with self._lock:
+            beacons = [beacon for beacons in self._cells.values() for beacon in beacons]
+        return iter(beacons)
+
+    def query(self, x: float, y: float, radius: float, channel: int = None) -> list:
+        """Beacons (on given channel) not further than radius from (x,y), ordered from the nearest one."""
+        column0, row0 = self._to_cell(x - radius, y - radius)
+        column1, row1 = self._to_cell(x + radius, y + radius)
+        found = []
+        with self._lock:
+            if (column1 - column0 + 1) * (row1 - row0 + 1) > len(self._cells):
+                cells = [cell for cell in self._cells.items()
+                         if column0 <= cell[0][0] <= column1 and row0 <= cell[0][1] <= row1]
+            else:
+                cells = [(cell, self._cells[cell]) for cell in
+                         ((column, row) for column in range(column0, column1 + 1) for row in range(row0, row1 + 1))
+                         if cell in self._cells]
+            for cell, beacons in cells:
+                for beacon in beacons:
+                    if channel is not None and beacon.channel != channel:
+                        continue
+                    distance = math.hypot(beacon.x - x, beacon.y - y)
+                    if distance <= radius:
+                        found.append((distance, beacon))
+        found.sort(key=lambda item: item[0])
+        return [beacon for distance, beacon in found]
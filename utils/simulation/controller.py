@@ -1,11 +1,11 @@
 import math
-import time
-from threading import Thread
 
 from utils.position import Position2D
-from utils.utils import wait_to_cycle_time
+from .floor import FloorTexture
 from .map import Map
 
+BEACON_MAX_DISTANCE = 200  # maximal distance (cm) at which IR sensor detects beacons
+
 
 class RobotInfo:
     def __init__(self, *devices_interfaces: list):
@@ -53,55 +53,171 @@ class RobotInfo:
 
 
 class Controller:
-    def __init__(self, robot_info: RobotInfo, surrounding_map: Map, start_position: Position2D = None):
+    REFLECT_BLACK = 5  # reflected light intensity (pct) above black floor
+    REFLECT_WHITE = 80  # reflected light intensity (pct) above white floor
+
+    def __init__(self, robot_info: RobotInfo, surrounding_map: Map, start_position: Position2D = None,
+                 floor: FloorTexture = None, ambient_light: float = 50):
         self.robot_info = robot_info
         self._map = surrounding_map
+        self._floor = floor
+        self._ambient_light = ambient_light
         self._position = start_position if start_position is not None else Position2D(0, 0, 0)
-        self._odometry = None
+        self._odometry_wheels = []
+        self._engine = None
+
+    def set_wheels(self, *wheels):
+        """
+        Wheels moving the robot in the simulation, their motors must be simulated devices.
+        Only the two wheels with the most distant offsets are used to compute the motion.
+        """
+        odometry_wheels = []
+        for wheel in wheels:
+            driver = wheel.motor.sim_driver
+            odometry_wheels.append({
+                'offset': wheel.offset,
+                'unit_per_deg': 1 / (wheel.gear_ratio * wheel.unit_ratio),
+                'driver': driver,
+                'last_angle_deg': driver.get_shaft_angle_deg()
+            })
+        odometry_wheels.sort(key=lambda odometry_wheel: odometry_wheel['offset'])
+        self._odometry_wheels = odometry_wheels
 
     def prepare_devices(self, sim_environment=None):
         self.robot_info.prepare_devices(sim_environment)
-        self._start_odometry()
-
-    def _start_odometry(self):
-        if self._odometry is None:
-            self._odometry = Thread(target=self._run_odometry, daemon=True)
-            # self._odometry.start()
-
-    def _run_odometry(self):
-        cycle_time = 0.1
-        last_time = time.time()
-        while True:
-            # TODO: implement and allow starting
-            last_time = wait_to_cycle_time('Odometry', last_time, cycle_time)
-        pass
+        if sim_environment is not None:
+            self._attach_odometry(sim_environment.get_engine())
+            sim_environment.start()
+
+    def _attach_odometry(self, engine):
+        """Integrate the pose every step of engine, the odometry is attached to one engine at most once."""
+        if engine is self._engine:
+            return
+        if self._engine is not None:
+            self._engine.remove_step_listener(self._step_odometry)
+        engine.add_step_listener(self._step_odometry)
+        self._engine = engine
+
+    def _step_odometry(self, step_time):
+        odometry_wheels = self._odometry_wheels
+        if len(odometry_wheels) == 0:
+            return
+
+        for odometry_wheel in odometry_wheels:
+            angle_deg = odometry_wheel['driver'].get_shaft_angle_deg()
+            odometry_wheel['traveled'] = (angle_deg - odometry_wheel['last_angle_deg']) \
+                * odometry_wheel['unit_per_deg']
+            odometry_wheel['last_angle_deg'] = angle_deg
+
+        min_wheel = odometry_wheels[0]
+        max_wheel = odometry_wheels[-1]
+        if min_wheel['offset'] == max_wheel['offset']:
+            distance = sum(odometry_wheel['traveled'] for odometry_wheel in odometry_wheels) / len(odometry_wheels)
+            angle_rad = 0
+        else:
+            traveled_per_offset = (max_wheel['traveled'] - min_wheel['traveled']) \
+                                  / (max_wheel['offset'] - min_wheel['offset'])
+            distance = min_wheel['traveled'] - min_wheel['offset'] * traveled_per_offset
+            angle_rad = traveled_per_offset
+
+        if distance == 0 and angle_rad == 0:
+            return
+
+        # move along arc, exact for any step length as long as wheel speeds are constant during the step
+        if abs(angle_rad) < 1e-9:
+            offset = Position2D(0, distance, 0)
+        else:
+            radius = distance / angle_rad
+            offset = Position2D(-radius * (1 - math.cos(angle_rad)), radius * math.sin(angle_rad),
+                                math.degrees(angle_rad))
+        self._position = self._position.offset_by(offset)
 
     def get_map(self):
         return self._map
 
+    def set_map(self, surrounding_map: Map):
+        self._map = surrounding_map
+
+    def get_floor(self):
+        return self._floor
+
+    def set_floor(self, floor: FloorTexture):
+        self._floor = floor
+
     def set_actual_pos(self, position):
         self._position = position
 
     def get_actual_pos(self):
         return self._position
 
-    def get_color_rgb_on_pos(self, offset_position=None):
-        return [0, 0, 0]  # TODO: implement
-
-    def get_reflect_on_pos(self, offset_position=None):
-        return 50  # TODO: implement
-
-    def get_light_on_pos(self, offset_position=None):
-        return 50  # TODO: implement
-
-    def get_distance_on_pos(self, offset_position=None):
-        return math.inf  # TODO: implement
-
-    def get_beacon_pos_offset(self, offset_position=None):
-        return None  # TODO: implement
+    def _get_pos_on_pos(self, offset_position=None):
+        if offset_position is None:
+            return self._position
+        return self._position.offset_by(offset_position)
+
+    def get_color_rgb_on_pos(self, offset_position=None, radius=0):
+        """Colour (0-255 per channel) of the floor averaged over circle with given radius."""
+        if self._floor is None:
+            return 0, 0, 0
+        position = self._get_pos_on_pos(offset_position)
+        return self._floor.sample_rgb(position.get_x(), position.get_y(), radius)
+
+    def get_reflect_on_pos(self, offset_position=None, radius=0):
+        if self._floor is None:
+            return 50
+        position = self._get_pos_on_pos(offset_position)
+        luminance = self._floor.sample_luminance(position.get_x(), position.get_y(), radius)
+        return self.REFLECT_BLACK + (self.REFLECT_WHITE - self.REFLECT_BLACK) * luminance / 255
+
+    def get_light_on_pos(self, offset_position=None, radius=0):
+        if self._floor is None:
+            return self._ambient_light
+        position = self._get_pos_on_pos(offset_position)
+        return self._ambient_light * self._floor.sample_luminance(position.get_x(), position.get_y(), radius) / 255
+
+    def get_distance_on_pos(self, offset_position=None, max_distance=math.inf):
+        """Distance to the nearest wall in direction of the position, infinity if it is farther than max_distance."""
+        position = self._get_pos_on_pos(offset_position)
+        return float(self._map.cast_rays(position.get_x(), position.get_y(), position.get_angle_deg(),
+                                         max_distance)[0])
+
+    def get_distances_on_pos(self, offset_position=None, angles_deg=(0,)):
+        position = self._get_pos_on_pos(offset_position)
+        base_angle = position.get_angle_deg()
+        return self._map.cast_rays(position.get_x(), position.get_y(),
+                                   [base_angle + angle_deg for angle_deg in angles_deg])
+
+    def get_beacon_pos_offset(self, offset_position=None, channel=1, max_distance=BEACON_MAX_DISTANCE,
+                              max_angle_deg=180):
+        """
+        Position of the nearest visible beacon on channel relative to the given position
+        (x to the right, y forward), or None if there is no beacon in range, at most max_angle_deg
+        from the direction of the position and not hidden behind a wall.
+        """
+        position = self._get_pos_on_pos(offset_position)
+        x, y = position.get_x(), position.get_y()
+        angle_rad = position.get_angle_rad()
+        cos_angle, sin_angle = math.cos(angle_rad), math.sin(angle_rad)
+
+        candidates = []
+        for beacon in self._map.beacons.query(x, y, max_distance, channel):
+            delta_x, delta_y = beacon.x - x, beacon.y - y
+            offset = Position2D(delta_x * cos_angle + delta_y * sin_angle,
+                                -delta_x * sin_angle + delta_y * cos_angle, 0)
+            if abs(math.degrees(math.atan2(offset.get_x(), offset.get_y()))) <= max_angle_deg:
+                candidates.append((offset, math.degrees(math.atan2(-delta_x, delta_y)), math.hypot(delta_x, delta_y)))
+        if len(candidates) == 0:
+            return None
+
+        walls = self._map.cast_rays(x, y, [direction for offset, direction, distance in candidates], max_distance)
+        for i, (offset, direction, distance) in enumerate(candidates):
+            if not walls[i] < distance:
+                return offset
+        return None
 
     def is_pos_in_wall(self, offset_position=None):
-        return False  # TODO: implement
+        position = self._get_pos_on_pos(offset_position)
+        return self._map.is_occupied(position.get_x(), position.get_y())
 
     def get_noise_on_pos(self, offset_position=None, use_a_weighting=False):
         return 0  # TODO: implement
@@ -1,21 +1,50 @@
 import math
-import time
-from threading import Thread, Event
+from threading import RLock, Condition
 
 from ev3dev.auto import TouchSensor, ColorSensor, UltrasonicSensor, GyroSensor, InfraredSensor, SoundSensor, LightSensor
 
-from utils.utils import wait_to_cycle_time
+from utils.bulk_reader import bin_data_struct
+from utils.position import Position2D
 from .controller import Controller
 from .interface import DeviceInterface, MotorInterface, SensorInterface, TouchSensorInterface, ColorSensorInterface, \
     UltrasonicSensorInterface, GyroSensorInterface, InfraredSensorInterface, SoundSensorInterface, \
     LightSensorInterface, LedInterface
 
+SEEK_HEADING_RANGE = 90  # beacon at this angle (deg) from axis of IR sensor has heading 25
+SEEK_DISTANCE_UNIT = 2  # centimeters per unit of beacon distance reported by IR sensor
+IR_PROX_MAX_DISTANCE = 70  # distance (cm) reported by IR sensor as proximity 100, farther walls are not seen
+US_MAX_DISTANCE = 255  # maximal distance (cm) measured by ultrasonic sensor
+
+RAW_MAX = 1020  # raw readings of colour sensor range from zero up to this value
+
+# colour codes reported by colour sensor in COL-COLOR mode and colours they are matched by
+COLOR_CODES_RGB = (
+    (1, (0, 0, 0)),  # black
+    (2, (0, 0, 255)),  # blue
+    (3, (0, 255, 0)),  # green
+    (4, (255, 255, 0)),  # yellow
+    (5, (255, 0, 0)),  # red
+    (6, (255, 255, 255)),  # white
+    (7, (128, 64, 0)),  # brown
+)
+
 
 class DeviceDriver:
     def __init__(self, controller: Controller, device_interface: DeviceInterface):
         self._controller = controller
         self._driver_name = device_interface.driver_name
         self._position = device_interface.position
+        self._lock = RLock()
+
+    @property
+    def lock(self):
+        return self._lock
+
+    def bind(self, sim_environment):
+        pass
+
+    def step(self, step_time: float):
+        pass
 
     @property
     def driver_name(self):
@@ -26,9 +55,8 @@ class MotorDriver(DeviceDriver):
     def __init__(self, controller: Controller, device_interface: MotorInterface):
         DeviceDriver.__init__(self, controller, device_interface)
         self._address = device_interface.address
-        self._command_applied_event = Event()
-        self._last_command = ''
         self._command = 'stop'
+        self._command_args = {'stop_action': device_interface.stop_action}
         self._commands = device_interface.commands
         self._count_per_rot = device_interface.count_per_rot  # TODO: better simulation of unknown (None) val
         self._count_per_m = device_interface.count_per_m  # TODO: better simulation of unknown (None) val
@@ -37,6 +65,7 @@ class MotorDriver(DeviceDriver):
         self._full_travel_count = device_interface.full_travel_count
         self._polarity = device_interface.polarity
         self._position = device_interface.position
+        self._shaft_position = self._position  # physical rotation, unlike position unaffected by reset
         self._position_sp = 0
         self._max_speed = device_interface.max_speed
         self._speed = 0
@@ -44,121 +73,118 @@ class MotorDriver(DeviceDriver):
         self._ramp_up_sp = device_interface.ramp_up_sp
         self._ramp_down_sp = device_interface.ramp_down_sp
         self._state = []
+        self._state_condition = Condition(self._lock)  # notified whenever the state changes
         self._stop_action = device_interface.stop_action
         self._stop_actions = device_interface.stop_actions
         self._time_sp = 0
 
-        self._commands_handler_thread = None
-
-    def _commands_handler_loop(self):
-        cycle_time = 0.05
-        self._last_command = ''
-        command_args = {}
-        last_time = time.time()
-        while True:
-            actual_command = self._command
-            if self._last_command != actual_command:
-                if actual_command == 'run-forever':
-                    command_args = {'speed': self._speed_sp}
-                elif actual_command == 'run-to-abs-pos':
-                    command_args = {
-                        'speed': self._speed_sp,
-                        'position': self._position_sp,
-                        'stop_action': self._stop_action
-                    }
-                elif actual_command == 'run-to-rel-pos':
-                    command_args = {
-                        'speed': self._speed_sp,
-                        'position': self._position + self._position_sp,
-                        'stop_action': self._stop_action
-                    }
-                elif actual_command == 'run-timed':
-                    command_args = {
-                        'speed': self._speed_sp,
-                        'start_time': time.time(),
-                        'time': self._time_sp / 1000,
-                        'stop_action': self._stop_action
-                    }
-                elif actual_command == 'run-direct':
-                    command_args = {}
-                elif actual_command == 'stop':
-                    command_args = {'stop_action': self._stop_action}
-                elif actual_command == 'reset':
-                    command_args = {}
-                else:
-                    command_args = {}
-                self._last_command = actual_command
-
-            self._command_applied_event.set()
-            self._command_applied_event.clear()
-
-            if actual_command == 'run-forever':
-                speed = command_args['speed']
-                self._position += speed * cycle_time
-                self._speed = speed
-                self._duty_cycle = speed / abs(speed) * 100 if speed != 0 else 0
-                self._state = ['running']
-            elif actual_command == 'run-to-abs-pos' or actual_command == 'run-to-rel-pos':
-                speed = command_args['speed']
-                actual_pos = self._position
-                target_pos = command_args['position']
-                diff = target_pos - actual_pos
-                way = diff / abs(diff) if diff != 0 else 0
-                change = abs(speed * cycle_time) * way
-                if abs(diff) <= abs(change):
-                    self._position = target_pos
-                    self._command = self._last_command = 'stop'
-                else:
-                    self._position += change
+    @property
+    def state_condition(self) -> Condition:
+        return self._state_condition
+
+    def get_shaft_angle_deg(self):
+        count_per_rot = self._count_per_rot if self._count_per_rot is not None else 360
+        return self._shaft_position / count_per_rot * 360
+
+    def _apply_command(self, command):
+        if command == 'run-forever':
+            self._command_args = {'speed': self._speed_sp}
+            self._state = ['running']
+        elif command == 'run-to-abs-pos':
+            self._command_args = {
+                'speed': self._speed_sp,
+                'position': self._position_sp,
+                'stop_action': self._stop_action
+            }
+            self._state = ['running']
+        elif command == 'run-to-rel-pos':
+            self._command_args = {
+                'speed': self._speed_sp,
+                'position': self._position + self._position_sp,
+                'stop_action': self._stop_action
+            }
+            self._state = ['running']
+        elif command == 'run-timed':
+            self._command_args = {
+                'speed': self._speed_sp,
+                'time_left': self._time_sp / 1000,
+                'stop_action': self._stop_action
+            }
+            self._state = ['running']
+        elif command == 'run-direct':
+            self._command_args = {}
+            self._state = ['running']
+        elif command == 'stop':
+            self._command_args = {'stop_action': self._stop_action}
+            self._speed = 0
+            self._duty_cycle = 0
+            self._state = ['holding'] if self._stop_action == 'hold' else []
+        elif command == 'reset':
+            self._duty_cycle = 0
+            self._duty_cycle_sp = 0
+            self._polarity = 'normal'
+            self._position = 0
+            self._position_sp = 0
+            self._speed = 0
+            self._speed_sp = 0
+            self._ramp_up_sp = 0
+            self._ramp_down_sp = 0
+            self._state = []
+            self._stop_action = 'coast'
+            self._time_sp = 0
+            command = 'stop'
+            self._command_args = {'stop_action': self._stop_action}
+        else:
+            self._command_args = {}
+        self._command = command
+        self._state_condition.notify_all()
+
+    def step(self, step_time: float):
+        start_position = self._position
+        self._step_command(step_time)
+        self._shaft_position += self._position - start_position
+
+    def _step_command(self, step_time: float):
+        command = self._command
+        command_args = self._command_args
+        if command == 'run-forever':
+            speed = command_args['speed']
+            self._position += speed * step_time
+            self._speed = speed
+            self._duty_cycle = speed / abs(speed) * 100 if speed != 0 else 0
+        elif command == 'run-to-abs-pos' or command == 'run-to-rel-pos':
+            speed = command_args['speed']
+            actual_pos = self._position
+            target_pos = command_args['position']
+            diff = target_pos - actual_pos
+            way = diff / abs(diff) if diff != 0 else 0
+            change = abs(speed * step_time) * way
+            if abs(diff) <= abs(change):
+                self._position = target_pos
+                self._apply_command('stop')
+            else:
+                self._position += change
                 self._speed = abs(speed) * way
                 self._duty_cycle = way * 100
-                self._state = ['running']
-            elif actual_command == 'run-timed':
-                speed = command_args['speed']
-                self._position += speed * cycle_time
-                self._speed = speed
-                self._duty_cycle = speed / abs(speed) * 100 if speed != 0 else 0
-                self._state = ['running']
-
-                if time.time() - command_args['start_time'] >= command_args['time']:
-                    self._command = self._last_command = 'stop'
-            elif actual_command == 'run-direct':
-                duty_cycle = self._duty_cycle_sp
-                speed = (duty_cycle - (8 * (duty_cycle / abs(duty_cycle)))) * 10 if abs(duty_cycle) > 8 else 0
-                self._position += speed * cycle_time
-                self._speed = speed
-                self._duty_cycle = duty_cycle
-                self._state = ['running']
-                pass
-            elif actual_command == 'stop':
-                self._speed = 0
-                self._duty_cycle = 0
-                if command_args['stop_action'] == 'hold':
-                    self._state = ['holding']
-                else:
-                    self._state = []
-                pass
-            elif actual_command == 'reset':
-                self._last_command = ''
-                self._command = 'stop'
-                self._duty_cycle = 0
-                self._duty_cycle_sp = 0
-                self._polarity = 'normal'
-                self._position = 0
-                self._position_sp = 0
-                self._speed = 0
-                self._speed_sp = 0
-                self._ramp_up_sp = 0
-                self._ramp_down_sp = 0
-                self._state = []
-                self._stop_action = 'coast'
-                self._time_sp = 0
-
-            last_time = wait_to_cycle_time(__name__, last_time, cycle_time)
+        elif command == 'run-timed':
+            speed = command_args['speed']
+            self._position += speed * step_time
+            self._speed = speed
+            self._duty_cycle = speed / abs(speed) * 100 if speed != 0 else 0
+
+            command_args['time_left'] -= step_time
+            if command_args['time_left'] <= 0:
+                self._apply_command('stop')
+        elif command == 'run-direct':
+            duty_cycle = self._duty_cycle_sp
+            speed = (duty_cycle - (8 * (duty_cycle / abs(duty_cycle)))) * 10 if abs(duty_cycle) > 8 else 0
+            self._position += speed * step_time
+            self._speed = speed
+            self._duty_cycle = duty_cycle
 
     @property
     def address(self):
-        return str(self._address)
+        return self._address
 
     @property
     def command(self):
@@ -169,49 +195,28 @@ class MotorDriver(DeviceDriver):
         if value not in self._commands:
             raise Exception()
 
-        if self._commands_handler_thread is None:
-            self._commands_handler_thread = Thread(target=self._commands_handler_loop, daemon=True)
-            self._commands_handler_thread.start()
-
-        while self._last_command != self._command:
-            self._command_applied_event.wait()
-
-        if self._command == value:
-            self._command = ''
-
-            while self._last_command != self._command:
-                self._command_applied_event.wait()
-
-        self._command = value
-
-        while self._last_command != self._command:
-            self._command_applied_event.wait()
+        with self._lock:
+            self._apply_command(value)
 
     @property
     def commands(self):
-        commands_len = len(self._commands)
-        if commands_len == 0:
-            return ''
-        value = self._commands[0]
-        for i in range(1, commands_len):
-            value += ' ' + self._commands[i]
-        return value
+        return self._commands
 
     @property
     def count_per_rot(self):
-        return str(self._count_per_rot)
+        return self._count_per_rot
 
     @property
     def count_per_m(self):
-        return str(self._count_per_m)
+        return self._count_per_m
 
     @property
     def duty_cycle(self):
-        return str(int(self._duty_cycle))
+        return int(self._duty_cycle)
 
     @property
     def duty_cycle_sp(self):
-        return str(int(self._duty_cycle_sp))
+        return int(self._duty_cycle_sp)
 
     @duty_cycle_sp.setter
     def duty_cycle_sp(self, value):
@@ -219,7 +224,7 @@ class MotorDriver(DeviceDriver):
 
     @property
     def full_travel_count(self):
-        return str(self._full_travel_count)
+        return self._full_travel_count
 
     @property
     def polarity(self):
@@ -233,7 +238,7 @@ class MotorDriver(DeviceDriver):
 
     @property
     def position(self):
-        return str(int(self._position))
+        return int(self._position)
 
     @position.setter
     def position(self, value):
@@ -241,7 +246,7 @@ class MotorDriver(DeviceDriver):
 
     @property
     def position_sp(self):
-        return str(int(self._position_sp))
+        return int(self._position_sp)
 
     @position_sp.setter
     def position_sp(self, value):
@@ -249,15 +254,15 @@ class MotorDriver(DeviceDriver):
 
     @property
     def max_speed(self):
-        return str(self._max_speed)
+        return self._max_speed
 
     @property
     def speed(self):
-        return str(int(self._speed))
+        return int(self._speed)
 
     @property
     def speed_sp(self):
-        return str(int(self._speed_sp))
+        return int(self._speed_sp)
 
     @speed_sp.setter
     def speed_sp(self, value):
@@ -267,7 +272,7 @@ class MotorDriver(DeviceDriver):
 
     @property
     def ramp_up_sp(self):
-        return str(int(self._ramp_up_sp))
+        return int(self._ramp_up_sp)
 
     @ramp_up_sp.setter
     def ramp_up_sp(self, value):
@@ -275,7 +280,7 @@ class MotorDriver(DeviceDriver):
 
     @property
     def ramp_down_sp(self):
-        return str(int(self._ramp_down_sp))
+        return int(self._ramp_down_sp)
 
     @ramp_down_sp.setter
     def ramp_down_sp(self, value):
@@ -283,14 +288,7 @@ class MotorDriver(DeviceDriver):
 
     @property
     def state(self):
-        state = self._state.copy()
-        state_len = len(state)
-        if state_len == 0:
-            return ''
-        value = state[0]
-        for i in range(1, state_len):
-            value += ' ' + state[i]
-        return value
+        return self._state.copy()
 
     @property
     def stop_action(self):
@@ -304,18 +302,11 @@ class MotorDriver(DeviceDriver):
 
     @property
     def stop_actions(self):
-        stop_actions = self._stop_actions.copy()
-        stop_actions_len = len(stop_actions)
-        if stop_actions_len == 0:
-            return ''
-        value = stop_actions[0]
-        for i in range(1, stop_actions_len):
-            value += ' ' + stop_actions[i]
-        return value
+        return self._stop_actions.copy()
 
     @property
     def time_sp(self):
-        return str(int(self._time_sp))
+        return int(self._time_sp)
 
     @time_sp.setter
     def time_sp(self, value):
@@ -332,10 +323,41 @@ class SensorDriver(DeviceDriver):
         self._decimals = {}
         self._num_values = {}
         self._units = {}
+        self._bin_data_formats = {}
+        self._mount_motor_interface = device_interface.mount_motor
+        self._mount_gear_ratio = device_interface.mount_gear_ratio
+        self._mount_motor = None
+        self._noise = device_interface.noise
+
+    def bind(self, sim_environment):
+        if self._mount_motor_interface is not None:
+            self._mount_motor = sim_environment.get_device(self._mount_motor_interface)
+
+    def _sensor_position(self):
+        if self._mount_motor is None:
+            return self._position
+        return Position2D(self._position.get_x(), self._position.get_y(),
+                          self._position.get_angle_deg()
+                          - self._mount_motor.get_shaft_angle_deg() / self._mount_gear_ratio)
+
+    def _measure(self, value):
+        """Exact value as measured by the sensor, with noise and latency of the sensor."""
+        if self._noise is None:
+            return value
+        return self._noise.apply(value)
+
+    def _measure_all(self, values):
+        if self._noise is None:
+            return values
+        return self._noise.apply_all(values)
+
+    def _measure_distance(self, max_distance):
+        """Measured distance to wall in front of the sensor, walls farther than max_distance are infinitely far."""
+        return self._measure(self._controller.get_distance_on_pos(self._sensor_position(), max_distance))
 
     @property
     def address(self):
-        return str(self._address)
+        return self._address
 
     @property
     def command(self):
@@ -354,18 +376,11 @@ class SensorDriver(DeviceDriver):
     def commands(self):
         if self._commands is None:
             raise Exception()
-
-        commands_len = len(self._commands)
-        if commands_len == 0:
-            return ''
-        value = self._commands[0]
-        for i in range(1, commands_len):
-            value += ' ' + self._commands[i]
-        return value
+        return self._commands
 
     @property
     def decimals(self):
-        return str(self._decimals[self._mode])
+        return self._decimals[self._mode]
 
     @property
     def mode(self):
@@ -385,29 +400,28 @@ class SensorDriver(DeviceDriver):
 
     @property
     def modes(self):
-        modes_len = len(self._modes)
-        if modes_len == 0:
-            return ''
-        value = self._modes[0]
-        for i in range(1, modes_len):
-            value += ' ' + self._commands[i]
-        return value
+        return self._modes
 
     @property
     def num_values(self):
-        return str(self._num_values[self._mode])
+        return self._num_values[self._mode]
 
     @property
     def units(self):
-        return str(self._units[self._mode])  # TODO: better simulation of none units
+        units = self._units[self._mode]
+        return units if units is not None else ''
+
+    def _values(self) -> list:
+        """All values of the current mode, drivers override it when values are measured together."""
+        return [getattr(self, 'value' + str(n)) for n in range(self.num_values)]
 
     @property
     def bin_data_format(self):
-        raise NotImplementedError()
+        return self._bin_data_formats.get(self._mode, 's32')
 
     @property
-    def bin_data(self):
-        raise NotImplementedError()
+    def bin_data(self) -> bytes:
+        return bin_data_struct(self.bin_data_format, self.num_values).pack(*self._values())
 
 
 class TouchSensorDriver(SensorDriver):
@@ -422,13 +436,14 @@ class TouchSensorDriver(SensorDriver):
     @property
     def value0(self):
         if self._mode == TouchSensor.MODE_TOUCH:
-            return str(int(self._controller.is_pos_in_wall(self._position)))
+            return int(self._controller.is_pos_in_wall(self._sensor_position()))
         raise Exception()
 
 
 class ColorSensorDriver(SensorDriver):
     def __init__(self, controller: Controller, device_interface: ColorSensorInterface):
         SensorDriver.__init__(self, controller, device_interface)
+        self._footprint_radius = device_interface.footprint_radius
         self._commands = []
         self._modes = [ColorSensor.MODE_COL_REFLECT, ColorSensor.MODE_COL_AMBIENT, ColorSensor.MODE_COL_COLOR,
                        ColorSensor.MODE_REF_RAW, ColorSensor.MODE_RGB_RAW]
@@ -453,35 +468,67 @@ class ColorSensorDriver(SensorDriver):
             ColorSensor.MODE_REF_RAW: None,
             ColorSensor.MODE_RGB_RAW: None
         }
+        self._bin_data_formats = {
+            ColorSensor.MODE_COL_REFLECT: 's8',
+            ColorSensor.MODE_COL_AMBIENT: 's8',
+            ColorSensor.MODE_COL_COLOR: 's8',
+            ColorSensor.MODE_REF_RAW: 's16',
+            ColorSensor.MODE_RGB_RAW: 's16'
+        }
+
+    def _reflect(self):
+        return self._measure(self._controller.get_reflect_on_pos(self._sensor_position(), self._footprint_radius))
+
+    def _light(self):
+        return self._measure(self._controller.get_light_on_pos(self._sensor_position(), self._footprint_radius))
+
+    def _color_rgb(self):
+        return self._measure_all(self._controller.get_color_rgb_on_pos(self._sensor_position(),
+                                                                       self._footprint_radius))
+
+    @staticmethod
+    def _classify_color(rgb):
+        red, green, blue = rgb
+        best_color, best_distance = 0, None
+        for color, (color_red, color_green, color_blue) in COLOR_CODES_RGB:
+            distance = (red - color_red) ** 2 + (green - color_green) ** 2 + (blue - color_blue) ** 2
+            if best_distance is None or distance < best_distance:
+                best_color, best_distance = color, distance
+        return best_color
 
     @property
     def value0(self):
         if self._mode == ColorSensor.MODE_COL_REFLECT:
-            return str(int(self._controller.get_reflect_on_pos(self._position)))
+            return int(self._reflect())
         if self._mode == ColorSensor.MODE_COL_AMBIENT:
-            return str(int(self._controller.get_light_on_pos(self._position)))
+            return int(self._light())
         if self._mode == ColorSensor.MODE_COL_COLOR:
-            return str(int(0))  # TODO: implement
+            return self._classify_color(self._color_rgb())
         if self._mode == ColorSensor.MODE_REF_RAW:
-            return str(int(0))  # TODO: implement
+            return int(self._reflect() * RAW_MAX / 100)
         if self._mode == ColorSensor.MODE_RGB_RAW:
-            return str(int(self._controller.get_color_rgb_on_pos(self._position)[0]))
+            return int(self._color_rgb()[0] * RAW_MAX / 255)
         raise Exception()
 
     @property
     def value1(self):
         if self._mode == ColorSensor.MODE_REF_RAW:
-            return str(int(0))  # TODO: implement
+            return int(self._light() * RAW_MAX / 100)
         if self._mode == ColorSensor.MODE_RGB_RAW:
-            return str(int(self._controller.get_color_rgb_on_pos(self._position)[1]))
+            return int(self._color_rgb()[1] * RAW_MAX / 255)
         raise Exception()
 
     @property
     def value2(self):
         if self._mode == ColorSensor.MODE_RGB_RAW:
-            return str(int(self._controller.get_color_rgb_on_pos(self._position)[2]))
+            return int(self._color_rgb()[2] * RAW_MAX / 255)
         raise Exception()
 
+    def _values(self):
+        if self._mode == ColorSensor.MODE_RGB_RAW:
+            return [int(value * RAW_MAX / 255) for value in self._color_rgb()]
+        return super()._values()
+
 
 class UltrasonicSensorDriver(SensorDriver):
     def __init__(self, controller: Controller, device_interface: UltrasonicSensorInterface):
@@ -511,12 +558,19 @@ class UltrasonicSensorDriver(SensorDriver):
             UltrasonicSensor.MODE_US_SI_CM: 'cm',
             UltrasonicSensor.MODE_US_SI_IN: 'in'
         }
+        self._bin_data_formats = {
+            UltrasonicSensor.MODE_US_DIST_CM: 's16',
+            UltrasonicSensor.MODE_US_DIST_IN: 's16',
+            UltrasonicSensor.MODE_US_LISTEN: 's8',
+            UltrasonicSensor.MODE_US_SI_CM: 's16',
+            UltrasonicSensor.MODE_US_SI_IN: 's16'
+        }
         self._tmp_value = 0
         self._on_mode_change(None, self._mode)
 
     def _on_mode_change(self, old_mode, new_mode):
         if new_mode == UltrasonicSensor.MODE_US_SI_CM or new_mode == UltrasonicSensor.MODE_US_SI_IN:
-            self._tmp_value = self._controller.get_distance_on_pos(self._position)
+            self._tmp_value = self._measure_distance(US_MAX_DISTANCE)
         else:
             self._tmp_value = 0
 
@@ -524,23 +578,20 @@ class UltrasonicSensorDriver(SensorDriver):
     def value0(self):  # TODO: crop distance values
         ev3 = self._driver_name == 'lego-ev3-us'
         if self._mode == UltrasonicSensor.MODE_US_DIST_CM:
-            distance = self._controller.get_distance_on_pos(self._position)
-            return str(int((distance * (10 if ev3 else 1)) if math.isfinite(distance) and
-                                                              distance < (2550 if ev3 else 255) else (
-                2550 if ev3 else 255)))  # map must be in cm
+            distance = self._measure_distance(US_MAX_DISTANCE)
+            return int((distance * (10 if ev3 else 1)) if math.isfinite(distance) and
+                       distance < (2550 if ev3 else 255) else (2550 if ev3 else 255))  # map must be in cm
         if self._mode == UltrasonicSensor.MODE_US_DIST_IN:
-            distance = self._controller.get_distance_on_pos(self._position)
-            return str(int((distance * 10) if math.isfinite(distance) and
-                                              distance < 1003 else 1003))  # map must be in inch
+            distance = self._measure_distance(US_MAX_DISTANCE) / 2.54
+            return int((distance * 10) if math.isfinite(distance) and distance < 1003 else 1003)  # map must be in cm
         if self._mode == UltrasonicSensor.MODE_US_LISTEN:
-            return str(int(0))  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == UltrasonicSensor.MODE_US_SI_CM:
-            return str(int((self._tmp_value * (10 if ev3 else 1)) if math.isfinite(self._tmp_value) and
-                                                                     self._tmp_value < (2550 if ev3 else 255) else (
-                2550 if ev3 else 255)))  # map must be in cm
+            return int((self._tmp_value * (10 if ev3 else 1)) if math.isfinite(self._tmp_value) and
+                       self._tmp_value < (2550 if ev3 else 255) else (2550 if ev3 else 255))  # map must be in cm
         if self._mode == UltrasonicSensor.MODE_US_SI_IN:
-            return str(int((self._tmp_value * 10) if math.isfinite(self._tmp_value) and
-                                                     self._tmp_value < 1003 else 1003))  # map must be in inch
+            distance = self._tmp_value / 2.54
+            return int((distance * 10) if math.isfinite(distance) and distance < 1003 else 1003)  # map must be in cm
         raise Exception()
 
 
@@ -571,6 +622,13 @@ class GyroSensorDriver(SensorDriver):
             GyroSensor.MODE_GYRO_G_A: None,
             GyroSensor.MODE_GYRO_CAL: None
         }
+        self._bin_data_formats = {
+            GyroSensor.MODE_GYRO_ANG: 's16',
+            GyroSensor.MODE_GYRO_RATE: 's16',
+            GyroSensor.MODE_GYRO_FAS: 's16',
+            GyroSensor.MODE_GYRO_G_A: 's16',
+            GyroSensor.MODE_GYRO_CAL: 's16'
+        }
         self._start_angle = 0
         self._on_mode_change(None, self._mode)
 
@@ -580,33 +638,33 @@ class GyroSensorDriver(SensorDriver):
     @property
     def value0(self):
         if self._mode == GyroSensor.MODE_GYRO_ANG or self._mode == GyroSensor.MODE_GYRO_G_A:
-            return str(self._controller.get_actual_pos().get_angle_deg() - self._start_angle)
+            return int(round(self._measure(self._controller.get_actual_pos().get_angle_deg() - self._start_angle)))
         if self._mode == GyroSensor.MODE_GYRO_RATE:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == GyroSensor.MODE_GYRO_FAS:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == GyroSensor.MODE_GYRO_CAL:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
     @property
     def value1(self):
         if self._mode == GyroSensor.MODE_GYRO_G_A:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == GyroSensor.MODE_GYRO_CAL:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
     @property
     def value2(self):
         if self._mode == GyroSensor.MODE_GYRO_CAL:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
     @property
     def value3(self):
         if self._mode == GyroSensor.MODE_GYRO_CAL:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
 
@@ -637,72 +695,124 @@ class InfraredSensorDriver(SensorDriver):
             InfraredSensor.MODE_IR_REM_A: None,
             InfraredSensor.MODE_IR_CAL: None
         }
+        self._bin_data_formats = {
+            InfraredSensor.MODE_IR_PROX: 's8',
+            InfraredSensor.MODE_IR_SEEK: 's8',
+            InfraredSensor.MODE_IR_REMOTE: 's8',
+            InfraredSensor.MODE_IR_REM_A: 's16',
+            InfraredSensor.MODE_IR_CAL: 's16'
+        }
+
+    def _seek_offset(self, channel):
+        """Offset of beacon on channel from the sensor, None if there is no beacon in front of the sensor."""
+        return self._controller.get_beacon_pos_offset(self._sensor_position(), channel,
+                                                      max_angle_deg=SEEK_HEADING_RANGE)
+
+    @staticmethod
+    def _seek_heading_of(offset):
+        """Heading (-25 to 25, negative to the left) of beacon at offset, zero if there is no beacon."""
+        if offset is None:
+            return 0
+        # heading is exact, its resolution (51 steps over 180 deg) is much coarser than any angular noise
+        angle_deg = math.degrees(math.atan2(offset.get_x(), offset.get_y()))
+        return int(round(max(-25, min(25, angle_deg / SEEK_HEADING_RANGE * 25))))
+
+    @staticmethod
+    def _seek_distance_of(distance):
+        """Distance (0 to 100) reported for measured distance in centimeters, -128 if there is no beacon."""
+        if distance is None:
+            return -128
+        return int(max(0, min(100, distance / SEEK_DISTANCE_UNIT)))
+
+    def _seek_heading(self, channel):
+        return self._seek_heading_of(self._seek_offset(channel))
+
+    def _seek_distance(self, channel):
+        """Distance of beacon on channel, noise of the sensor applies to distances only."""
+        offset = self._seek_offset(channel)
+        if offset is None:
+            return self._seek_distance_of(None)
+        return self._seek_distance_of(self._measure(math.hypot(offset.get_x(), offset.get_y())))
 
     @property
     def value0(self):  # TODO: crop distance values
         if self._mode == InfraredSensor.MODE_IR_PROX:
-            distance = self._controller.get_distance_on_pos(self._position)
-            return str(int((distance / 70 * 100) if math.isfinite(distance) and distance < 70 else 100))
+            distance = self._measure_distance(IR_PROX_MAX_DISTANCE)
+            return int((distance / IR_PROX_MAX_DISTANCE * 100)
+                       if math.isfinite(distance) and distance < IR_PROX_MAX_DISTANCE else 100)
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(0)  # TODO: add support
+            return self._seek_heading(1)
         if self._mode == InfraredSensor.MODE_IR_REMOTE:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == InfraredSensor.MODE_IR_REM_A:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == InfraredSensor.MODE_IR_CAL:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
     @property
     def value1(self):
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(-128)  # TODO: add support
+            return self._seek_distance(1)
         if self._mode == InfraredSensor.MODE_IR_REMOTE:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == InfraredSensor.MODE_IR_CAL:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
     @property
     def value2(self):
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(0)  # TODO: add support
+            return self._seek_heading(2)
         if self._mode == InfraredSensor.MODE_IR_REMOTE:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
     @property
     def value3(self):
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(-128)  # TODO: add support
+            return self._seek_distance(2)
         if self._mode == InfraredSensor.MODE_IR_REMOTE:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
     @property
     def value4(self):
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(0)  # TODO: add support
+            return self._seek_heading(3)
         raise Exception()
 
     @property
     def value5(self):
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(-128)  # TODO: add support
+            return self._seek_distance(3)
         raise Exception()
 
     @property
     def value6(self):
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(0)  # TODO: add support
+            return self._seek_heading(4)
         raise Exception()
 
     @property
     def value7(self):
         if self._mode == InfraredSensor.MODE_IR_SEEK:
-            return str(-128)  # TODO: add support
+            return self._seek_distance(4)
         raise Exception()
 
+    def _values(self):
+        if self._mode == InfraredSensor.MODE_IR_SEEK:
+            # all channels are read at once, with one latency of the sensor
+            offsets = [self._seek_offset(channel) for channel in range(1, 5)]
+            distances = iter(self._measure_all([math.hypot(offset.get_x(), offset.get_y())
+                                                for offset in offsets if offset is not None]))
+            values = []
+            for offset in offsets:
+                values.append(self._seek_heading_of(offset))
+                values.append(self._seek_distance_of(next(distances) if offset is not None else None))
+            return values
+        return super()._values()
+
 
 class SoundSensorDriver(SensorDriver):
     def __init__(self, controller: Controller, device_interface: SoundSensorInterface):
@@ -725,15 +835,16 @@ class SoundSensorDriver(SensorDriver):
     @property
     def value0(self):
         if self._mode == SoundSensor.MODE_DB:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         if self._mode == SoundSensor.MODE_DBA:
-            return str(0)  # TODO: add support
+            return 0  # TODO: add support
         raise Exception()
 
 
 class LightSensorDriver(SensorDriver):
     def __init__(self, controller: Controller, device_interface: LightSensorInterface):
         SensorDriver.__init__(self, controller, device_interface)
+        self._footprint_radius = device_interface.footprint_radius
         self._commands = []
         self._modes = [LightSensor.MODE_REFLECT, LightSensor.MODE_AMBIENT]
         self._decimals = {
@@ -752,9 +863,11 @@ class LightSensorDriver(SensorDriver):
     @property
     def value0(self):
         if self._mode == LightSensor.MODE_REFLECT:
-            return str(int(self._controller.get_reflect_on_pos(self._position) * 10))
+            return int(self._measure(self._controller.get_reflect_on_pos(self._sensor_position(),
+                                                                         self._footprint_radius)) * 10)
         if self._mode == LightSensor.MODE_AMBIENT:
-            return str(int(self._controller.get_light_on_pos(self._position) * 10))
+            return int(self._measure(self._controller.get_light_on_pos(self._sensor_position(),
+                                                                       self._footprint_radius)) * 10)
         raise Exception()
 
 
@@ -767,14 +880,27 @@ class LedDriver(DeviceDriver):
         self._trigger = 'none'
         self._delay_on = device_interface.delay_on
         self._delay_off = device_interface.delay_off
+        self._timer_on = False
+        self._timer_elapsed = 0
+
+    def step(self, step_time: float):
+        if self._trigger != 'timer':
+            return
+
+        self._timer_elapsed += step_time * 1000
+        delay = self._delay_on if self._timer_on else self._delay_off
+        if self._timer_elapsed >= delay:
+            self._timer_elapsed -= delay
+            self._timer_on = not self._timer_on
+            self._brightness = self._max_brightness if self._timer_on else 0
 
     @property
     def max_brightness(self):
-        return str(self._max_brightness)
+        return self._max_brightness
 
     @property
     def brightness(self):
-        return str(self._brightness)
+        return self._brightness
 
     @brightness.setter
     def brightness(self, value):
@@ -782,24 +908,20 @@ class LedDriver(DeviceDriver):
 
     @property
     def trigger(self):
-        triggers_len = len(self._triggers)
-        if triggers_len == 0:
-            return ''
-        value = self._triggers[0]
-        for i in range(1, triggers_len):
-            value += ' ' + self._triggers[i]
-        return value
+        return [('[' + trigger + ']') if trigger == self._trigger else trigger for trigger in self._triggers]
 
     @trigger.setter
     def trigger(self, value):
         if value not in self._triggers:
             raise Exception()
-        self._trigger = value
-        # TODO: apply trigger
+        with self._lock:
+            self._trigger = value
+            self._timer_on = False
+            self._timer_elapsed = 0
 
     @property
     def delay_on(self):
-        return str(self._delay_on)
+        return self._delay_on
 
     @delay_on.setter
     def delay_on(self, value):
@@ -807,7 +929,7 @@ class LedDriver(DeviceDriver):
 
     @property
     def delay_off(self):
-        return str(self._delay_off)
+        return self._delay_off
 
     @delay_off.setter
     def delay_off(self, value):
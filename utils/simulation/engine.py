@@ -0,0 +1,92 @@
+import logging
+from threading import Thread, RLock
+
+from utils import clock
+from utils.utils import start_cycle_time, wait_to_cycle_time
+
+log = logging.getLogger(__name__)
+
+
+class SimulationEngine:
+    """
+    Steps every simulated device from one thread using a fixed time step.
+
+    Devices are stepped in the order they were added, followed by step
+    listeners (for example the odometry of the Controller). Because all
+    integration happens here with the same step time, motors never drift
+    relative to each other and results don't depend on thread scheduling.
+    """
+
+    def __init__(self, step_time: float = 0.01):
+        self._step_time = step_time
+        self._devices = []
+        self._step_listeners = []
+        self._lock = RLock()
+        self._sim_time = 0
+        self._steps = 0
+        self._run = False
+        self._thread = None
+
+    @property
+    def step_time(self):
+        return self._step_time
+
+    @property
+    def sim_time(self):
+        return self._sim_time
+
+    @property
+    def steps(self):
+        return self._steps
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_device(self, device):
+        with self._lock:
+            self._devices.append(device)
+
+    def add_step_listener(self, listener):
+        with self._lock:
+            self._step_listeners.append(listener)
+
+    def remove_step_listener(self, listener):
+        with self._lock:
+            self._step_listeners.remove(listener)
+
+    def step(self):
+        step_time = self._step_time
+        with self._lock:
+            for device in self._devices:
+                with device.lock:
+                    device.step(step_time)
+            for listener in self._step_listeners:
+                listener(step_time)
+            self._sim_time += step_time
+            self._steps += 1
+
+    def run_steps(self, count: int):
+        for i in range(count):
+            self.step()
+
+    def start(self):
+        if self.is_running:
+            return
+        self._run = True
+        self._thread = Thread(target=self._run_loop, daemon=True)
+        clock.start_thread(self._thread)
+
+    def stop(self):
+        self._run = False
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            clock.join(thread)
+        self._thread = None
+
+    def _run_loop(self):
+        step_time = self._step_time
+        last_time = start_cycle_time('Simulation')
+        while self._run:
+            self.step()
+            last_time = wait_to_cycle_time('Simulation', last_time, step_time)
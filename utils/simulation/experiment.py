@@ -0,0 +1,270 @@
+import importlib
+import logging
+import math
+import multiprocessing
+import sys
+import time
+import traceback
+
+import numpy as np
+
+from utils.position import Position2D
+from .map import Map
+
+log = logging.getLogger(__name__)
+
+PROGRAMS = {
+    'LineFollower': 'programs.line_follow.LineFollowRobotProgram',
+    'AutoDrive': 'programs.auto_drive.AutoDriveRobotProgram',
+    'BeaconFollow': 'programs.beacon_follow.BeaconFollowRobotProgram',
+    'ScannerCalibration': 'programs.scanner_calibration.CalibrateScannerRobotProgram'
+}
+
+METRICS_COLUMNS = ['name', 'program', 'sim_time', 'real_time', 'distance', 'laps', 'lap_time',
+                   'cross_track_mean', 'cross_track_rms', 'cross_track_max', 'collisions', 'collision_time',
+                   'end_x', 'end_y', 'end_angle', 'error']
+
+
+class Episode:
+    """
+    Description of one simulated run of a robot program.
+
+    Arguments:
+        name       - Name of the episode shown in results.
+        program    - Name of the robot program (key of PROGRAMS) or 'module.ClassName' of RobotProgram.
+        config     - Config of the program, missing values use program defaults.
+        duration   - Length of the episode in simulated seconds.
+        start      - Start pose of the robot as (x, y, angle_deg).
+        walls      - Rectangles (x0, y0, x1, y1) of walls placed into the map.
+        beacons    - IR beacons placed on the map as (x, y, channel).
+        map_size   - Map parameters passed to Map (origin_x, origin_y, resolution, width, height).
+        floor      - Path to image of the floor, see FloorTexture.
+        floor_resolution - Centimeters per pixel of the floor image.
+        path       - Reference path as list of (x, y) points, used for lap and cross-track metrics.
+        closed_path- Whether the path is a loop (the last point connects to the first one).
+    """
+
+    def __init__(self, name: str, program: str, config: dict = None, duration: float = 60,
+                 start=(0, 0, 0), walls=(), beacons=(), map_size: dict = None, floor: str = None,
+                 floor_resolution: float = 1, path=None, closed_path: bool = True):
+        self.name = name
+        self.program = program
+        self.config = config
+        self.duration = duration
+        self.start = tuple(start)
+        self.walls = [tuple(wall) for wall in walls]
+        self.beacons = [tuple(beacon) for beacon in beacons]
+        self.map_size = map_size if map_size is not None else {}
+        self.floor = floor
+        self.floor_resolution = floor_resolution
+        self.path = [tuple(point) for point in path] if path is not None else None
+        self.closed_path = closed_path
+
+    @classmethod
+    def from_dict(cls, values: dict):
+        return cls(**values)
+
+    def build_map(self) -> Map:
+        surrounding_map = Map(**self.map_size)
+        for x0, y0, x1, y1 in self.walls:
+            surrounding_map.fill_rect(x0, y0, x1, y1, 1)
+        for beacon in self.beacons:
+            surrounding_map.add_beacon(*beacon)
+        return surrounding_map
+
+
+class EpisodeMetrics:
+    """
+    Step listener of the simulation engine measuring how well the robot performs.
+
+    Collisions are counted whenever some point on the outline of the robot body
+    enters a wall. Laps and cross-track error are measured against the reference
+    path of the episode (if there is one).
+    """
+
+    def __init__(self, controller, robot_width: float, robot_length: float, path=None, closed_path=True):
+        self._controller = controller
+        self._body_points = []
+        for i in range(5):
+            shift_x = -robot_width / 2 + robot_width * i / 4
+            shift_y = -robot_length / 2 + robot_length * i / 4
+            self._body_points.extend([Position2D(shift_x, robot_length / 2, 0),
+                                      Position2D(shift_x, -robot_length / 2, 0),
+                                      Position2D(robot_width / 2, shift_y, 0),
+                                      Position2D(-robot_width / 2, shift_y, 0)])
+
+        self._path_start = None
+        if path is not None and len(path) >= 2:
+            points = np.asarray(path, dtype=float)
+            if closed_path:
+                points = np.vstack((points, points[:1]))
+            self._path_start = points[:-1]
+            self._path_vector = points[1:] - points[:-1]
+            self._path_length_sq = np.maximum(np.sum(self._path_vector ** 2, axis=1), 1e-12)
+            segment_lengths = np.sqrt(self._path_length_sq)
+            self._path_offsets = np.concatenate(([0], np.cumsum(segment_lengths)[:-1]))
+            self._path_length = float(np.sum(segment_lengths))
+            self._closed_path = closed_path
+
+        self.sim_time = 0
+        self.distance = 0
+        self.collisions = 0
+        self.collision_time = 0
+        self.laps = 0
+        self.lap_time = None
+        self._in_collision = False
+        self._cross_track_sum = 0
+        self._cross_track_sum_sq = 0
+        self._cross_track_max = 0
+        self._cross_track_count = 0
+        self._last_position = controller.get_actual_pos()
+        self._path_progress = 0
+        self._last_path_position = None
+        self._last_lap_start = 0
+
+    def on_step(self, step_time: float):
+        self.sim_time += step_time
+        position = self._controller.get_actual_pos()
+        self.distance += math.hypot(position.get_x() - self._last_position.get_x(),
+                                    position.get_y() - self._last_position.get_y())
+        self._last_position = position
+
+        in_collision = any(self._controller.is_pos_in_wall(point) for point in self._body_points)
+        if in_collision:
+            self.collision_time += step_time
+            if not self._in_collision:
+                self.collisions += 1
+        self._in_collision = in_collision
+
+        if self._path_start is not None:
+            self._update_path_metrics(position)
+
+    def _update_path_metrics(self, position):
+        point = np.array([position.get_x(), position.get_y()])
+        projection = np.clip(np.sum((point - self._path_start) * self._path_vector, axis=1) / self._path_length_sq,
+                             0, 1)
+        nearest = self._path_start + self._path_vector * projection[:, np.newaxis]
+        distances = np.hypot(nearest[:, 0] - point[0], nearest[:, 1] - point[1])
+        segment = int(np.argmin(distances))
+        cross_track = float(distances[segment])
+
+        self._cross_track_sum += cross_track
+        self._cross_track_sum_sq += cross_track ** 2
+        self._cross_track_max = max(self._cross_track_max, cross_track)
+        self._cross_track_count += 1
+
+        path_position = self._path_offsets[segment] + projection[segment] * math.sqrt(self._path_length_sq[segment])
+        if self._last_path_position is not None:
+            progress = path_position - self._last_path_position
+            if self._closed_path:
+                # moving over the start of the loop
+                if progress > self._path_length / 2:
+                    progress -= self._path_length
+                elif progress < -self._path_length / 2:
+                    progress += self._path_length
+            self._path_progress += progress
+        self._last_path_position = path_position
+
+        if self._closed_path and self._path_progress >= (self.laps + 1) * self._path_length:
+            lap_time = self.sim_time - self._last_lap_start
+            self.lap_time = lap_time if self.lap_time is None else min(self.lap_time, lap_time)
+            self._last_lap_start = self.sim_time
+            self.laps += 1
+
+    def get_results(self) -> dict:
+        count = self._cross_track_count
+        return {
+            'sim_time': self.sim_time,
+            'distance': self.distance,
+            'laps': self.laps,
+            'lap_time': self.lap_time,
+            'cross_track_mean': self._cross_track_sum / count if count else None,
+            'cross_track_rms': math.sqrt(self._cross_track_sum_sq / count) if count else None,
+            'cross_track_max': self._cross_track_max if count else None,
+            'collisions': self.collisions,
+            'collision_time': self.collision_time,
+            'end_x': self._last_position.get_x(),
+            'end_y': self._last_position.get_y(),
+            'end_angle': self._last_position.get_angle_deg()
+        }
+
+
+def load_program(program_name: str):
+    class_path = PROGRAMS.get(program_name, program_name)
+    module_name, class_name = class_path.rsplit('.', 1)
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def run_episode(episode: Episode, log_level=logging.WARNING) -> dict:
+    """
+    Run one episode in this process. The hardware module must not be imported yet,
+    so this is meant to be called in a fresh worker process (see run_episodes()).
+    """
+    results = {'name': episode.name, 'program': episode.program, 'error': None}
+    real_start_time = time.monotonic()
+    try:
+        sys.argv = [sys.argv[0], '--simulate', '--fast']
+        import config
+        import hardware
+        from utils import clock
+        logging.getLogger().setLevel(log_level)
+
+        controller = hardware.CONTROLLER
+        controller.set_map(episode.build_map())
+        if episode.floor is not None:
+            from .floor import FloorTexture
+            controller.set_floor(FloorTexture.load(episode.floor, resolution=episode.floor_resolution))
+        controller.set_actual_pos(Position2D(*episode.start))
+
+        metrics = EpisodeMetrics(controller, config.ROBOT_WIDTH, config.ROBOT_LENGTH,
+                                 episode.path, episode.closed_path)
+        hardware.SIM_ENV.get_engine().add_step_listener(metrics.on_step)
+        try:
+            program = load_program(episode.program)
+            program_controller = program.execute(episode.config)
+            try:
+                clock.sleep(episode.duration)
+            finally:
+                program_controller.request_exit()
+                program_controller.wait_to_exit()
+                hardware.reset_hardware()
+        finally:
+            hardware.SIM_ENV.get_engine().remove_step_listener(metrics.on_step)
+            hardware.SIM_ENV.stop()
+        results.update(metrics.get_results())
+    except Exception:
+        results['error'] = traceback.format_exc().strip().splitlines()[-1]
+        log.exception('Episode ' + str(episode.name) + ' failed')
+    results['real_time'] = time.monotonic() - real_start_time
+    return results
+
+
+def _run_episode_task(args):
+    return run_episode(*args)
+
+
+def run_episodes(episodes: list, processes: int = None, log_level=logging.WARNING):
+    """
+    Run episodes in a pool of processes, yields results in the order of episodes.
+    Every episode runs in its own fresh process, so the simulated hardware is never shared.
+    """
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(processes, maxtasksperchild=1) as pool:
+        for results in pool.imap(_run_episode_task, [(episode, log_level) for episode in episodes]):
+            yield results
+
+
+def format_table(results: list, columns: list = None) -> str:
+    if columns is None:
+        columns = METRICS_COLUMNS
+
+    def format_value(value):
+        if value is None:
+            return '-'
+        if isinstance(value, float):
+            return '{:.2f}'.format(value)
+        return str(value)
+
+    rows = [columns] + [[format_value(row.get(column, None)) for column in columns] for row in results]
+    widths = [max(len(row[i]) for row in rows) for i in range(len(columns))]
+    return '\n'.join('  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip() for row in rows)
@@ -0,0 +1,188 @@
+import math
+import os
+
+import numpy as np
+
+
+def _read_netpbm_header(fh):
+    """ Parse header of binary PGM (P5) or PPM (P6) file, returns (magic, width, height, max_value). """
+    tokens = []
+    while len(tokens) < 4:
+        line = fh.readline()
+        if not line:
+            raise ValueError('Unexpected end of netpbm header')
+        line = line.split(b'#', 1)[0]
+        tokens.extend(line.split())
+    magic, width, height, max_value = tokens[0].decode(), int(tokens[1]), int(tokens[2]), int(tokens[3])
+    if magic not in ('P5', 'P6'):
+        raise ValueError('Unsupported netpbm format: ' + magic)
+    if max_value > 255:
+        raise ValueError('Only 8-bit netpbm images are supported')
+    return magic, width, height, max_value
+
+
+def load_image(path, width=None, height=None, channels=1):
+    """
+    Load an 8-bit image as numpy array with shape (height, width, channels).
+
+    PGM/PPM and raw files are memory-mapped, so they are read lazily and shared
+    between processes. Raw files need width and height (and channels) to be given.
+    PNG files are decoded with Pillow, if it is installed.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.pgm', '.ppm', '.pnm'):
+        with open(path, 'rb') as fh:
+            magic, width, height, max_value = _read_netpbm_header(fh)
+            offset = fh.tell()
+        channels = 1 if magic == 'P5' else 3
+        return np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(height, width, channels))
+
+    if extension == '.png':
+        try:
+            from PIL import Image
+        except ImportError:
+            raise ImportError('Loading of PNG images requires Pillow, convert the image to PGM/PPM instead.')
+        image = Image.open(path)
+        image = image.convert('L' if image.mode in ('1', 'L', 'P', 'LA') else 'RGB')
+        data = np.asarray(image, dtype=np.uint8)
+        return data.reshape(data.shape[0], data.shape[1], -1)
+
+    if width is None or height is None:
+        raise ValueError('Width and height must be provided for raw images')
+    return np.memmap(path, dtype=np.uint8, mode='r', shape=(height, width, channels))
+
+
+class FloorTexture:
+    """
+    Image of the floor sampled by simulated reflect and colour sensors.
+
+    The top row of the image is the end of the floor with the highest y coordinate,
+    so the image looks the same as when it's looked at from above.
+
+    Besides the (possibly memory-mapped) image itself, mip levels with halved
+    resolution are precomputed. A read averaging a footprint of some radius is
+    then answered by bilinear sampling of the two levels closest to the footprint
+    size, without touching more than eight texels.
+    """
+
+    def __init__(self, data, origin_x=None, origin_y=None, resolution=1, outside_value=255):
+        """
+        Arguments:
+            data          - 8-bit image as array with shape (height, width) or (height, width, channels).
+            origin_x,
+            origin_y      - Position of the bottom left corner of the image in the map coordinate frame.
+                            By default the image is centered at (0,0).
+            resolution    - Width and height of one pixel in centimeters.
+            outside_value - Value of the floor outside of the image.
+        """
+        if data.ndim == 2:
+            data = data.reshape(data.shape[0], data.shape[1], 1)
+        self.height, self.width, self.channels = data.shape
+        self.origin_x = origin_x if origin_x is not None else -self.width * resolution / 2
+        self.origin_y = origin_y if origin_y is not None else -self.height * resolution / 2
+        self.resolution = resolution
+        self.outside_value = float(outside_value)
+        self.data = data
+
+        self._levels = []
+        level = data
+        texel_width = texel_height = 1  # size of texel of the level in pixels of the image
+        while True:
+            self._add_level(level, texel_width, texel_height)
+            if level.shape[0] == 1 and level.shape[1] == 1:
+                break
+            if level.shape[1] > 1:
+                texel_width *= 2
+            if level.shape[0] > 1:
+                texel_height *= 2
+            level = self._downsample(level)
+
+    @classmethod
+    def load(cls, path, origin_x=None, origin_y=None, resolution=1, outside_value=255,
+             width=None, height=None, channels=1):
+        return cls(load_image(path, width, height, channels), origin_x, origin_y, resolution, outside_value)
+
+    @staticmethod
+    def _downsample(level):
+        level = np.asarray(level, dtype=np.float32)
+        if level.shape[0] % 2 == 1 and level.shape[0] > 1:
+            level = np.concatenate((level, level[-1:]), axis=0)
+        if level.shape[1] % 2 == 1 and level.shape[1] > 1:
+            level = np.concatenate((level, level[:, -1:]), axis=1)
+        if level.shape[0] > 1:
+            level = (level[0::2] + level[1::2]) / 2
+        if level.shape[1] > 1:
+            level = (level[:, 0::2] + level[:, 1::2]) / 2
+        return level
+
+    def _add_level(self, level, texel_width, texel_height):
+        """
+        Texels of the level are texel_width x texel_height pixels of the image. Odd sizes are padded
+        by _downsample() at the right and bottom edge, so levels stay aligned with the top left corner.
+        """
+        if not level.flags['C_CONTIGUOUS']:
+            level = np.ascontiguousarray(level)
+        values = memoryview(level).cast('B')
+        if level.dtype != np.uint8:
+            values = values.cast(level.dtype.char)
+        self._levels.append((level, values, level.shape[1], level.shape[0],
+                             self.resolution * texel_width, self.resolution * texel_height))
+
+    @property
+    def levels_count(self):
+        return len(self._levels)
+
+    def _sample_level(self, level_index, x, y, channel):
+        level, values, width, height, texel_width, texel_height = self._levels[level_index]
+        channels = self.channels
+        column = (x - self.origin_x) / texel_width - 0.5
+        row = (self.height * self.resolution - (y - self.origin_y)) / texel_height - 0.5
+
+        if column < -1 or row < -1 or column > width or row > height:
+            return self.outside_value
+
+        column0 = int(math.floor(column))
+        row0 = int(math.floor(row))
+        fraction_x = column - column0
+        fraction_y = row - row0
+        # samples up to half a texel past the edges get the edge texels
+        column1 = min(max(column0 + 1, 0), width - 1)
+        row1 = min(max(row0 + 1, 0), height - 1)
+        column0 = min(max(column0, 0), width - 1)
+        row0 = min(max(row0, 0), height - 1)
+
+        index0 = row0 * width
+        index1 = row1 * width
+        value00 = values[(index0 + column0) * channels + channel]
+        value01 = values[(index0 + column1) * channels + channel]
+        value10 = values[(index1 + column0) * channels + channel]
+        value11 = values[(index1 + column1) * channels + channel]
+        top = value00 + (value01 - value00) * fraction_x
+        bottom = value10 + (value11 - value10) * fraction_x
+        return top + (bottom - top) * fraction_y
+
+    def sample(self, x, y, radius=0, channel=0):
+        """ Value (0-255) of channel averaged over circle with given radius around (x,y). """
+        footprint = 2 * radius / self.resolution
+        if footprint <= 1:
+            return self._sample_level(0, x, y, channel)
+
+        level_position = min(math.log2(footprint), len(self._levels) - 1)
+        level_index = int(level_position)
+        fraction = level_position - level_index
+        value = self._sample_level(level_index, x, y, channel)
+        if fraction == 0 or level_index + 1 >= len(self._levels):
+            return value
+        return value + (self._sample_level(level_index + 1, x, y, channel) - value) * fraction
+
+    def sample_rgb(self, x, y, radius=0):
+        if self.channels < 3:
+            value = self.sample(x, y, radius)
+            return value, value, value
+        return self.sample(x, y, radius, 0), self.sample(x, y, radius, 1), self.sample(x, y, radius, 2)
+
+    def sample_luminance(self, x, y, radius=0):
+        if self.channels < 3:
+            return self.sample(x, y, radius)
+        red, green, blue = self.sample_rgb(x, y, radius)
+        return 0.299 * red + 0.587 * green + 0.114 * blue
@@ -1,12 +1,28 @@
 import fnmatch
-import time
+import struct
 
 from ev3dev.auto import Device, Motor, LargeMotor, MediumMotor, \
     Sensor, TouchSensor, ColorSensor, UltrasonicSensor, GyroSensor, InfraredSensor, SoundSensor, LightSensor, \
     Led
 
+from utils import clock
+
+
+def format_attribute_value(value) -> str:
+    """Format native value of driver attribute the way it would be read from sysfs."""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        return ' '.join(value)
+    return str(value)
+
 
 class SimAttribute:
+    """
+    File-like access to an attribute of a driver. Used only as a fallback for code
+    working with attribute files directly, SimDevice reads drivers without it.
+    """
+
     def __init__(self, attr_name, device):
         self._attr_name = attr_name
         self._device = device
@@ -18,7 +34,7 @@ class SimAttribute:
         pass
 
     def read(self) -> bytes:
-        return str(getattr(self._device, self._attr_name)).encode()
+        return format_attribute_value(getattr(self._device, self._attr_name)).encode()
 
     def write(self, text_input: bytes):
         setattr(self._device, self._attr_name, text_input.decode())
@@ -36,7 +52,7 @@ def list_sim_device_names(sim_environment, class_name, name_pattern, **kwargs):
 
     def matches(name, attr_name, pattern):
         try:
-            value = getattr(environment_class[name], attr_name)
+            value = format_attribute_value(getattr(environment_class[name], attr_name))
         except:
             return False
 
@@ -80,9 +96,50 @@ class SimDevice(Device):
                 self._device_index = None
                 self.connected = False
 
+    @property
+    def sim_driver(self):
+        """Driver simulating this device."""
+        return self._device
+
     def _attribute_file_open(self, name):
         return SimAttribute(name, self._device)
 
+    # Drivers provide native values, so attribute access skips formatting and parsing of strings.
+    # The attribute argument is kept untouched (usually None), nothing needs to be opened.
+
+    def get_attr_int(self, attribute, name):
+        return attribute, int(getattr(self._device, name))
+
+    def set_attr_int(self, attribute, name, value):
+        setattr(self._device, name, int(value))
+        return attribute
+
+    def get_attr_string(self, attribute, name):
+        return attribute, format_attribute_value(getattr(self._device, name))
+
+    def set_attr_string(self, attribute, name, value):
+        setattr(self._device, name, value)
+        return attribute
+
+    def get_attr_line(self, attribute, name):
+        return self.get_attr_string(attribute, name)
+
+    def get_attr_set(self, attribute, name):
+        value = getattr(self._device, name)
+        if isinstance(value, str):
+            value = value.split()
+        return attribute, [item.strip('[]') for item in value]
+
+    def get_attr_from_set(self, attribute, name):
+        value = getattr(self._device, name)
+        if isinstance(value, str):
+            value = value.split()
+        for item in value:
+            selected = item.strip('[]')
+            if selected != item:
+                return attribute, selected
+        return attribute, ''
+
 
 def list_sim_devices(sim_environment, class_name, name_pattern, **kwargs):
     return (SimDevice(sim_environment, class_name, name, name_exact=True)
@@ -146,15 +203,15 @@ class SimMotor(SimDevice, Motor):
         raise NotImplementedError()
 
     def wait(self, cond, timeout=None):
-        start_time = time.time()
+        start_time = clock.now()
         while True:
-            if timeout is not None and time.time() >= start_time + timeout / 1000:
+            if timeout is not None and clock.now() >= start_time + timeout / 1000:
                 return False
 
             if cond(self.state):
                 return True
 
-            time.sleep(0.05)
+            clock.sleep(0.05)
 
 
 def list_sim_motors(sim_environment, name_pattern=Motor.SYSTEM_DEVICE_NAME_CONVENTION, **kwargs):
@@ -204,6 +261,12 @@ class SimSensor(SimDevice, Sensor):
         SimDevice.__init__(self, sim_environment, self.SYSTEM_CLASS_NAME,
                            name_pattern, name_exact, **kwargs)
 
+    def bin_data(self, fmt=None):
+        raw = self._device.bin_data
+        if fmt is None:
+            return raw
+        return struct.unpack(fmt, raw)
+
 
 def list_sim_sensors(sim_environment, name_pattern=Sensor.SYSTEM_DEVICE_NAME_CONVENTION, **kwargs):
     return (SimSensor(sim_environment, name_pattern=name, name_exact=True)
@@ -92,6 +92,14 @@ class SensorInterface(DeviceInterface):
         self.driver_name = 'unknown'
         self.name = 'sensor'
         self.mode = 'unknown'
+        self.mount_motor = None
+        self.mount_gear_ratio = 1
+        self.noise = None  # SensorNoise of readings, None for exact readings
+
+    def mount_on(self, motor_interface, gear_ratio=1):
+        """Sensor is rotated by motor_interface, for example a distance sensor on a scanner."""
+        self.mount_motor = motor_interface
+        self.mount_gear_ratio = gear_ratio
 
 
 class TouchSensorInterface(SensorInterface):
@@ -118,6 +126,7 @@ class ColorSensorInterface(SensorInterface):
         SensorInterface.__init__(self, position)
         self.address = address
         self.mode = ColorSensor.MODE_COL_REFLECT
+        self.footprint_radius = 0.5  # radius (cm) of floor area seen by the sensor
 
 
 class EV3ColorSensorInterface(ColorSensorInterface):
@@ -189,6 +198,7 @@ class LightSensorInterface(SensorInterface):
         SensorInterface.__init__(self, position)
         self.address = address
         self.mode = LightSensor.MODE_REFLECT
+        self.footprint_radius = 0.5  # radius (cm) of floor area seen by the sensor
 
 
 class NXTLightSensorInterface(LightSensorInterface):
@@ -1,7 +1,11 @@
-# import numpy as np
+import math
 
+import numpy as np
 
-class Map(object):  # TODO: implement
+from .beacon import Beacon, BeaconIndex
+
+
+class Map(object):
     """
     The Map class stores an occupancy grid as a two dimensional
     numpy array.
@@ -10,25 +14,32 @@ class Map(object):  # TODO: implement
 
         width      --  Number of columns in the occupancy grid.
         height     --  Number of rows in the occupancy grid.
-        resolution --  Width of each grid square in meters.
+        resolution --  Width of each grid square in centimeters.
         origin_x   --  Position of the grid cell (0,0) in
         origin_y   --    in the map coordinate system.
         grid       --  numpy array with height rows and width columns.
+        beacons    --  BeaconIndex of IR beacons placed on the map.
 
 
     Note that x increases with increasing column number and y increases
     with increasing row number.
+
+    Cells with value of at least OCCUPIED_THRESHOLD are walls. Mask of walls
+    used by ray casting is cached, code writing into grid directly (not through
+    set_cell() or fill_rect()) must call grid_changed() afterwards.
     """
 
-    def __init__(self, origin_x=-2.5, origin_y=-2.5, resolution=.1,
-                 width=50, height=50):
+    OCCUPIED_THRESHOLD = 0.5
+
+    def __init__(self, origin_x=-250, origin_y=-250, resolution=1,
+                 width=500, height=500):
         """ Construct an empty occupancy grid.
 
         Arguments: origin_x,
                    origin_y  -- The position of grid cell (0,0) in the
                                 map coordinate frame.
                    resolution-- width and height of the grid cells
-                                in meters.
+                                in centimeters.
                    width,
                    height    -- The grid will have height rows and width
                                 columns cells.  width is the size of
@@ -43,7 +54,45 @@ class Map(object):  # TODO: implement
         self.resolution = resolution
         self.width = width
         self.height = height
-        # self.grid = np.zeros((height, width))
+        self.beacons = BeaconIndex()
+        self._grid = None
+        self._occupied = None
+        self._occupied_bytes = None
+        self.grid = np.zeros((height, width))
+
+    @property
+    def grid(self):
+        return self._grid
+
+    @grid.setter
+    def grid(self, grid):
+        self._grid = grid
+        self.grid_changed()
+
+    def grid_changed(self):
+        """ Drop the cached mask of walls, must be called after the grid was modified directly. """
+        self._occupied = None
+        self._occupied_bytes = None
+
+    def _get_occupied(self):
+        occupied = self._occupied
+        if occupied is None:
+            occupied = self._occupied = self._grid >= self.OCCUPIED_THRESHOLD
+        return occupied
+
+    def _get_occupied_bytes(self):
+        occupied_bytes = self._occupied_bytes
+        if occupied_bytes is None:
+            occupied_bytes = self._occupied_bytes = self._get_occupied().tobytes()
+        return occupied_bytes
+
+    def to_cell(self, x, y):
+        """ Convert a point in the map coordinate frame to (column, row) of the grid. """
+        return int(math.floor((x - self.origin_x) / self.resolution)), \
+            int(math.floor((y - self.origin_y) / self.resolution))
+
+    def is_cell_in_grid(self, column, row):
+        return 0 <= column < self.width and 0 <= row < self.height
 
     def set_cell(self, x, y, val):
         """ Set the value of a cell in the grid.
@@ -53,7 +102,152 @@ class Map(object):  # TODO: implement
             val   - This is the value that should be assigned to the
                     grid cell that contains (x,y).
 
-        This would probably be a helpful method!  Feel free to throw out
-        point that land outside of the grid.
+        Points that land outside of the grid are ignored.
+        """
+        column, row = self.to_cell(x, y)
+        if self.is_cell_in_grid(column, row):
+            self.grid[row, column] = val
+            self.grid_changed()
+
+    def get_cell(self, x, y):
+        """ Value of the cell containing (x,y), zero for points outside of the grid. """
+        column, row = self.to_cell(x, y)
+        if self.is_cell_in_grid(column, row):
+            return self.grid[row, column]
+        return 0
+
+    def fill_rect(self, x0, y0, x1, y1, val):
+        """ Set the value of all cells touching the rectangle with corners (x0,y0) and (x1,y1). """
+        column0, row0 = self.to_cell(min(x0, x1), min(y0, y1))
+        column1, row1 = self.to_cell(max(x0, x1), max(y0, y1))
+        column0, row0 = max(column0, 0), max(row0, 0)
+        column1, row1 = min(column1, self.width - 1), min(row1, self.height - 1)
+        if column0 <= column1 and row0 <= row1:
+            self.grid[row0:row1 + 1, column0:column1 + 1] = val
+            self.grid_changed()
+
+    def add_beacon(self, x, y, channel=1) -> Beacon:
+        return self.beacons.add(Beacon(x, y, channel))
+
+    def is_occupied(self, x, y):
+        return self.get_cell(x, y) >= self.OCCUPIED_THRESHOLD
+
+    def cast_rays(self, x, y, angles_deg, max_distance=math.inf):
+        """ Distances from (x,y) to the nearest wall along each of the given directions.
+
+        Arguments:
+            x, y        - Start points of the rays, scalars or arrays matching angles_deg.
+            angles_deg  - Directions of the rays. Zero points along the y axis,
+                          positive angles rotate counter-clockwise.
+            max_distance- Rays longer than this report infinity. Pass range
+                          of the sensor, so rays stop tracing at it.
+
+        All rays are traced together through the grid cell by cell (DDA), so
+        one call answers a whole sweep of a scanner. Each ray is traced only
+        until it leaves the grid or reaches max_distance.
         """
-        pass
+        angles = np.radians(np.atleast_1d(np.asarray(angles_deg, dtype=float)))
+        x, y, angles = np.broadcast_arrays(np.asarray(x, dtype=float), np.asarray(y, dtype=float), angles)
+        x, y, angles = x.ravel(), y.ravel(), angles.ravel()
+        count = angles.size
+        if count == 1:
+            return np.array([self._cast_ray(float(x[0]), float(y[0]), float(angles[0]), max_distance)])
+
+        dir_x = -np.sin(angles)
+        dir_y = np.cos(angles)
+
+        grid_x = (x - self.origin_x) / self.resolution
+        grid_y = (y - self.origin_y) / self.resolution
+        cell_x = np.floor(grid_x).astype(np.int64)
+        cell_y = np.floor(grid_y).astype(np.int64)
+        step_x = np.where(dir_x > 0, 1, -1)
+        step_y = np.where(dir_y > 0, 1, -1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            abs_dir_x = np.abs(dir_x)
+            abs_dir_y = np.abs(dir_y)
+            delta_x = np.where(abs_dir_x > 1e-12, self.resolution / abs_dir_x, np.inf)
+            delta_y = np.where(abs_dir_y > 1e-12, self.resolution / abs_dir_y, np.inf)
+            next_x = np.where(dir_x > 0, cell_x + 1 - grid_x, grid_x - cell_x)
+            next_y = np.where(dir_y > 0, cell_y + 1 - grid_y, grid_y - cell_y)
+            t_max_x = np.where(abs_dir_x > 1e-12, next_x * delta_x, np.inf)
+            t_max_y = np.where(abs_dir_y > 1e-12, next_y * delta_y, np.inf)
+            # distance at which each ray leaves the grid for good (-inf if it runs alongside the grid)
+            exit_x = np.where(abs_dir_x > 1e-12, np.where(dir_x > 0, self.width - grid_x, grid_x) * delta_x,
+                              np.where((grid_x >= 0) & (grid_x < self.width), np.inf, -np.inf))
+            exit_y = np.where(abs_dir_y > 1e-12, np.where(dir_y > 0, self.height - grid_y, grid_y) * delta_y,
+                              np.where((grid_y >= 0) & (grid_y < self.height), np.inf, -np.inf))
+        limit = np.minimum(np.minimum(exit_x, exit_y), max_distance)
+
+        occupied = self._get_occupied()
+        distances = np.full(count, np.inf)
+        t = np.zeros(count)
+        active = np.arange(count)
+        while active.size > 0:
+            cx = cell_x[active]
+            cy = cell_y[active]
+            inside = (cx >= 0) & (cx < self.width) & (cy >= 0) & (cy < self.height)
+            hit = inside & occupied[np.clip(cy, 0, self.height - 1), np.clip(cx, 0, self.width - 1)]
+            distances[active[hit]] = t[active[hit]]
+
+            active = active[~(hit | (t[active] > limit[active]))]
+            if active.size == 0:
+                break
+
+            use_x = t_max_x[active] < t_max_y[active]
+            use_y = ~use_x
+            active_x = active[use_x]
+            active_y = active[use_y]
+            t[active_x] = t_max_x[active_x]
+            t[active_y] = t_max_y[active_y]
+            cell_x[active_x] += step_x[active_x]
+            cell_y[active_y] += step_y[active_y]
+            t_max_x[active_x] += delta_x[active_x]
+            t_max_y[active_y] += delta_y[active_y]
+
+        distances[distances > max_distance] = np.inf
+        return distances
+
+    def _cast_ray(self, x, y, angle, max_distance):
+        """ Same as cast_rays() for one ray, traced in plain Python (per call overhead of NumPy is much larger). """
+        resolution = self.resolution
+        width, height = self.width, self.height
+        dir_x = -math.sin(angle)
+        dir_y = math.cos(angle)
+        grid_x = (x - self.origin_x) / resolution
+        grid_y = (y - self.origin_y) / resolution
+        cell_x = int(math.floor(grid_x))
+        cell_y = int(math.floor(grid_y))
+        step_x = 1 if dir_x > 0 else -1
+        step_y = 1 if dir_y > 0 else -1
+
+        if abs(dir_x) > 1e-12:
+            delta_x = resolution / abs(dir_x)
+            t_max_x = ((cell_x + 1 - grid_x) if dir_x > 0 else (grid_x - cell_x)) * delta_x
+            exit_x = ((width - grid_x) if dir_x > 0 else grid_x) * delta_x
+        else:
+            delta_x = t_max_x = math.inf
+            exit_x = math.inf if 0 <= grid_x < width else -math.inf
+        if abs(dir_y) > 1e-12:
+            delta_y = resolution / abs(dir_y)
+            t_max_y = ((cell_y + 1 - grid_y) if dir_y > 0 else (grid_y - cell_y)) * delta_y
+            exit_y = ((height - grid_y) if dir_y > 0 else grid_y) * delta_y
+        else:
+            delta_y = t_max_y = math.inf
+            exit_y = math.inf if 0 <= grid_y < height else -math.inf
+        limit = min(exit_x, exit_y, max_distance)
+
+        occupied = self._get_occupied_bytes()
+        t = 0
+        while t <= limit:
+            if 0 <= cell_x < width and 0 <= cell_y < height and occupied[cell_y * width + cell_x]:
+                return t if t <= max_distance else math.inf
+            if t_max_x < t_max_y:
+                t = t_max_x
+                cell_x += step_x
+                t_max_x += delta_x
+            else:
+                t = t_max_y
+                cell_y += step_y
+                t_max_y += delta_y
+        return math.inf
@@ -0,0 +1,80 @@
+import math
+from threading import Lock
+
+import numpy as np
+
+from utils import clock
+
+
+class SensorNoise:
+    """
+    Imperfections of simulated sensor readings: gaussian noise, quantisation and read latency.
+
+    Random numbers are drawn from generator seeded by seed in blocks of block_size values,
+    so a reading only takes next number from a list and runs with the same seed are repeatable.
+
+    Arguments:
+        std_dev        - Standard deviation of noise added to measured value.
+        quantum        - Resolution of the sensor, measured values are rounded to its multiples.
+        latency        - Seconds each reading takes.
+        latency_jitter - Readings take additionally up to this many seconds.
+        seed           - Seed of random generator.
+    """
+
+    def __init__(self, std_dev: float = 0, quantum: float = 0, latency: float = 0, latency_jitter: float = 0,
+                 seed: int = 0, block_size: int = 4096):
+        self.std_dev = std_dev
+        self.quantum = quantum
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self._random = np.random.RandomState(seed)
+        self._block_size = block_size
+        self._lock = Lock()
+        self._noise = []
+        self._noise_index = 0
+        self._jitter = []
+        self._jitter_index = 0
+
+    def _next_noise(self) -> float:
+        with self._lock:
+            if self._noise_index >= len(self._noise):
+                self._noise = self._random.normal(0, self.std_dev, self._block_size).tolist()
+                self._noise_index = 0
+            value = self._noise[self._noise_index]
+            self._noise_index += 1
+            return value
+
+    def _next_jitter(self) -> float:
+        with self._lock:
+            if self._jitter_index >= len(self._jitter):
+                self._jitter = self._random.uniform(0, self.latency_jitter, self._block_size).tolist()
+                self._jitter_index = 0
+            value = self._jitter[self._jitter_index]
+            self._jitter_index += 1
+            return value
+
+    def wait_latency(self):
+        latency = self.latency
+        if self.latency_jitter > 0:
+            latency += self._next_jitter()
+        if latency > 0:
+            clock.sleep(latency)
+
+    def _distort(self, value: float) -> float:
+        if not math.isfinite(value):
+            return value
+        if self.std_dev > 0:
+            value += self._next_noise()
+        if self.quantum > 0:
+            value = round(value / self.quantum) * self.quantum
+        return value
+
+    def apply(self, value: float) -> float:
+        """Turn exact value into value read by the sensor, waits for the latency of the sensor."""
+        self.wait_latency()
+        return self._distort(value)
+
+    def apply_all(self, values) -> list:
+        """Same as apply() for values measured at once (for example RGB), waits for the latency only once."""
+        self.wait_latency()
+        return [self._distort(value) for value in values]
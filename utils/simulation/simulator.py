@@ -1,15 +1,34 @@
 from utils.position import Position2D
 from . import driver, interface
+from .engine import SimulationEngine
 
 
 class SimulatedEnvironment:
-    def __init__(self, controller):
+    def __init__(self, controller, step_time=0.01):
         self._controller = controller
         self._environment = {}
+        self._devices_by_interface = {}
+        self._engine = SimulationEngine(step_time)
 
     def get_environment(self):
         return self._environment
 
+    def get_engine(self):
+        return self._engine
+
+    def get_device(self, device_interface):
+        return self._devices_by_interface.get(id(device_interface), None)
+
+    def bind_devices(self):
+        for device in self._devices_by_interface.values():
+            device.bind(self)
+
+    def start(self):
+        self._engine.start()
+
+    def stop(self):
+        self._engine.stop()
+
     def _add_device(self, device_interface, device):
         class_name = device_interface.class_name
         if class_name not in self._environment:
@@ -25,6 +44,8 @@ class SimulatedEnvironment:
     def create_device(self, device_interface):
         device = driver.DRIVERS[device_interface.driver_name](self._controller, device_interface)
         self._add_device(device_interface, device)
+        self._devices_by_interface[id(device_interface)] = device
+        self._engine.add_device(device)
 
 
 def get_base_ev3_devices(brick_center_position: Position2D):
@@ -38,8 +59,9 @@ def get_base_ev3_devices(brick_center_position: Position2D):
     ]
 
 
-def build_simulator(controller, *devices_interfaces: list) -> SimulatedEnvironment:
-    simulated_environment = SimulatedEnvironment(controller)
+def build_simulator(controller, *devices_interfaces: list, step_time=0.01) -> SimulatedEnvironment:
+    simulated_environment = SimulatedEnvironment(controller, step_time)
     for device_interface in devices_interfaces:
         simulated_environment.create_device(device_interface)
+    simulated_environment.bind_devices()
     return simulated_environment
@@ -1,16 +1,35 @@
 import logging
-import time
 
 from config import CYCLE_TIME_DEBUG
+from . import clock
+from .cycle_stats import cycle_stats
 
 log = logging.getLogger(__name__)
 
 
+def start_cycle_time(cycle_name: str) -> float:
+    """
+    Start (or resume after a break) loop timed by wait_to_cycle_time(), returns the planned start of its first cycle.
+    The break is not recorded as a period of the cycle.
+    """
+    cycle_stats(cycle_name).stop()
+    return clock.now()
+
+
 def wait_to_cycle_time(cycle_name: str, last_time: float, cycle_time: float):
-    new_time = time.time()
+    """
+    Wait until start of the next cycle, last_time is the planned start of the cycle that just ended.
+    Returns the planned start of the next cycle. Timing of every cycle is recorded to cycle_stats(cycle_name).
+    """
+    stats = cycle_stats(cycle_name)
+    new_time = clock.now()
     sleep_time = cycle_time - (new_time - last_time)
+
+    start_time = max(stats.wake_time, last_time) if stats.wake_time is not None else last_time
+    stats.add(start_time, new_time - start_time, start_time - last_time, cycle_time, sleep_time <= 0)
+
     if sleep_time > 0:
-        time.sleep(sleep_time)
+        clock.sleep(sleep_time)
         last_time += cycle_time
     elif CYCLE_TIME_DEBUG:
         if sleep_time < -cycle_time * 5:
@@ -19,6 +38,7 @@ def wait_to_cycle_time(cycle_name: str, last_time: float, cycle_time: float):
         last_time += cycle_time
     else:
         last_time = new_time
+    stats.wake_time = clock.now()
     return last_time
 
 
@@ -1,92 +1,207 @@
-import time
-from threading import Thread, Event
+from array import array
 
 from ev3dev.auto import Sensor
 
+from . import clock
+from .bulk_reader import BulkReader
+from .sensor_modes import sensor_modes
+from .sensor_poller import SensorPoller
 
-class ValueReader(Thread):
-    def __init__(self, sensor: Sensor):
-        super().__init__(daemon=True)
-        self._change_event = Event()
-        self._run = True
-        self._paused = False
+
+class ValueReader:
+    """
+    Reads values of sensor in background and keeps history of timestamped samples.
+
+    Samples are stored in a ring buffer of given capacity backed by arrays, so history
+    queries (last(), since(), value_at()) don't need to talk to the sensor at all.
+    Reading speed adapts to consumers: the sensor is polled about twice as often as values
+    are being requested (at most rate times per second, at least once per max_interval) and
+    polling stops completely when nobody asked for values for idle_timeout seconds.
+
+    Sensor is read by the given SensorPoller shared with other readers,
+    reader without poller creates its own one.
+    """
+
+    def __init__(self, sensor: Sensor, poller: SensorPoller = None, rate: float = 500, priority: int = 0,
+                 name: str = None, capacity: int = 256, max_interval: float = 0.05, idle_timeout: float = 0.5):
+        self._own_poller = poller is None
+        self._poller = SensorPoller() if poller is None else poller
+        self._condition = self._poller.condition
+        self._paused = True
         self._pause = 0
         self._sensor = sensor
+        self._modes = sensor_modes(sensor)
+        self._bulk_reader = BulkReader(sensor)
+        self._capacity = capacity
+        self._min_interval = 1 / rate
+        self._max_interval = max(max_interval, self._min_interval)
+        self._idle_timeout = idle_timeout
         self._num_values = 0
-        self._values = []
-        self._reads = 1
+        self._timestamps = array('d', bytes(8 * capacity))
+        self._samples = array('l')
+        self._count = 0
+        self._last_request = None
+        self._request_interval = max_interval
         self.reload()
-        self.start()
+        self._modes.add_reader(self)
+        self._poller.register(self, name, priority)
 
     def reload(self):
-        self._num_values = self._sensor.num_values
-        self._values = [0 in range(self._num_values)]
+        with self._condition:
+            self._bulk_reader.reload()
+            self._num_values = self._bulk_reader.num_values
+            typecode = 'd' if self._bulk_reader.is_float else 'l'
+            self._samples = array(typecode, [0]) * (self._capacity * self._num_values)
+            self._count = 0
 
     def mode(self, value):
-        self.pause()
-        self.wait_to_pause()
-        try:
-            self._sensor.mode = value
-        finally:
-            self.reload()
-            self.resume()
+        """Switch mode of the sensor, nothing is written if the sensor already is in the mode."""
+        self._modes.set_mode(value)  # pauses and reloads all readers of the sensor, this one included
+
+    def poll(self):
+        start_time = clock.now()
+        values = self._bulk_reader.values()
+        timestamp = (start_time + clock.now()) / 2
+
+        with self._condition:
+            if len(values) != self._num_values:
+                return  # mode was changed during reading
+            slot = self._count % self._capacity
+            self._timestamps[slot] = timestamp
+            offset = slot * self._num_values
+            self._samples[offset:offset + self._num_values] = array(self._samples.typecode, values)
+            self._count += 1
+            self._condition.notify_all()
+
+    def _on_request(self):
+        with self._condition:
+            now = clock.now()
+            if self._last_request is not None:
+                self._request_interval = self._request_interval * 0.8 + (now - self._last_request) * 0.2
+            self._last_request = now
+            if self._count == 0 or self._paused:
+                self._condition.notify_all()
+                return True
+            return False
+
+    def _sample_values(self, index):
+        offset = (index % self._capacity) * self._num_values
+        return self._samples[offset:offset + self._num_values].tolist()
 
     def value(self, n=0, force_new=False):
-        if force_new:
-            self._values[n] = self._sensor.value(n)
-        else:
-            if self._paused:
-                self._values[n] = self._sensor.value(n)
-            self._reads += 1
-            self._change_event.set()
-        return self._values[n]
+        if self._on_request() or force_new:
+            if self._paused or force_new:
+                return self._sensor.value(n)
+            self.wait_for_sample()
+        with self._condition:
+            return self._samples[((self._count - 1) % self._capacity) * self._num_values + n]
 
     @property
     def num_values(self):
-        return self.num_values
+        return self._num_values
 
     def values(self, force_new=False):
-        if force_new:
-            for n in range(self._num_values):
-                self._values[n] = self._sensor.value(n)
-        else:
-            if self._paused:
-                for n in range(self._num_values):
-                    self._values[n] = self._sensor.value(n)
-            self._reads += 1
-            self._change_event.set()
-        return self._values.copy()
-
-    def run(self):
-        while self._run:
-            if self._pause or not self._reads:
-                self._paused = True
-                self._change_event.clear()
-                while self._pause or not self._reads and self._run:
-                    self._change_event.wait()
-                    self._change_event.clear()
-                self._paused = False
-
-            for n in range(self._num_values):
-                self._values[n] = self._sensor.value(n)
-
-            if self._reads > 5:
-                self._reads = 5
+        if self._on_request() or force_new:
+            if self._paused or force_new:
+                return self._bulk_reader.values()
+            self.wait_for_sample()
+        with self._condition:
+            return self._sample_values(self._count - 1)
+
+    def wait_for_sample(self, after_count=None, timeout=None):
+        """Wait until next sample (or sample number after_count) is read, returns number of read samples."""
+        if after_count is None:
+            after_count = self._count
+        clock.wait_for(lambda: self._count > after_count or self._paused, timeout, self._condition)
+        return self._count
+
+    @property
+    def samples_count(self):
+        return self._count
+
+    def latest(self):
+        """Latest sample as (timestamp, values) or None if there is no sample yet."""
+        samples = self.last(1)
+        return samples[0] if len(samples) > 0 else None
+
+    def last(self, count: int) -> list:
+        """Up to count latest samples as (timestamp, values), from the oldest one."""
+        with self._condition:
+            end = self._count
+            start = max(end - min(count, self._capacity), 0)
+            return [(self._timestamps[i % self._capacity], self._sample_values(i)) for i in range(start, end)]
+
+    def since(self, timestamp: float) -> list:
+        """Samples as (timestamp, values) taken after timestamp, from the oldest one."""
+        with self._condition:
+            start = self._find_index(timestamp) + 1
+            return [(self._timestamps[i % self._capacity], self._sample_values(i))
+                    for i in range(start, self._count)]
+
+    def value_at(self, timestamp: float, n: int = 0):
+        """Value n at timestamp, linearly interpolated between samples. None if there is no sample."""
+        with self._condition:
+            if self._count == 0:
+                return None
+            index = self._find_index(timestamp)
+            oldest = max(self._count - self._capacity, 0)
+            if index < oldest:
+                return self._samples[(oldest % self._capacity) * self._num_values + n]
+            value = self._samples[(index % self._capacity) * self._num_values + n]
+            if index + 1 >= self._count:
+                return value
+
+            time0 = self._timestamps[index % self._capacity]
+            time1 = self._timestamps[(index + 1) % self._capacity]
+            value1 = self._samples[((index + 1) % self._capacity) * self._num_values + n]
+            if time1 <= time0:
+                return value1
+            return value + (value1 - value) * (timestamp - time0) / (time1 - time0)
+
+    def _find_index(self, timestamp: float) -> int:
+        """Index of the last sample taken at or before timestamp, index before the oldest sample if none."""
+        low = max(self._count - self._capacity, 0)
+        high = self._count
+        while low < high:
+            middle = (low + high) // 2
+            if self._timestamps[middle % self._capacity] <= timestamp:
+                low = middle + 1
             else:
-                self._reads -= 1
-            time.sleep(0.01)
+                high = middle
+        return low - 1
+
+    def poll_interval(self) -> float:
+        return min(max(self._request_interval / 2, self._min_interval), self._max_interval)
+
+    def poll_active(self) -> bool:
+        return self._pause == 0 and self._last_request is not None and \
+               clock.now() - self._last_request <= self._idle_timeout
+
+    def poll_paused(self):
+        if not self._paused:
+            self._paused = True
+            self._condition.notify_all()
+
+    def poll_resumed(self):
+        self._paused = False
 
     def pause(self):
-        self._pause += 1
-        self._change_event.set()
+        with self._condition:
+            self._pause += 1
+            if not self._poller.is_reading(self):
+                self.poll_paused()
 
     def wait_to_pause(self):
-        while not self._paused:
-            time.sleep(0.025)
+        clock.wait_for(lambda: self._paused, None, self._condition)
 
     def resume(self):
-        self._pause -= 1
-        self._change_event.set()
+        with self._condition:
+            self._pause -= 1
+            self._condition.notify_all()
 
     def stop(self):
-        self._run = False
+        self._modes.remove_reader(self)
+        if self._own_poller:
+            self._poller.stop()
+        else:
+            self._poller.unregister(self)
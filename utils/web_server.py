@@ -44,7 +44,7 @@ class FilesWebHandler(BaseHTTPRequestHandler):
         result = type('UrlInfo', (object,), {})()
         result.scheme, result.netloc, result.path, result.params, result.query, result.fragment \
             = url_info.scheme, url_info.netloc, url_info.path, url_info.params, url_info.query, url_info.fragment
-        result.args = urllib.parse.parse_qs(url_info.query)
+        result.args = urllib.parse.parse_qs(url_info.query, keep_blank_values=True)
         return result
 
     def try_handle_request(self, path, post_args, get_args):
@@ -2,6 +2,8 @@ import math
 
 from ev3dev.auto import Motor
 
+from .device_info import device_info
+from .motor_io import MotorReader, MotorWriter
 from .position import Position2D
 
 
@@ -9,6 +11,8 @@ class Wheel:
     def __init__(self, motor: Motor, gear_ratio: float, diameter: float,
                  width: float, offset: float):
         self.motor = motor
+        self.reader = MotorReader(motor)
+        self.writer = MotorWriter(motor)
         self.diameter = diameter
         self.width = width
 
@@ -16,6 +20,6 @@ class Wheel:
         self.offset_position = Position2D(offset, 0, 0)
 
         self.gear_ratio = gear_ratio
-        self.motor_tacho_ratio = motor.count_per_rot / 360 if motor.connected else 1
+        self.motor_tacho_ratio = device_info(motor).count_per_rot / 360 if motor.connected else 1
         self.total_ratio = self.gear_ratio * self.motor_tacho_ratio
         self.unit_ratio = 360 / (math.pi * self.diameter)